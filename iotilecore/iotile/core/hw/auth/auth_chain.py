@@ -18,8 +18,14 @@ class ChainedAuthProvider(AuthProvider):
     be tuples of (priority, auth_provider_class, arg_dict) where priority is an integer,
     auth_provider_class is an AuthProvider subclass and arg_dict is a dictionary of
     arguments passed to the constructor of auth_provider.
+
+    Building the chain requires scanning installed entry points, so code that
+    needs the default chain repeatedly, like report decoding, should use the
+    shared instance returned by ChainedAuthProvider.Default().
     """
 
+    _default_chain = None
+
     def __init__(self, args=None):
         super(ChainedAuthProvider, self).__init__(args)
 
@@ -38,6 +44,22 @@ class ChainedAuthProvider(AuthProvider):
         sub_providers.sort(key=lambda x: x[0])
         self.providers = sub_providers
 
+    @classmethod
+    def Default(cls):
+        """Get a shared ChainedAuthProvider using the default providers.
+
+        The chain is built the first time it is requested and reused after
+        that.
+
+        Returns:
+            ChainedAuthProvider: The shared default provider chain.
+        """
+
+        if cls._default_chain is None:
+            cls._default_chain = ChainedAuthProvider()
+
+        return cls._default_chain
+
     def _load_installed_providers(self):
         self._auth_factories = {}
 
@@ -11,6 +11,7 @@ import hashlib
 import struct
 import hmac
 from iotile.core.exceptions import NotFoundError, ArgumentError
+from iotile.core.utilities.lru_cache import LRUCache
 
 
 class AuthProvider(object):
@@ -41,6 +42,9 @@ class AuthProvider(object):
         DeviceKey: 'device_key'
     }
 
+    # Recently derived report keys, indexed by (root_key, report_id, sent_timestamp)
+    _report_key_cache = LRUCache(256)
+
     def __init__(self, args=None):
         if args is None:
             args = {}
@@ -74,12 +78,23 @@ class AuthProvider(object):
 
         The standard method is HMAC-SHA256(root_key, MAGIC_NUMBER || report_id || sent_timestamp)
         where MAGIC_NUMBER is 0x00000002 and all integers are in little endian.
+
+        Derived keys are cached so that verifying many reports with the same
+        report id and timestamp, for example when a report is received more
+        than once, does not recompute the key each time.
         """
 
-        signed_data = struct.pack("<LLL", AuthProvider.ReportKeyMagic, report_id, sent_timestamp)
+        cache_key = (bytes(root_key), report_id, sent_timestamp)
+        report_key = AuthProvider._report_key_cache.get(cache_key)
+
+        if report_key is None:
+            signed_data = struct.pack("<LLL", AuthProvider.ReportKeyMagic, report_id, sent_timestamp)
+
+            hmac_calc = hmac.new(root_key, signed_data, hashlib.sha256)
+            report_key = hmac_calc.digest()
+            AuthProvider._report_key_cache.put(cache_key, report_key)
 
-        hmac_calc = hmac.new(root_key, signed_data, hashlib.sha256)
-        return bytearray(hmac_calc.digest())
+        return bytearray(report_key)
 
     def encrypt_report(self, device_id, root, data, **kwargs):
         """Encrypt a buffer of report data on behalf of a device.
@@ -5,6 +5,7 @@ import hmac
 import binascii
 import os
 from iotile.core.exceptions import NotFoundError
+from iotile.core.utilities.lru_cache import LRUCache
 from .auth_provider import AuthProvider
 
 
@@ -17,8 +18,14 @@ class EnvAuthProvider(AuthProvider):
     for the environment variable USER_KEY_000000AB.
 
     The key must be a 64 character hex string that is decoded to create a 32 byte key.
+
+    Decoded keys are cached along with the environment variable they came
+    from, so changing the variable takes effect immediately.
     """
 
+    # Recently decoded keys, indexed by (device_id, environment variable value)
+    _key_cache = LRUCache(128)
+
     @classmethod
     def _get_key(cls, device_id):
         """Attempt to get a user key from an environment variable
@@ -30,6 +37,11 @@ class EnvAuthProvider(AuthProvider):
             raise NotFoundError("No user key could be found for devices", device_id=device_id, expected_variable_name=var_name)
 
         key_var = os.environ[var_name]
+
+        key = cls._key_cache.get((device_id, key_var))
+        if key is not None:
+            return key
+
         if len(key_var) != 64:
             raise NotFoundError("User key in variable is not the correct length, should be 64 hex characters", device_id=device_id, key_value=key_var)
 
@@ -41,6 +53,7 @@ class EnvAuthProvider(AuthProvider):
         if len(key) != 32:
             raise NotFoundError("User key in variable is not the correct length, should be 64 hex characters", device_id=device_id, key_value=key_var)
 
+        cls._key_cache.put((device_id, key_var), key)
         return key
 
     @classmethod
@@ -171,7 +184,7 @@ class EnvAuthProvider(AuthProvider):
             from Crypto.Cipher import AES
             import Crypto.Util.Counter
         except ImportError:
-            raise NotFoundError
+            raise NotFoundError("pycryptodome must be installed to encrypt or decrypt reports")
 
         ctr = Crypto.Util.Counter.new(128)
 
@@ -212,7 +225,7 @@ class EnvAuthProvider(AuthProvider):
             from Crypto.Cipher import AES
             import Crypto.Util.Counter
         except ImportError:
-            raise NotFoundError
+            raise NotFoundError("pycryptodome must be installed to encrypt or decrypt reports")
 
         # We use AES-128 for encryption
         ctr = Crypto.Util.Counter.new(128)
@@ -0,0 +1,404 @@
+"""Find installed proxy and app classes without importing every module.
+
+Proxy objects and apps are provided by python modules listed in the
+products of components in the ComponentRegistry and by modules registered
+under the iotile.proxy and iotile.app entry points.  Importing all of them
+is slow, so PluginIndex keeps a persistent index of the classes that each
+module provides along with the information needed to match them to a tile
+or device: each proxy's ModuleName() and each app's AppName() and the app
+tags from its MatchInfo().  A module is only imported when one of its
+classes is actually needed.
+
+Every module in the index is stored with a stamp, its file modification
+time or, if its file cannot be found, the version of the distribution that
+provides it.  Modules whose stamp changed and modules that were added to
+the registry or installed since the index was built are imported and
+indexed again, and modules that are no longer present are dropped, so the
+index never needs to be cleared by hand.
+"""
+
+import os
+import sys
+import imp
+import inspect
+import logging
+import threading
+import pkg_resources
+from future.utils import itervalues
+from iotile.core.exceptions import ArgumentError
+from iotile.core.dev.registry import ComponentRegistry
+from iotile.core.utilities.cache_file import default_cache_folder, load_json_cache, save_json_cache
+
+logger = logging.getLogger(__name__)
+
+
+def load_module_classes(path, base_class):
+    """Load a python module and return all classes that inherit from a given base.
+
+    Args:
+        path (str): The path to the python module (.py or .pyc) or package.
+        base_class (type): The base class to search for.
+
+    Returns:
+        list of type: All subclasses of base_class defined in the module.
+    """
+
+    folder, basename = os.path.split(path)
+    basename, ext = os.path.splitext(basename)
+    if ext != '.py' and ext != '.pyc' and ext != "":
+        raise ArgumentError("Attempted to load module is not a python package or module (.py or .pyc)", path=path)
+
+    try:
+        fileobj, pathname, description = imp.find_module(basename, [folder])
+
+        #Don't load modules twice
+        if basename in sys.modules:
+            mod = sys.modules[basename]
+        else:
+            mod = imp.load_module(basename, fileobj, pathname, description)
+    except ImportError as exc:
+        logger.exception("Error importing module: %s looking for class %s", path, base_class)
+        raise ArgumentError("Could not import module in order to load external proxy modules", module_path=path, parent_directory=folder, module_name=basename, error=str(exc))
+
+    return _find_subclasses(mod, base_class)
+
+
+def _find_subclasses(mod, base_class):
+    return [x for x in itervalues(mod.__dict__) if inspect.isclass(x) and issubclass(x, base_class) and x != base_class]
+
+
+def _file_stamp(path):
+    try:
+        return "%.6f" % os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _entry_stamp(entry):
+    """Find the stamp of an entry point's module without importing it."""
+
+    dist = entry.dist
+    if dist is None:
+        return None
+
+    if dist.location is not None:
+        base = os.path.join(dist.location, *entry.module_name.split('.'))
+        for path in (base + '.py', os.path.join(base, '__init__.py')):
+            stamp = _file_stamp(path)
+            if stamp is not None:
+                return stamp
+
+    return "%s==%s" % (dist.project_name, dist.version)
+
+
+class _Source(object):
+    """A python module that may provide proxy or app classes."""
+
+    def __init__(self, key, stamp, loader):
+        self.key = key
+        self.stamp = stamp
+        self.loader = loader
+
+
+def _describe_proxy(proxy):
+    try:
+        module_name = proxy.ModuleName()
+    except Exception:  #pylint: disable=broad-except;We don't want this to die if someone loads a misbehaving plugin
+        logger.exception("Error importing misbehaving proxy module, skipping.")
+        module_name = None
+
+    return {'name': proxy.__name__, 'module_name': module_name}
+
+
+def _describe_app(app):
+    try:
+        tags = [x[0] for x in app.MatchInfo()]
+        name = app.AppName()
+    except Exception:  #pylint: disable=broad-except;We don't want this to die if someone loads a misbehaving plugin
+        logger.exception("Error importing misbehaving app module, skipping.")
+        return None
+
+    return {'name': app.__name__, 'app_name': name, 'tags': tags}
+
+
+class PluginIndex(object):
+    """An index of the proxy and app classes installed on this system.
+
+    The set of installed modules is determined the first time a lookup is
+    made, so a new PluginIndex should be created to see components that are
+    added to the registry later.  Imported classes are cached for the life
+    of the process and shared between PluginIndex objects.
+
+    Args:
+        cache_file (str): Optional path to the file used to save the index
+            between processes.  If not given, a file in the current virtual
+            environment or the IOTile settings directory is used.
+        use_cache (bool): Whether to load and save the index file at all.
+    """
+
+    IndexFileName = 'plugin_index.json'
+    IndexVersion = 1
+
+    _loaded_lock = threading.Lock()
+    _loaded = {}
+
+    def __init__(self, cache_file=None, use_cache=True):
+        from iotile.core.hw.proxy.proxy import TileBusProxyObject
+        from iotile.core.hw.app import IOTileApp
+
+        if cache_file is None:
+            cache_file = os.path.join(default_cache_folder(), self.IndexFileName)
+
+        self.cache_file = cache_file
+        self.use_cache = use_cache
+        self._lock = threading.Lock()
+        self._bases = {'proxy': TileBusProxyObject, 'app': IOTileApp}
+        self._describe = {'proxy': _describe_proxy, 'app': _describe_app}
+
+        self._sources = None
+        self._entries = None
+
+        self._proxy_classes = None
+        self._proxy_names = None
+        self._app_tags = None
+        self._app_names = None
+
+    @classmethod
+    def ClearCache(cls):  # pylint: disable=C0103; class methods are capitalized when expected to be invoked on types
+        """Forget all classes that were imported by any PluginIndex in this process."""
+
+        with cls._loaded_lock:
+            cls._loaded = {}
+
+    def _find_sources(self):
+        """List the modules that could provide proxies or apps in priority order."""
+
+        reg = ComponentRegistry()
+        components = [reg.find_component(x) for x in reg.list_components()]
+
+        sources = []
+        for kind in ('proxy', 'app'):
+            base = self._bases[kind]
+
+            for component in components:
+                paths = component.proxy_modules() if kind == 'proxy' else component.app_modules()
+
+                for path in paths:
+                    loader = lambda path=path, base=base: load_module_classes(path, base)
+                    sources.append(_Source("%s:file:%s" % (kind, path), _file_stamp(path), loader))
+
+            for entry in pkg_resources.iter_entry_points('iotile.%s' % kind):
+                loader = lambda entry=entry, base=base: _find_subclasses(entry.load(), base)
+                sources.append(_Source("%s:entry:%s" % (kind, str(entry)), _entry_stamp(entry), loader))
+
+        return sources
+
+    def refresh(self):
+        """Find all installed modules and index any that are not already indexed.
+
+        This is done automatically the first time a lookup is made.
+        """
+
+        with self._lock:
+            self._refresh()
+
+    def _ensure_index(self):
+        if self._entries is None:
+            with self._lock:
+                if self._entries is None:
+                    self._refresh()
+
+    def _refresh(self):
+        sources = self._find_sources()
+        stored = self._load_stored()
+
+        entries = {}
+        dirty = len(stored) != len(sources)
+        for source in sources:
+            entry = stored.get(source.key)
+            if entry is None or source.stamp is None or entry.get('stamp') != source.stamp:
+                kind = source.key.partition(':')[0]
+                classes = self._load_source(source)
+                entry = {'stamp': source.stamp, 'classes': [self._describe[kind](x) for x in classes]}
+                dirty = True
+
+            entries[source.key] = entry
+
+        if dirty:
+            self._save_stored(entries)
+
+        self._sources = sources
+        self._entries = entries
+        self._build_maps()
+
+    def _load_stored(self):
+        if not self.use_cache:
+            return {}
+
+        data = load_json_cache(self.cache_file)
+        if not isinstance(data, dict) or data.get('version') != self.IndexVersion:
+            return {}
+
+        return data.get('sources', {})
+
+    def _save_stored(self, entries):
+        if not self.use_cache:
+            return
+
+        data = {'version': self.IndexVersion, 'sources': entries}
+        if not save_json_cache(self.cache_file, data):
+            logger.warning("Could not save proxy and app index to %s", self.cache_file)
+
+    def _load_source(self, source):
+        """Import the classes from a source, using the process wide cache if possible."""
+
+        cache_key = (source.key, source.stamp)
+
+        with self._loaded_lock:
+            classes = self._loaded.get(cache_key)
+
+        if classes is None:
+            classes = source.loader()
+
+            with self._loaded_lock:
+                self._loaded[cache_key] = classes
+
+        return classes
+
+    def _build_maps(self):
+        """Decide which class provides each name without importing anything."""
+
+        self._proxy_classes = {}
+        self._proxy_names = {}
+        self._app_tags = {}
+        self._app_names = {}
+
+        for source in self._sources:
+            kind = source.key.partition(':')[0]
+
+            for info in self._entries[source.key]['classes']:
+                if info is None:
+                    continue
+
+                if kind == 'proxy':
+                    # The first proxy class with a given name takes priority
+                    if info['name'] in self._proxy_classes:
+                        continue
+
+                    self._proxy_classes[info['name']] = source
+                    if info['module_name'] is not None:
+                        self._proxy_names.setdefault(info['module_name'], []).append((info['name'], source))
+                else:
+                    for tag in info['tags']:
+                        sources = self._app_tags.setdefault(tag, [])
+                        if source not in sources:
+                            sources.append(source)
+
+                    if info['app_name'] in self._app_names:
+                        logger.warning("Added an app module with an existing name, overriding previous app, name=%s", info['app_name'])
+
+                    self._app_names[info['app_name']] = (info['name'], source)
+
+    def _get_class(self, name, source):
+        for cls in self._load_source(source):
+            if cls.__name__ == name:
+                return cls
+
+        return None
+
+    def proxy_names(self):
+        """List the ModuleName of every installed proxy class.
+
+        Returns:
+            list of str: The names.
+        """
+
+        self._ensure_index()
+        return list(self._proxy_names)
+
+    def find_proxies(self, module_name):
+        """Find all proxy classes for a tile with the given module name.
+
+        Args:
+            module_name (str): The 6 character name reported by the tile.
+
+        Returns:
+            list of type: The matching proxy classes in priority order.
+        """
+
+        self._ensure_index()
+
+        classes = [self._get_class(name, source) for name, source in self._proxy_names.get(module_name, [])]
+        return [x for x in classes if x is not None]
+
+    def find_proxy_class(self, class_name):
+        """Find a proxy class by its python class name.
+
+        Args:
+            class_name (str): The name of the class.
+
+        Returns:
+            type: The proxy class or None if there is no such class.
+        """
+
+        self._ensure_index()
+
+        source = self._proxy_classes.get(class_name)
+        if source is None:
+            return None
+
+        return self._get_class(class_name, source)
+
+    def app_names(self):
+        """List the AppName of every installed app.
+
+        Returns:
+            list of str: The names.
+        """
+
+        self._ensure_index()
+        return list(self._app_names)
+
+    def find_named_app(self, app_name):
+        """Find an app class by its AppName.
+
+        Args:
+            app_name (str): The name of the app.
+
+        Returns:
+            type: The app class or None if there is no such app.
+        """
+
+        self._ensure_index()
+
+        if app_name not in self._app_names:
+            return None
+
+        return self._get_class(*self._app_names[app_name])
+
+    def find_apps(self, app_tag):
+        """Find all apps that could match a device with the given app tag.
+
+        Args:
+            app_tag (int): The app tag reported by the device.
+
+        Returns:
+            list of (SemanticVersionRange, int, type): The version range and
+                match quality of each app that supports the tag.
+        """
+
+        self._ensure_index()
+
+        matches = []
+        for source in self._app_tags.get(app_tag, []):
+            for info in self._entries[source.key]['classes']:
+                if info is None or app_tag not in info['tags']:
+                    continue
+
+                app = self._get_class(info['name'], source)
+                if app is None:
+                    continue
+
+                matches.extend((ver_range, quality, app) for tag, ver_range, quality in app.MatchInfo() if tag == app_tag)
+
+        return matches
@@ -6,24 +6,18 @@
 # Modifications to this file from the original created at WellDone International
 # are copyright Arch Systems Inc.
 from builtins import range
-from functools import reduce
 import time
-import inspect
-import os.path
-import imp
 import binascii
-import sys
 import logging
 from queue import Empty
+from multiprocessing.pool import ThreadPool
 import pkg_resources
-from future.utils import itervalues
 
 from iotile.core.dev.semver import SemanticVersion
 from iotile.core.hw.transport import *
 from iotile.core.hw.exceptions import *
 from iotile.core.exceptions import *
 from typedargs.annotate import annotated, param, return_type, finalizer, docannotate, context
-from iotile.core.dev.registry import ComponentRegistry
 from iotile.core.hw.transport.adapterstream import AdapterCMDStream
 from iotile.core.dev.config import ConfigManager
 from iotile.core.hw.debug import DebugManager
@@ -31,6 +25,7 @@ from iotile.core.utilities.linebuffer_ui import LinebufferUI
 
 from .proxy import TileBusProxyObject
 from .app import IOTileApp
+from .discovery import PluginIndex, load_module_classes
 
 
 @context("HardwareManager")
@@ -81,29 +76,47 @@ class HardwareManager(object):
                 raise ArgumentError("No port given and no core:default-port config variable set", suggestion="Specify the port to use to connect to the IOTile devices")
 
         transport, _, arg = port.partition(':')
+        if arg == "":
+            arg = None
 
-        self.transport = transport
-        self.port = None
-        if arg != "":
-            self.port = arg
+        # Installed proxies and apps are only found when they are first needed
+        self._init_state(transport, arg, record, None, PluginIndex())
+
+    def _init_state(self, transport, port, record, stream, plugins):
+        """Initialize the per instance state of a HardwareManager.
+
+        Args:
+            transport (str): The name of the transport to use.
+            port (str): The transport specific port or None.
+            record (str): Optional file to record all RPC calls to.
+            stream (CMDStream): The stream to use or None to create a new one.
+            plugins (PluginIndex): The installed proxies and apps to use.
+        """
 
+        self.transport = transport
+        self.port = port
         self.record = record
 
-        self.stream = self._create_stream()
+        if stream is None:
+            stream = self._create_stream()
+
+        self.stream = stream
 
         self._stream_queue = None
         self._trace_queue = None
         self._broadcast_queue = None
         self._trace_data = bytearray()
+        self._handles = []
 
-        self._proxies = {'TileBusProxyObject': TileBusProxyObject}
-        self._name_map = {TileBusProxyObject.ModuleName(): [TileBusProxyObject]}
+        self._plugins = plugins
 
-        self._known_apps = {}
-        self._named_apps = {}
+    @classmethod
+    def _FromStream(cls, parent, stream):  # pylint: disable=C0103; class methods are capitalized when expected to be invoked on types
+        """Create a HardwareManager that uses an existing stream and another HardwareManager's plugins."""
 
-        self._setup_proxies()
-        self._setup_apps()
+        handle = cls.__new__(cls)
+        handle._init_state(parent.transport, parent.port, None, stream, parent._plugins)  #pylint: disable=protected-access;Initializing a new instance of this class
+        return handle
 
     @classmethod
     def RegisterDevelopmentProxy(cls, proxy_obj):  # pylint: disable=C0103; class methods are capitalized when expected to be invoked on types
@@ -159,73 +172,6 @@ class HardwareManager(object):
 
         HardwareManager.DevelopmentAppNames[app.AppName()] = app
 
-    def _setup_proxies(self):
-        """Load in proxy module objects for all of the registered components on this system."""
-
-        # Find all of the registered IOTile components and see if we need to add any proxies for them
-        reg = ComponentRegistry()
-        modules = reg.list_components()
-
-        proxies = reduce(lambda x, y: x+y, [reg.find_component(x).proxy_modules() for x in modules], [])
-        proxy_classes = []
-        for prox in proxies:
-            proxy_classes += self._load_module_classes(prox, TileBusProxyObject)
-
-        # Find all installed proxy objects through registered entry points
-        for entry in pkg_resources.iter_entry_points('iotile.proxy'):
-            mod = entry.load()
-            proxy_classes += [x for x in itervalues(mod.__dict__) if inspect.isclass(x) and issubclass(x, TileBusProxyObject) and x != TileBusProxyObject]
-
-        for obj in proxy_classes:
-            if obj.__name__ in self._proxies:
-                continue #Don't readd proxies that we already know about
-
-            self._proxies[obj.__name__] = obj
-
-            #Check if this object matches a specific shortened name so that we can
-            #automatically match a hw module to a proxy without user intervention
-            try:
-                short_name = obj.ModuleName()
-                if short_name in self._name_map:
-                    self._name_map[short_name].append(obj)
-                else:
-                    self._name_map[short_name] = [obj]
-            except Exception:  #pylint: disable=broad-except;We don't want this to die if someone loads a misbehaving plugin
-                self.logger.exception("Error importing misbehaving proxy module, skipping.")
-
-    def _setup_apps(self):
-        """Load in all iotile app objects for all registered or installed components on this system."""
-
-        reg = ComponentRegistry()
-        modules = reg.list_components()
-
-        apps = reduce(lambda x, y: x+y, [reg.find_component(x).app_modules() for x in modules], [])
-        app_classes = []
-        for app in apps:
-            app_classes += self._load_module_classes(app, IOTileApp)
-
-        # Find all installed proxy objects through registered entry points
-        for entry in pkg_resources.iter_entry_points('iotile.app'):
-            mod = entry.load()
-            app_classes += [x for x in itervalues(mod.__dict__) if inspect.isclass(x) and issubclass(x, IOTileApp) and x != IOTileApp]
-
-        for app in app_classes:
-            try:
-                matches = app.MatchInfo()
-                name = app.AppName()
-                for tag, ver_range, quality in matches:
-                    if tag not in self._known_apps:
-                        self._known_apps[tag] = []
-
-                    self._known_apps[tag].append((ver_range, quality, app))
-
-                if name in self._named_apps:
-                    self.logger.warn("Added an app module with an existing name, overriding previous app, name=%s", name)
-
-                self._named_apps[name] = app
-            except Exception:  #pylint: disable=broad-except;We don't want this to die if someone loads a misbehaving plugin
-                self.logger.exception("Error importing misbehaving app module, skipping.")
-
     @param("address", "integer", "positive", desc="numerical address of module to get")
     @param("basic", "bool", desc="return a basic global proxy rather than a specialized one")
     def get(self, address, basic=False):
@@ -248,7 +194,7 @@ class HardwareManager(object):
         # Now create the appropriate proxy object based on the name and version of the tile
         tile_type = self.get_proxy(name)
         if tile_type is None:
-            raise HardwareError("Could not find proxy object for tile", name="'{}'".format(name), known_names=self._name_map.keys())
+            raise HardwareError("Could not find proxy object for tile", name="'{}'".format(name), known_names=self._known_proxy_names())
 
         tile = tile_type(self.stream, address)
         tile._hwmanager = self
@@ -305,10 +251,10 @@ class HardwareManager(object):
             if name in self.DevelopmentAppNames:
                 app_class = self.DevelopmentAppNames[name]
             else:
-                app_class = self._named_apps.get(name)
+                app_class = self._plugins.find_named_app(name)
         else:
             best_match = None
-            matching_tags = self._known_apps.get(app_tag, [])
+            matching_tags = self._plugins.find_apps(app_tag)
             dev_tags = self.DevelopmentApps.get(app_tag, [])
 
             for (ver_range, quality, app) in matching_tags + dev_tags:
@@ -322,7 +268,7 @@ class HardwareManager(object):
                 app_class = best_match[1]
 
         if app_class is None:
-            raise HardwareError("Could not find matching application for device", app_tag=app_tag, explicit_app=name, installed_apps=[x for x in self._named_apps])
+            raise HardwareError("Could not find matching application for device", app_tag=app_tag, explicit_app=name, installed_apps=self._plugins.app_names())
 
         app = app_class(self, (app_tag, app_version), (os_tag, os_version), device_id)
         return app
@@ -353,6 +299,108 @@ class HardwareManager(object):
 
         self.stream.connect_direct(connection_string)
 
+    def connect_many(self, device_uuids, wait=None, max_concurrent=None):
+        """Connect to many devices at once by their UUIDs.
+
+        Each device gets its own HardwareManager handle that shares this
+        HardwareManager's DeviceAdapter and installed proxies and apps.  A
+        handle works exactly like a HardwareManager connected to a single
+        device, with its own proxy objects, report and trace queues and
+        reconnection state, so handles can be used from separate threads to
+        work with many devices concurrently.
+
+        The connections are made in parallel.  If any connection fails, all
+        of the connections that succeeded are closed again and a
+        HardwareError is raised.
+
+        Handles should be closed with their close() method when they are no
+        longer needed.  Any handles still open are closed when this
+        HardwareManager is closed.
+
+        This is only supported by transports that are implemented as a
+        DeviceAdapter.
+
+        Args:
+            device_uuids (list of int): The UUIDs of the devices to connect to.
+            wait (float): Optional amount of time to wait for devices to show up
+                in a scan before connecting.
+            max_concurrent (int): The maximum number of connections to make at
+                the same time.  Defaults to connecting to all devices at once.
+
+        Returns:
+            list of HardwareManager: One connected handle per device, in the
+                same order as device_uuids.
+        """
+
+        devices = {x['uuid']: x for x in self.stream.scan(wait=wait)}
+
+        missing = [x for x in device_uuids if x not in devices]
+        if len(missing) > 0:
+            raise HardwareError("Could not find devices to connect to by UUID", missing=missing)
+
+        return self.connect_many_direct([devices[x]['connection_string'] for x in device_uuids], max_concurrent=max_concurrent)
+
+    def connect_many_direct(self, connection_strings, max_concurrent=None):
+        """Connect to many devices at once using connection strings.
+
+        This function works like connect_many() except that the devices are
+        specified using DeviceAdapter specific connection strings.
+
+        Args:
+            connection_strings (list of str): The devices to connect to.
+            max_concurrent (int): The maximum number of connections to make at
+                the same time.  Defaults to connecting to all devices at once.
+
+        Returns:
+            list of HardwareManager: One connected handle per device, in the
+                same order as connection_strings.
+        """
+
+        if not hasattr(self.stream, 'share'):
+            raise StreamOperationNotSupportedError(command="connect_many")
+
+        if len(connection_strings) == 0:
+            return []
+
+        if max_concurrent is None:
+            max_concurrent = len(connection_strings)
+
+        handles = [self._create_handle(self.stream.share()) for _x in connection_strings]
+
+        def _connect(args):
+            handle, connection_string = args
+
+            try:
+                handle.connect_direct(connection_string)
+                return None
+            except Exception as exc:  #pylint: disable=broad-except;Every connection must be closed if any of them fail
+                return str(exc)
+
+        pool = ThreadPool(min(max_concurrent, len(handles)))
+        try:
+            errors = pool.map(_connect, zip(handles, connection_strings))
+        finally:
+            pool.close()
+            pool.join()
+
+        failures = {conn: err for conn, err in zip(connection_strings, errors) if err is not None}
+        if len(failures) > 0:
+            for handle in handles:
+                handle.close()
+
+            raise HardwareError("Could not connect to all devices", failures=failures)
+
+        return handles
+
+    def _create_handle(self, stream):
+        """Create a HardwareManager that uses the given stream and our proxies."""
+
+        handle = HardwareManager._FromStream(self, stream)
+
+        self._handles = [x for x in self._handles if x.stream.opened]
+        self._handles.append(handle)
+        return handle
+
     @annotated
     def disconnect(self):
         """Attempt to disconnect from a device
@@ -754,36 +802,23 @@ class HardwareManager(object):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        self.stream.close()
+        self.close()
         return False
 
     @finalizer
     def close(self):
+        for handle in self._handles:
+            if handle.stream.opened:
+                handle.close()
+
+        self._handles = []
         self.stream.close()
 
     @classmethod
     def _load_module_classes(cls, path, base_class):
         """Load a python module and return all classes that inherit from a given base."""
 
-        folder, basename = os.path.split(path)
-        basename, ext = os.path.splitext(basename)
-        if ext != '.py' and ext != '.pyc' and ext != "":
-            raise ArgumentError("Attempted to load module is not a python package or module (.py or .pyc)", path=path)
-
-        try:
-            fileobj, pathname, description = imp.find_module(basename, [folder])
-
-            #Don't load modules twice
-            if basename in sys.modules:
-                mod = sys.modules[basename]
-            else:
-                mod = imp.load_module(basename, fileobj, pathname, description)
-        except ImportError as exc:
-            cls.logger.exception("Error importing module: %s looking for class %s", path, base_class)
-            raise ArgumentError("Could not import module in order to load external proxy modules", module_path=path, parent_directory=folder, module_name=basename, error=str(exc))
-
-        # Find all classes in this module that inherit from the given base class
-        return [x for x in itervalues(mod.__dict__) if inspect.isclass(x) and issubclass(x, base_class) and x != base_class]
+        return load_module_classes(path, base_class)
 
     @return_type("list(basic_dict)")
     @param("wait", "float", desc="Time to wait for devices to show up before returning")
@@ -822,10 +857,17 @@ class HardwareManager(object):
         if short_name in HardwareManager.DevelopmentProxies:
             return HardwareManager.DevelopmentProxies[short_name][0]
 
-        if short_name not in self._name_map:
+        if short_name == TileBusProxyObject.ModuleName():
+            return TileBusProxyObject
+
+        proxies = self._plugins.find_proxies(short_name)
+        if len(proxies) == 0:
             return None
 
-        return self._name_map[short_name][0]
+        return proxies[0]
+
+    def _known_proxy_names(self):
+        return [TileBusProxyObject.ModuleName()] + self._plugins.proxy_names()
 
     def _create_proxy(self, proxy, address):
         """
@@ -833,10 +875,14 @@ class HardwareManager(object):
         at the given address.
         """
 
-        if proxy not in self._proxies:
-            raise UnknownModuleTypeError("unknown proxy module specified", module_type=proxy, known_types=self._proxies.keys())
+        if proxy == 'TileBusProxyObject':
+            proxy_class = TileBusProxyObject
+        else:
+            proxy_class = self._plugins.find_proxy_class(proxy)
+
+        if proxy_class is None:
+            raise UnknownModuleTypeError("unknown proxy module specified", module_type=proxy)
 
-        proxy_class = self._proxies[proxy]
         return proxy_class(self.stream, address)
 
     def _create_stream(self):
@@ -11,6 +11,7 @@
 from builtins import range
 from iotile.core.hw.commands import RPCCommand
 from iotile.core.hw.exceptions import *
+from iotile.core.hw.retry import DEFAULT_RETRY_POLICY
 from iotile.core.utilities.typedargs import return_type, annotated, param, context
 from time import sleep
 from iotile.core.utilities.packed import unpack
@@ -38,13 +39,51 @@ class TileBusProxyObject(object):
         according to the result_type kw argument.  Unless raise keyword
         is passed with value False, raise an RPCException if the command
         is not successful.
+
+        If the module is busy, the RPC is retried according to the
+        retry_policy kw argument, or the stream's retry_policy if it is not
+        given, and ModuleBusyError is raised if the module is still busy once
+        the policy's deadline passes.  While this module is busy, RPCs sent
+        to it from other threads wait for it to become free.
         """
 
+        policy = kw.pop('retry_policy', None)
+        if policy is None:
+            policy = getattr(self.stream, 'retry_policy', DEFAULT_RETRY_POLICY)
+
+        tracker = getattr(self.stream, 'busy_tracker', None)
+
         if 'arg_format' in kw:
-            packed_args = struct.pack("<{}".format(kw['arg_format']), *args)
-            status, payload = self.stream.send_rpc(self.addr, feature, cmd, packed_args, **kw)
-        else:
-            status, payload = self.stream.send_rpc(self.addr, feature, cmd, *args, **kw)
+            args = (struct.pack("<{}".format(kw['arg_format']), *args),)
+
+        retry = None
+        while True:
+            if tracker is not None:
+                wait = tracker.wait_time(self.addr)
+                if wait > 0:
+                    sleep(wait)
+
+            try:
+                status, payload = self.stream.send_rpc(self.addr, feature, cmd, *args, **kw)
+                break
+            except ModuleBusyError:
+                if retry is None:
+                    retry = policy.start()
+
+                delay = retry.next_delay()
+                if delay is None:
+                    if tracker is not None:
+                        tracker.record_done(self.addr, retry.retries, False)
+
+                    raise ModuleBusyError(self.addr, retries=retry.retries, retry_delay=retry.total_delay)
+
+                if tracker is not None:
+                    tracker.record_busy(self.addr, delay)
+
+                sleep(delay)
+
+        if tracker is not None:
+            tracker.record_done(self.addr, 0 if retry is None else retry.retries, True)
 
         unpack_flag = False
         if "result_type" in kw:
@@ -55,24 +94,11 @@ class TileBusProxyObject(object):
         else:
             res_type = (0, False)
 
-        try:
-            res = self._parse_rpc_result(status, payload, *res_type, command=(feature << 8) | cmd)
-            if unpack_flag:
-                return unpack("<%s" % kw["result_format"], res['buffer'])
-
-            return res
-        except ModuleBusyError:
-            pass
-
-        if "retries" not in kw:
-            kw['retries'] = 10
-
-        #Sleep 100 ms and try again unless we've exhausted our retry attempts
-        if kw["retries"] > 0:
-            kw['retries'] -= 1
+        res = self._parse_rpc_result(status, payload, *res_type, command=(feature << 8) | cmd)
+        if unpack_flag:
+            return unpack("<%s" % kw["result_format"], res['buffer'])
 
-            sleep(0.1)
-            return self.rpc(feature, cmd, *args, **kw)
+        return res
 
     @return_type("string")
     def hardware_version(self):
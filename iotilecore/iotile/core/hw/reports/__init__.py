@@ -4,6 +4,13 @@ from .signed_list_format import SignedListReport
 from .broadcast import BroadcastReport
 from .parser import IOTileReportParser
 from .flexible_dictionary import FlexibleDictionaryReport
+from .lazy_readings import LazyReadingList
+from .pipeline import ReportVerificationPipeline
+from .reading_batch import ReadingBatch, BatchReading, pack_readings
+from .report_builder import ReportBuilder
+from .archive import ReportArchive, ReportArchiveWriter
 
 
-__all__ = ['IndividualReadingReport', 'IOTileReport', 'IOTileReading', 'BroadcastReport', 'SignedListReport', 'FlexibleDictionaryReport', 'IOTileReportParser']
+__all__ = ['IndividualReadingReport', 'IOTileReport', 'IOTileReading', 'BroadcastReport', 'SignedListReport', 'FlexibleDictionaryReport', 'IOTileReportParser', 'LazyReadingList',
+           'ReportVerificationPipeline', 'ReadingBatch', 'BatchReading',
+           'pack_readings', 'ReportBuilder', 'ReportArchive', 'ReportArchiveWriter']
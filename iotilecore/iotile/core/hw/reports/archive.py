@@ -0,0 +1,509 @@
+"""An append only archive file of received reports with a searchable index.
+
+An archive consists of two files: a data file containing each report's
+binary encoding along with a small record header, and a sidecar index file
+(the data file path with .idx appended) containing one fixed size entry per
+report.  Searching the archive for a specific device, time window or range of
+reading ids only needs to read the index, and reports are read from the
+memory mapped data file only when they are requested.
+
+Data file layout:
+    header: 4s magic (b'IORA'), H version, H reserved
+    records: L length, L format, L origin, L report_id, L lowest_id,
+             L highest_id, d received_time (seconds since the unix epoch, UTC)
+             followed by the encoded report
+
+Index file layout:
+    header: 4s magic (b'IORI'), H version, H reserved
+    entries: Q record offset, L length, L format, L origin, L report_id,
+             L lowest_id, L highest_id, d received_time
+
+The format of a report is the format code that IOTileReportParser uses to
+decode it, or FLEXIBLE_FORMAT for FlexibleDictionaryReports, which have no
+format code of their own.
+
+The index can always be rebuilt from the data file.  If it is missing or
+does not cover every record in the data file, for example because a
+process crashed between writing the two files or is still writing them,
+ReportArchive scans the missing records from the data file in memory and
+ReportArchiveWriter adds their entries back to the index before appending.
+Readers never modify either file.
+"""
+
+from builtins import range
+import os
+import mmap
+import struct
+import bisect
+import datetime
+from array import array
+from collections import namedtuple
+from iotile.core.exceptions import ArgumentError, DataError
+from .report import IOTileReading
+from .parser import IOTileReportParser
+from .flexible_dictionary import FlexibleDictionaryReport
+from .reading_batch import UINT32_TYPECODE
+
+ArchiveEntry = namedtuple('ArchiveEntry', ['offset', 'length', 'format', 'origin', 'report_id', 'lowest_id', 'highest_id',
+                                           'received_time'])
+
+# Outside of the single byte format codes used by IOTileReportParser
+FLEXIBLE_FORMAT = 0x100
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+_DATA_MAGIC = b'IORA'
+_INDEX_MAGIC = b'IORI'
+_VERSION = 2
+
+_FILE_HEADER = struct.Struct("<4sHH")
+_RECORD_HEADER = struct.Struct("<LLLLLLd")
+_INDEX_ENTRY = struct.Struct("<QLLLLLLd")
+
+# Just the origin and received_time of an index entry
+_INDEX_KEY = struct.Struct("<16xL12xd")
+
+
+def _to_timestamp(received_time):
+    return (received_time - _EPOCH).total_seconds()
+
+
+def _from_timestamp(timestamp):
+    return _EPOCH + datetime.timedelta(seconds=timestamp)
+
+
+def _check_header(data, magic, path):
+    if len(data) < _FILE_HEADER.size:
+        raise DataError("Report archive file is truncated", path=path)
+
+    found_magic, version, _reserved = _FILE_HEADER.unpack_from(data, 0)
+    if found_magic != magic or version != _VERSION:
+        raise DataError("File is not a valid report archive", path=path, magic=found_magic, version=version)
+
+
+def _report_id_range(report):
+    lowest_id = getattr(report, 'lowest_id', None)
+    highest_id = getattr(report, 'highest_id', None)
+
+    if lowest_id is not None and highest_id is not None:
+        return lowest_id, highest_id
+
+    ids = [x.reading_id for x in report.visible_readings if x.reading_id != IOTileReading.InvalidReadingID]
+    if len(ids) == 0:
+        return IOTileReading.InvalidReadingID, IOTileReading.InvalidReadingID
+
+    return min(ids), max(ids)
+
+
+def _record_end(entry):
+    return entry.offset + _RECORD_HEADER.size + entry.length
+
+
+def _scan_index(data_path):
+    """Find how much of an archive's index is valid without modifying it.
+
+    Index entries that point past the end of the data file are not valid
+    and any complete records after the last valid entry are missing from
+    the index.  Only the end of the index is read since entries are stored
+    in the same order as their records.
+
+    Returns:
+        (bool, int, list of ArchiveEntry, int): Whether the index file has a
+            valid header, the number of valid entries at the start of it, the
+            entries for complete records that are missing from it and the
+            offset just past the last complete record in the data file.
+    """
+
+    index_path = data_path + '.idx'
+    data_size = os.path.getsize(data_path)
+
+    count = 0
+    end = _FILE_HEADER.size
+    valid = False
+    if os.path.isfile(index_path):
+        with open(index_path, "rb") as infile:
+            try:
+                _check_header(infile.read(_FILE_HEADER.size), _INDEX_MAGIC, index_path)
+                valid = True
+            except DataError:
+                pass
+
+            if valid:
+                count = (os.path.getsize(index_path) - _FILE_HEADER.size) // _INDEX_ENTRY.size
+
+            while count > 0:
+                infile.seek(_FILE_HEADER.size + (count - 1)*_INDEX_ENTRY.size)
+                entry = ArchiveEntry(*_INDEX_ENTRY.unpack(infile.read(_INDEX_ENTRY.size)))
+                if _record_end(entry) <= data_size:
+                    end = _record_end(entry)
+                    break
+
+                count -= 1
+
+    # Scan any records in the data file that are missing from the index
+    missing = []
+    with open(data_path, "rb") as infile:
+        _check_header(infile.read(_FILE_HEADER.size), _DATA_MAGIC, data_path)
+
+        while end + _RECORD_HEADER.size <= data_size:
+            infile.seek(end)
+            entry = ArchiveEntry(end, *_RECORD_HEADER.unpack(infile.read(_RECORD_HEADER.size)))
+            if _record_end(entry) > data_size:
+                break
+
+            missing.append(entry)
+            end = _record_end(entry)
+
+    return valid, count, missing, end
+
+
+def _repair_index(data_path):
+    """Make sure the index of an archive covers every record in its data file.
+
+    Invalid entries at the end of the index are dropped and entries are
+    added for any complete records that are missing from it.  This must
+    only be called by the process writing the archive.
+
+    Returns:
+        int: The offset just past the last complete record in the data file.
+    """
+
+    index_path = data_path + '.idx'
+    valid, count, missing, end = _scan_index(data_path)
+
+    index_size = _FILE_HEADER.size + count*_INDEX_ENTRY.size
+    if not valid:
+        with open(index_path, "wb") as outfile:
+            outfile.write(_FILE_HEADER.pack(_INDEX_MAGIC, _VERSION, 0))
+    elif os.path.getsize(index_path) == index_size and len(missing) == 0:
+        return end
+
+    with open(index_path, "r+b") as outfile:
+        outfile.truncate(index_size)
+        outfile.seek(index_size)
+        for entry in missing:
+            outfile.write(_INDEX_ENTRY.pack(*entry))
+
+    return end
+
+
+class _TimeIndex(object):
+    """Index entry numbers sorted by received time so time windows can be bisected.
+
+    Args:
+        entries (array): The entry numbers in the order they were added.
+        times (array): The received time of each entry, in the same order.
+    """
+
+    def __init__(self, entries, times):
+        if any(times[i] > times[i + 1] for i in range(0, len(times) - 1)):
+            order = sorted(range(0, len(times)), key=times.__getitem__)
+            entries = array(entries.typecode, [entries[i] for i in order])
+            times = array(times.typecode, [times[i] for i in order])
+
+        self.entries = entries
+        self.times = times
+
+    def find(self, start, end):
+        """Find the entries received in a time window.
+
+        Args:
+            start (float): The earliest timestamp to include or None.
+            end (float): The timestamp to stop before or None.
+
+        Returns:
+            list of int: The matching entry numbers in the order they were added.
+        """
+
+        low = 0
+        high = len(self.times)
+        if start is not None:
+            low = bisect.bisect_left(self.times, start)
+        if end is not None:
+            high = bisect.bisect_left(self.times, end, low)
+
+        return sorted(self.entries[low:high])
+
+
+class ReportArchiveWriter(object):
+    """Append reports to a report archive.
+
+    If the archive already exists, new reports are added to the end of it.
+
+    Args:
+        path (str): The path to the archive data file.  The index is stored
+            next to it with .idx appended to the name.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.known_formats = IOTileReportParser._build_type_map()
+
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as outfile:
+                outfile.write(_FILE_HEADER.pack(_DATA_MAGIC, _VERSION, 0))
+
+        # Make sure the index is complete before appending to it
+        self._offset = _repair_index(path)
+
+        # Drop any partially written record at the end of the data file
+        self._data = open(path, "r+b")
+        self._data.truncate(self._offset)
+        self._data.seek(self._offset)
+        self._index = open(path + '.idx', "ab")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def append(self, report):
+        """Add a report to the end of the archive.
+
+        Args:
+            report (IOTileReport): The report to add.  It must be a
+                FlexibleDictionaryReport or in a format that can be decoded
+                by IOTileReportParser.
+
+        Returns:
+            ArchiveEntry: The index entry for the report.
+        """
+
+        if self._data is None:
+            raise ArgumentError("Attempted to append to a closed report archive", path=self.path)
+
+        encoded = bytes(report.encode())
+        if isinstance(report, FlexibleDictionaryReport):
+            report_format = FLEXIBLE_FORMAT
+        elif len(encoded) > 0 and bytearray(encoded[:1])[0] in self.known_formats:
+            report_format = bytearray(encoded[:1])[0]
+        else:
+            raise ArgumentError("Report format cannot be stored in a report archive", report=str(report))
+
+        origin = report.origin
+        if origin is None:
+            origin = 0
+
+        report_id = getattr(report, 'report_id', IOTileReading.InvalidReadingID)
+        lowest_id, highest_id = _report_id_range(report)
+
+        entry = ArchiveEntry(self._offset, len(encoded), report_format, origin, report_id, lowest_id, highest_id,
+                             _to_timestamp(report.received_time))
+
+        self._data.write(_RECORD_HEADER.pack(*entry[1:]))
+        self._data.write(encoded)
+        self._index.write(_INDEX_ENTRY.pack(*entry))
+
+        self._offset += _RECORD_HEADER.size + len(encoded)
+        return entry
+
+    def flush(self):
+        """Make sure all appended reports are written to disk."""
+
+        self._data.flush()
+        self._index.flush()
+
+    def close(self):
+        """Flush and close the archive."""
+
+        if self._data is None:
+            return
+
+        self.flush()
+        self._data.close()
+        self._index.close()
+        self._data = None
+        self._index = None
+
+
+class ReportArchive(object):
+    """Search and read reports stored in a report archive.
+
+    Both the index and the data file are memory mapped.  Opening the
+    archive only reads the device and received time of each index entry
+    into compact per device arrays sorted by time, so that find() can
+    bisect the requested time window and only unpack the entries inside it.
+    Each report is only read and decoded when it is requested.
+
+    The archive is opened read only.  Records that are missing from the
+    index, for example because a writer has not flushed it yet, are scanned
+    from the data file and kept in memory.
+
+    Args:
+        path (str): The path to the archive data file.
+    """
+
+    def __init__(self, path):
+        if not os.path.isfile(path):
+            raise ArgumentError("Report archive does not exist", path=path)
+
+        self.path = path
+        self.known_formats = IOTileReportParser._build_type_map()
+
+        valid, self._index_count, self._missing, _end = _scan_index(path)
+        self._count = self._index_count + len(self._missing)
+
+        self._index_file = None
+        self._index_map = None
+        if valid:
+            self._index_file = open(path + '.idx', "rb")
+            self._index_map = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        device_entries = {}
+        device_times = {}
+        all_times = array('d')
+        for i in range(0, self._count):
+            if i < self._index_count:
+                origin, received_time = _INDEX_KEY.unpack_from(self._index_map, _FILE_HEADER.size + i*_INDEX_ENTRY.size)
+            else:
+                entry = self._missing[i - self._index_count]
+                origin, received_time = entry.origin, entry.received_time
+
+            if origin not in device_entries:
+                device_entries[origin] = array(UINT32_TYPECODE)
+                device_times[origin] = array('d')
+
+            device_entries[origin].append(i)
+            device_times[origin].append(received_time)
+            all_times.append(received_time)
+
+        self._all = _TimeIndex(array(UINT32_TYPECODE, range(0, self._count)), all_times)
+        self._by_device = {origin: _TimeIndex(entries, device_times[origin]) for origin, entries in device_entries.items()}
+
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def devices(self):
+        """The sorted list of device uuids with reports in this archive."""
+
+        return sorted(self._by_device)
+
+    def find(self, device=None, start=None, end=None, min_reading_id=None, max_reading_id=None):
+        """Find the reports matching a query without reading them.
+
+        All of the arguments are optional and are combined so that only
+        entries matching all of them are returned.
+
+        Args:
+            device (int): Only return reports from this device uuid.
+            start (datetime): Only return reports received at or after this
+                UTC time.
+            end (datetime): Only return reports received before this UTC time.
+            min_reading_id (int): Only return reports containing readings with
+                ids greater than or equal to this.
+            max_reading_id (int): Only return reports containing readings with
+                ids less than or equal to this.
+
+        Returns:
+            list of ArchiveEntry: The matching entries in the order they were
+                added.  Their received_time is a datetime.
+        """
+
+        time_index = self._all
+        if device is not None:
+            time_index = self._by_device.get(device)
+            if time_index is None:
+                return []
+
+        start_ts = _to_timestamp(start) if start is not None else None
+        end_ts = _to_timestamp(end) if end is not None else None
+        filter_ids = min_reading_id is not None or max_reading_id is not None
+
+        found = []
+        for i in time_index.find(start_ts, end_ts):
+            if i < self._index_count:
+                entry = ArchiveEntry(*_INDEX_ENTRY.unpack_from(self._index_map, _FILE_HEADER.size + i*_INDEX_ENTRY.size))
+            else:
+                entry = self._missing[i - self._index_count]
+
+            if filter_ids:
+                if entry.lowest_id == IOTileReading.InvalidReadingID:
+                    continue
+                if min_reading_id is not None and entry.highest_id < min_reading_id:
+                    continue
+                if max_reading_id is not None and entry.lowest_id > max_reading_id:
+                    continue
+
+            found.append(entry._replace(received_time=_from_timestamp(entry.received_time)))
+
+        return found
+
+    def read_raw(self, entry):
+        """Read the encoded report for an entry.
+
+        Args:
+            entry (ArchiveEntry): An entry returned by find().
+
+        Returns:
+            bytearray: The encoded report.
+        """
+
+        start = entry.offset + _RECORD_HEADER.size
+        return bytearray(self._map[start:start + entry.length])
+
+    def read(self, entry):
+        """Read and decode the report for an entry.
+
+        Args:
+            entry (ArchiveEntry): An entry returned by find().
+
+        Returns:
+            IOTileReport: The decoded report with its original received time.
+        """
+
+        data = self.read_raw(entry)
+
+        received_time = entry.received_time
+        if not isinstance(received_time, datetime.datetime):
+            received_time = _from_timestamp(received_time)
+
+        if entry.format == FLEXIBLE_FORMAT:
+            return FlexibleDictionaryReport(data, signed=False, encrypted=False, received_time=received_time)
+
+        report_format = self.known_formats.get(entry.format)
+        if report_format is None:
+            raise DataError("Unknown report format in report archive", format=entry.format, offset=entry.offset)
+
+        return report_format(data, received_time=received_time)
+
+    def iter_reports(self, device=None, start=None, end=None, min_reading_id=None, max_reading_id=None):
+        """Iterate over the decoded reports matching a query.
+
+        The arguments are the same as for find().
+
+        Yields:
+            IOTileReport: Each matching report in the order they were added.
+        """
+
+        for entry in self.find(device, start, end, min_reading_id, max_reading_id):
+            yield self.read(entry)
+
+    def close(self):
+        """Close the archive."""
+
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
@@ -0,0 +1,346 @@
+"""Microbenchmarks for common report processing operations.
+
+Each benchmark function builds its own test data, times a single operation
+and returns a BenchmarkResult.  run_benchmarks() runs the standard suite of
+benchmarks covering the report hot path and is used by the
+iotile-reportbench command line program.
+"""
+
+from builtins import range
+import os
+import timeit
+from collections import namedtuple
+from iotile.core.exceptions import ArgumentError
+from iotile.core.hw.auth.auth_provider import AuthProvider
+from .report import IOTileReading, IOTileEvent
+from .signed_list_format import SignedListReport
+from .broadcast import BroadcastReport
+from .flexible_dictionary import FlexibleDictionaryReport
+from .parser import IOTileReportParser
+
+BenchmarkResult = namedtuple('BenchmarkResult', ['name', 'iterations', 'total_time', 'per_call'])
+
+# The device and user key used for benchmarks that need EnvAuthProvider
+BENCHMARK_UUID = 0x7FFF0001
+BENCHMARK_USER_KEY = '00112233445566778899AABBCCDDEEFF00112233445566778899AABBCCDDEEFF'
+
+
+def crypto_available():
+    """Check if reports can be encrypted with a user key.
+
+    EnvAuthProvider needs the optional pycryptodome package to encrypt and
+    decrypt reports.
+
+    Returns:
+        bool: Whether pycryptodome is installed.
+    """
+
+    try:
+        import Crypto.Cipher.AES  #pylint:disable=unused-variable,import-error
+    except ImportError:
+        return False
+
+    return True
+
+
+def time_call(name, func, iterations, setup=None):
+    """Time how long a function takes to run.
+
+    Args:
+        name (str): The name of this benchmark.
+        func (callable): The function to time, called with no arguments.
+        iterations (int): The number of times to call func.
+        setup (callable): Optional function called before each call to func
+            whose run time is not included in the results.
+
+    Returns:
+        BenchmarkResult: The total and average time of each call in seconds.
+    """
+
+    if iterations < 1:
+        raise ArgumentError("Benchmarks must run for at least one iteration", iterations=iterations)
+
+    total = 0.0
+    for _i in range(0, iterations):
+        if setup is not None:
+            setup()
+
+        start = timeit.default_timer()
+        func()
+        total += timeit.default_timer() - start
+
+    return BenchmarkResult(name, iterations, total, total / iterations)
+
+
+def make_readings(count):
+    """Create a list of sequential readings for benchmarking.
+
+    Args:
+        count (int): The number of readings to create.
+
+    Returns:
+        list of IOTileReading: The readings.
+    """
+
+    return [IOTileReading(i, 0x5000 + (i % 4), i*7, reading_id=i+1) for i in range(0, count)]
+
+
+class _UserKey(object):
+    """Temporarily define the benchmark user key in the environment."""
+
+    def __init__(self):
+        self._var_name = "USER_KEY_{0:08X}".format(BENCHMARK_UUID)
+        self._old_value = None
+
+    def __enter__(self):
+        self._old_value = os.environ.get(self._var_name)
+        os.environ[self._var_name] = BENCHMARK_USER_KEY
+
+    def __exit__(self, *args):
+        if self._old_value is None:
+            del os.environ[self._var_name]
+        else:
+            os.environ[self._var_name] = self._old_value
+
+
+def _setup_for(cached):
+    if cached:
+        IOTileReportParser._build_type_map()
+        return None
+
+    return IOTileReportParser.ClearFormatCache
+
+
+def _consume(report):
+    for _reading in report.visible_readings:
+        pass
+
+
+def bench_parser_setup(iterations=1000, cached=True):
+    """Time creating a report parser, as is done for every new connection.
+
+    Args:
+        iterations (int): The number of parsers to create.
+        cached (bool): Whether to use the process wide report format cache.
+            If False, the cache is cleared before each parser is created to
+            measure the cost of searching for installed report formats.
+
+    Returns:
+        BenchmarkResult: The benchmark results.
+    """
+
+    name = 'parser_setup' if cached else 'parser_setup_uncached'
+    return time_call(name, IOTileReportParser, iterations, setup=_setup_for(cached))
+
+
+def bench_deserialize(iterations=1000, cached=True, reading_count=10):
+    """Time deserializing a report, as is done for every forwarded report.
+
+    Args:
+        iterations (int): The number of reports to deserialize.
+        cached (bool): Whether to use the process wide report format cache.
+        reading_count (int): The number of readings in the report.
+
+    Returns:
+        BenchmarkResult: The benchmark results.
+    """
+
+    serialized = SignedListReport.FromReadings(1, make_readings(reading_count)).serialize()
+
+    name = 'deserialize' if cached else 'deserialize_uncached'
+    return time_call(name, lambda: IOTileReportParser.DeserializeReport(serialized), iterations, setup=_setup_for(cached))
+
+
+def bench_parser_add_data(iterations=20, chunk_size=20, report_count=20, reading_count=50):
+    """Time parsing a stream of reports that arrives in fixed size chunks.
+
+    Args:
+        iterations (int): The number of times to parse the entire stream.
+        chunk_size (int): The number of bytes passed to each add_data call.
+        report_count (int): The number of reports in the stream.
+        reading_count (int): The number of readings in each report.
+
+    Returns:
+        BenchmarkResult: The benchmark results, with one call per stream.
+    """
+
+    stream = bytearray()
+    for i in range(0, report_count):
+        stream += SignedListReport.FromReadings(i, make_readings(reading_count)).encode()
+
+    chunks = [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+
+    def _parse():
+        parser = IOTileReportParser(max_reports=0)
+        for chunk in chunks:
+            parser.add_data(chunk)
+
+    return time_call('parser_add_data_%d' % chunk_size, _parse, iterations)
+
+
+def bench_signed_decode(iterations=200, reading_count=500, user_key=False):
+    """Time decoding and verifying a SignedListReport.
+
+    Args:
+        iterations (int): The number of reports to decode.
+        reading_count (int): The number of readings in the report.
+        user_key (bool): Sign the report with a user key from EnvAuthProvider
+            rather than a simple hash.
+
+    Returns:
+        BenchmarkResult: The benchmark results.
+    """
+
+    with _UserKey():
+        root_key = AuthProvider.UserKey if user_key else AuthProvider.NoKey
+        report = SignedListReport.FromReadings(BENCHMARK_UUID, make_readings(reading_count), root_key=root_key)
+        encoded = report.encode()
+
+        name = 'signed_decode_user_key' if user_key else 'signed_decode'
+        return time_call(name, lambda: _consume(SignedListReport(encoded)), iterations)
+
+
+def bench_broadcast_decode(iterations=1000, reading_count=1):
+    """Time decoding a BroadcastReport.
+
+    Args:
+        iterations (int): The number of reports to decode.
+        reading_count (int): The number of readings in the report.
+
+    Returns:
+        BenchmarkResult: The benchmark results.
+    """
+
+    encoded = BroadcastReport.FromReadings(BENCHMARK_UUID, make_readings(reading_count)).encode()
+    return time_call('broadcast_decode', lambda: _consume(BroadcastReport(encoded)), iterations)
+
+
+def bench_flexible_roundtrip(iterations=100, reading_count=500):
+    """Time encoding and decoding a FlexibleDictionaryReport with msgpack.
+
+    Args:
+        iterations (int): The number of round trips.
+        reading_count (int): The number of readings in the report.
+
+    Returns:
+        BenchmarkResult: The benchmark results.
+    """
+
+    readings = make_readings(reading_count)
+
+    def _roundtrip():
+        encoded = FlexibleDictionaryReport.FromReadings(BENCHMARK_UUID, readings, []).encode()
+        _consume(FlexibleDictionaryReport(encoded, False, False))
+
+    return time_call('flexible_roundtrip', _roundtrip, iterations)
+
+
+def bench_flexible_events(iterations=20, event_count=20, raw_size=65536, include_raw_data=True):
+    """Time decoding a FlexibleDictionaryReport containing large events.
+
+    Args:
+        iterations (int): The number of reports to decode.
+        event_count (int): The number of events in the report.
+        raw_size (int): The number of raw data samples in each event.
+        include_raw_data (bool): Whether to decode the raw data of each event
+            or only its summary.
+
+    Returns:
+        BenchmarkResult: The benchmark results.
+    """
+
+    events = [IOTileEvent(i, 0x5020, {'peak': i}, {'waveform': list(range(0, raw_size))}, reading_id=i+1) for i in range(0, event_count)]
+    encoded = FlexibleDictionaryReport.FromReadings(BENCHMARK_UUID, [], events).encode()
+
+    name = 'flexible_events_full' if include_raw_data else 'flexible_events_summary'
+    return time_call(name, lambda: FlexibleDictionaryReport(encoded, False, False, include_raw_data=include_raw_data), iterations)
+
+
+def bench_serialize_roundtrip(iterations=1000, reading_count=10):
+    """Time serializing a report and deserializing it again.
+
+    Args:
+        iterations (int): The number of round trips.
+        reading_count (int): The number of readings in the report.
+
+    Returns:
+        BenchmarkResult: The benchmark results.
+    """
+
+    report = SignedListReport.FromReadings(BENCHMARK_UUID, make_readings(reading_count))
+    return time_call('serialize_roundtrip', lambda: IOTileReportParser.DeserializeReport(report.serialize()), iterations)
+
+
+# The standard benchmark suite as (name, function, default iterations, keyword arguments)
+BENCHMARKS = [
+    ('parser_setup', bench_parser_setup, 1000, {}),
+    ('deserialize', bench_deserialize, 1000, {}),
+    ('parser_add_data_1', bench_parser_add_data, 5, {'chunk_size': 1}),
+    ('parser_add_data_20', bench_parser_add_data, 20, {'chunk_size': 20}),
+    ('parser_add_data_512', bench_parser_add_data, 20, {'chunk_size': 512}),
+    ('parser_add_data_65536', bench_parser_add_data, 20, {'chunk_size': 65536}),
+    ('signed_decode', bench_signed_decode, 200, {}),
+    ('signed_decode_user_key', bench_signed_decode, 200, {'user_key': True}),
+    ('broadcast_decode', bench_broadcast_decode, 1000, {}),
+    ('flexible_roundtrip', bench_flexible_roundtrip, 100, {}),
+    ('flexible_events_full', bench_flexible_events, 20, {}),
+    ('flexible_events_summary', bench_flexible_events, 20, {'include_raw_data': False}),
+    ('serialize_roundtrip', bench_serialize_roundtrip, 1000, {})
+]
+
+
+def skipped_benchmarks():
+    """List the benchmarks that cannot run on this system.
+
+    Returns:
+        dict: The reason that each skipped benchmark cannot run, keyed by its
+            name.
+    """
+
+    skipped = {}
+    if not crypto_available():
+        for name, _func, _iterations, kwargs in BENCHMARKS:
+            if kwargs.get('user_key', False):
+                skipped[name] = "pycryptodome is not installed"
+
+    return skipped
+
+
+def run_benchmarks(names=None, scale=1.0):
+    """Run the standard benchmark suite.
+
+    Benchmarks listed by skipped_benchmarks() are left out unless they are
+    explicitly requested by name, in which case an error is raised.
+
+    Args:
+        names (list of str): Only run the benchmarks with these names.  If not
+            given, all benchmarks are run.
+        scale (float): Multiply the default number of iterations of each
+            benchmark by this factor.  Every benchmark runs at least once.
+
+    Returns:
+        list of BenchmarkResult: The results of each benchmark in order.
+    """
+
+    known = [x[0] for x in BENCHMARKS]
+    skipped = skipped_benchmarks()
+    if names is not None:
+        unknown = [x for x in names if x not in known]
+        if len(unknown) > 0:
+            raise ArgumentError("Unknown benchmark names", unknown=unknown, known=known)
+
+        unavailable = {x: skipped[x] for x in names if x in skipped}
+        if len(unavailable) > 0:
+            raise ArgumentError("Benchmarks cannot run on this system", reasons=unavailable)
+
+    results = []
+    for name, func, iterations, kwargs in BENCHMARKS:
+        if name in skipped or (names is not None and name not in names):
+            continue
+
+        kwargs = dict(kwargs)
+        kwargs['iterations'] = max(1, int(iterations*scale))
+
+        results.append(func(**kwargs))
+
+    return results
@@ -18,6 +18,8 @@ from collections import namedtuple
 import datetime
 from iotile.core.exceptions import DataError
 from .report import IOTileReading, IOTileReport
+from .lazy_readings import LazyReadingList
+from .reading_batch import pack_readings
 
 BroadcastHeader = namedtuple('BroadcastHeader', ['auth_type', 'reading_length', 'uuid', 'sent_timestamp', 'reserved'])
 
@@ -45,7 +47,7 @@ class BroadcastReport(IOTileReport):
     ReportType = 3
 
     def __init__(self, rawreport, **kwargs):
-        super(BroadcastReport, self).__init__(rawreport, signed=False, encrypted=False)
+        super(BroadcastReport, self).__init__(rawreport, signed=False, encrypted=False, **kwargs)
 
     @classmethod
     def _parse_header(cls, header):
@@ -82,17 +84,21 @@ class BroadcastReport(IOTileReport):
 
     @classmethod
     def FromReadings(cls, uuid, readings, sent_timestamp=0):
-        """Generate a broadcast report from a list of readings and a uuid."""
+        """Generate a broadcast report from a list of readings and a uuid.
 
-        header = struct.pack("<BBHLLL", cls.ReportType, 0, len(readings)*16, uuid, sent_timestamp, 0)
+        Args:
+            uuid (int): The uuid of the device that this report came from
+            readings (list): A list of IOTileReading objects or a ReadingBatch
+                containing the data in the report
+            sent_timestamp (int): The device's uptime that sent this report.
 
-        packed_readings = bytearray()
+        Returns:
+            BroadcastReport: The encoded report.
+        """
 
-        for reading in readings:
-            packed_reading = struct.pack("<HHLLL", reading.stream, 0, reading.reading_id, reading.raw_time, reading.value)
-            packed_readings += bytearray(packed_reading)
+        header = struct.pack("<BBHLLL", cls.ReportType, 0, len(readings)*16, uuid, sent_timestamp, 0)
 
-        return BroadcastReport(bytearray(header) + packed_readings)
+        return BroadcastReport(bytearray(header) + pack_readings(readings))
 
     def decode(self):
         """Decode this report into a list of visible readings."""
@@ -105,17 +111,9 @@ class BroadcastReport(IOTileReport):
 
         time_base = self.received_time - datetime.timedelta(seconds=parsed_header.sent_timestamp)
 
-        readings = self.raw_report[self._HEADER_LENGTH:self._HEADER_LENGTH + parsed_header.reading_length]
-        parsed_readings = []
-
-        for i in range(0, len(readings), 16):
-            reading = readings[i:i+16]
-            stream, _, reading_id, timestamp, value = struct.unpack("<HHLLL", reading)
-
-            parsed = IOTileReading(timestamp, stream, value, time_base=time_base, reading_id=reading_id)
-            parsed_readings.append(parsed)
+        readings = LazyReadingList(self.raw_report, self._HEADER_LENGTH, parsed_header.reading_length // 16, time_base=time_base)
 
         self.sent_timestamp = parsed_header.sent_timestamp
         self.origin = parsed_header.uuid
 
-        return parsed_readings, []
+        return readings, []
@@ -1,10 +1,12 @@
 """A flexible dictionary based report format suitable for msgpack and json serialization."""
 
+from builtins import range
 import itertools
 import msgpack
 import datetime
 from iotile.core.exceptions import DataError
 from .report import IOTileReport, IOTileReading, IOTileEvent
+from .reading_batch import ReadingBatch
 
 
 class FlexibleDictionaryReport(IOTileReport):
@@ -20,17 +22,29 @@ class FlexibleDictionaryReport(IOTileReport):
         encrypted (bool): Whether this report is encrypted
         received_time (datetime): The time in UTC when this report was received from a device.
             If not received, the time is assumed to be utcnow().
+        include_raw_data (bool): Whether to decode the raw data of each event.  Events may contain
+            very large raw data sections, such as waveforms, that are not needed when only the
+            event summaries are used.  If False, the raw data of each event is skipped while
+            decoding and each event's raw_data is None.  It can still be read later using
+            iter_events() or asdict().
     """
 
     FORMAT_TAG = "v100"
 
+    def __init__(self, rawreport, signed, encrypted, received_time=None, include_raw_data=True):
+        self.include_raw_data = include_raw_data
+        self._report_dict = None
+
+        super(FlexibleDictionaryReport, self).__init__(rawreport, signed, encrypted, received_time=received_time)
+
     @classmethod
     def FromReadings(cls, uuid, readings, events, report_id=IOTileReading.InvalidReadingID, selector=0xFFFF, streamer=0x100, sent_timestamp=0, received_time=None):
         """Create a flexible dictionary report from a list of readings and events.
 
         Args:
             uuid (int): The uuid of the deviec that this report came from
-            readings (list of IOTileReading): A list of IOTileReading objects containing the data in the report
+            readings (list of IOTileReading): A list of IOTileReading objects or a ReadingBatch containing the
+                data in the report
             events (list of IOTileEvent): A list of the events contained in the report.
             report_id (int): The id of the report.  If not provided it defaults to IOTileReading.InvalidReadingID.
                 Note that you can specify anything you want for the report id but for actual IOTile devices
@@ -50,7 +64,15 @@ class FlexibleDictionaryReport(IOTileReport):
         lowest_id = IOTileReading.InvalidReadingID
         highest_id = IOTileReading.InvalidReadingID
 
-        for item in itertools.chain(iter(readings), iter(events)):
+        if isinstance(readings, ReadingBatch):
+            lowest_id, highest_id = readings.id_range()
+            reading_list = readings.asdicts()
+            id_items = iter(events)
+        else:
+            reading_list = [x.asdict() for x in readings]
+            id_items = itertools.chain(iter(readings), iter(events))
+
+        for item in id_items:
             if item.reading_id == IOTileReading.InvalidReadingID:
                 continue
 
@@ -59,7 +81,6 @@ class FlexibleDictionaryReport(IOTileReport):
             if highest_id == IOTileReading.InvalidReadingID or item.reading_id > highest_id:
                 highest_id = item.reading_id
 
-        reading_list = [x.asdict() for x in readings]
         event_list = [x.asdict() for x in events]
 
         report_dict = {
@@ -79,12 +100,33 @@ class FlexibleDictionaryReport(IOTileReport):
         return FlexibleDictionaryReport(encoded, signed=False, encrypted=False, received_time=received_time)
 
     def decode(self):
-        """Decode this report from a msgpack encoded binary blob."""
+        """Decode this report from a msgpack encoded binary blob.
+
+        If include_raw_data is True, the entire report is unpacked at once and
+        the result is cached for asdict().  Otherwise the report is decoded
+        incrementally so that the raw data of each event is skipped without
+        being unpacked.
+        """
+
+        if self.include_raw_data:
+            report_dict = self.asdict()
+            events = [IOTileEvent.FromDict(x) for x in report_dict.get('events', [])]
+            readings = [IOTileReading.FromDict(x) for x in report_dict.get('data', [])]
+        else:
+            report_dict = {}
+            events = []
+            readings = []
 
-        report_dict = msgpack.unpackb(self.raw_report, raw=False)
+            unpacker = self._create_unpacker()
+            for _i in range(0, unpacker.read_map_header()):
+                key = unpacker.unpack()
 
-        events = [IOTileEvent.FromDict(x) for x in report_dict.get('events', [])]
-        readings = [IOTileReading.FromDict(x) for x in report_dict.get('data', [])]
+                if key == 'events':
+                    events = [IOTileEvent.FromDict(x) for x in _iter_array(unpacker, False)]
+                elif key == 'data':
+                    readings = [IOTileReading.FromDict(x) for x in _iter_array(unpacker, True)]
+                else:
+                    report_dict[key] = unpacker.unpack()
 
         if 'device' not in report_dict:
             raise DataError("Invalid encoded FlexibleDictionaryReport that did not have a device key set with the device uuid")
@@ -99,9 +141,86 @@ class FlexibleDictionaryReport(IOTileReport):
 
         return readings, events
 
+    def iter_readings(self):
+        """Iterate over the readings in this report one at a time.
+
+        Only one reading is unpacked at a time, unless the report has already
+        been unpacked by asdict().
+
+        Yields:
+            IOTileReading: Each reading in the report.
+        """
+
+        for obj in self._iter_section('data', True):
+            yield IOTileReading.FromDict(obj)
+
+    def iter_events(self, include_raw_data=False):
+        """Iterate over the events in this report one at a time.
+
+        Only one event is unpacked at a time, unless the report has already
+        been unpacked by asdict(), so this can be used to process the raw
+        data of large events without keeping all of them in memory.
+
+        Args:
+            include_raw_data (bool): Whether to unpack the raw data of each
+                event.  If False, each event's raw_data is None.
+
+        Yields:
+            IOTileEvent: Each event in the report.
+        """
+
+        for obj in self._iter_section('events', include_raw_data):
+            yield IOTileEvent.FromDict(obj)
+
     def asdict(self):
-        """ Return this report as a dictionary """
-        return msgpack.unpackb(self.raw_report)
+        """Return this report as a dictionary.
+
+        The report is only unpacked the first time this is called and the same
+        dictionary is returned every time after that, so it should be treated
+        as read only.
+
+        Returns:
+            dict: The unpacked report.
+        """
+
+        if self._report_dict is None:
+            self._report_dict = msgpack.unpackb(self.raw_report, raw=False)
+
+        return self._report_dict
+
+    def _create_unpacker(self):
+        # Limit the size of each object to the report size so that large raw
+        # data sections are not rejected by msgpack's default limits.
+        size = max(len(self.raw_report), 1)
+
+        unpacker = msgpack.Unpacker(raw=False, max_buffer_size=size, max_str_len=size, max_bin_len=size,
+                                    max_array_len=size, max_map_len=size, max_ext_len=size)
+        unpacker.feed(self.raw_report)
+        return unpacker
+
+    def _iter_section(self, section, include_raw_data):
+        if self._report_dict is not None:
+            for obj in self._report_dict.get(section, []):
+                if not include_raw_data:
+                    obj = dict(obj)
+                    obj.pop('data', None)
+
+                yield obj
+
+            return
+
+        unpacker = self._create_unpacker()
+        for _i in range(0, unpacker.read_map_header()):
+            key = unpacker.unpack()
+
+            if key != section:
+                unpacker.skip()
+                continue
+
+            for obj in _iter_array(unpacker, include_raw_data):
+                yield obj
+
+            return
 
     def serialize(self):
         """Serialize this report including the received time."""
@@ -109,6 +228,29 @@ class FlexibleDictionaryReport(IOTileReport):
         raise NotImplementedError("This report format (FlexibleDictionaryReport) does not support serialization")
 
 
+def _iter_array(unpacker, include_raw_data):
+    """Unpack each entry in an array of readings or events.
+
+    If include_raw_data is False, the data key of each entry is skipped
+    without unpacking it.
+    """
+
+    for _i in range(0, unpacker.read_array_header()):
+        if include_raw_data:
+            yield unpacker.unpack()
+            continue
+
+        obj = {}
+        for _j in range(0, unpacker.read_map_header()):
+            key = unpacker.unpack()
+            if key == 'data':
+                unpacker.skip()
+            else:
+                obj[key] = unpacker.unpack()
+
+        yield obj
+
+
 def _encode_datetime(obj):
     """Pack a datetime into an isoformat string."""
     if isinstance(obj, datetime.datetime):
@@ -0,0 +1,145 @@
+"""A lazily decoded list of readings packed inside a binary report."""
+
+from builtins import range
+import datetime
+import struct
+from .report import IOTileReading, IOTileEvent
+
+
+class LazyReadingList(object):
+    """A read only list of readings that are decoded on access.
+
+    Many report formats contain a list of fixed size 16-byte reading records
+    with the format:
+
+        H: stream
+        H: reserved
+        L: reading id
+        L: raw time
+        L: value
+
+    Rather than decoding every record into an IOTileReading when a report is
+    received, this class keeps a reference to the report's raw data and only
+    creates IOTileReading objects for the readings that are actually
+    accessed.  No data is copied out of the underlying buffer.  This makes
+    receiving and forwarding large reports cheap when their readings are
+    never inspected.
+
+    The object behaves like a list of IOTileReading objects that supports
+    len(), iteration, indexing, slicing and equality comparisons.  Accessing
+    the same reading twice returns the same IOTileReading object.
+
+    The data in each reading can also be accessed directly as columns using
+    the streams, reading_ids, raw_times and values properties without
+    creating any IOTileReading objects.
+
+    Args:
+        data (bytearray): The buffer containing the packed readings.
+        offset (int): The offset of the first reading in data.
+        count (int): The number of readings in data.
+        time_base (datetime): An optional estimate of when the device was
+            last turned on that is used to calculate the reading_time of
+            each reading.
+    """
+
+    RecordFormat = struct.Struct("<HHLLL")
+    RecordLength = 16
+
+    def __init__(self, data, offset, count, time_base=None):
+        if offset + count*self.RecordLength > len(data):
+            raise ValueError("Buffer is too short to contain {} readings at offset {}".format(count, offset))
+
+        self._data = data
+        self._offset = offset
+        self._count = count
+        self._columns = None
+        self._readings = [None]*count
+
+        self.time_base = time_base
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for i in range(0, self._count):
+            yield self._reading(i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._reading(i) for i in range(*index.indices(self._count))]
+
+        if index < 0:
+            index += self._count
+
+        if index < 0 or index >= self._count:
+            raise IndexError("Reading index out of range")
+
+        return self._reading(index)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, LazyReadingList)):
+            return len(self) == len(other) and all(x == y for x, y in zip(self, other))
+
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+
+        return not result
+
+    def _reading(self, index):
+        reading = self._readings[index]
+
+        if reading is None:
+            stream, _, reading_id, raw_time, value = self.RecordFormat.unpack_from(self._data, self._offset + index*self.RecordLength)
+            reading = IOTileReading(raw_time, stream, value, time_base=self.time_base, reading_id=reading_id)
+            self._readings[index] = reading
+
+        return reading
+
+    def _unpack_columns(self):
+        if self._columns is None:
+            fmt = struct.Struct("<" + "HHLLL"*self._count)
+            self._columns = fmt.unpack_from(self._data, self._offset)
+
+        return self._columns
+
+    @property
+    def streams(self):
+        """The stream of each reading as a list of ints."""
+
+        return list(self._unpack_columns()[0::5])
+
+    @property
+    def reading_ids(self):
+        """The reading id of each reading as a list of ints."""
+
+        return list(self._unpack_columns()[2::5])
+
+    @property
+    def raw_times(self):
+        """The raw time of each reading as a list of ints."""
+
+        return list(self._unpack_columns()[3::5])
+
+    @property
+    def values(self):
+        """The value of each reading as a list of ints."""
+
+        return list(self._unpack_columns()[4::5])
+
+    @property
+    def reading_times(self):
+        """The UTC time of each reading as a list of datetimes.
+
+        If there is no time_base for these readings, all of the times are
+        None.  Readings with an invalid raw time also have a time of None.
+        """
+
+        if self.time_base is None:
+            return [None]*self._count
+
+        return [self.time_base + datetime.timedelta(seconds=x) if x != IOTileEvent.InvalidRawTime else None
+                for x in self.raw_times]
@@ -1,7 +1,9 @@
 """State machine for parsing IOTile reports coming in on a streaming basis
 """
 
+import threading
 import pkg_resources
+from collections import deque
 from iotile.core.exceptions import ArgumentError
 
 class IOTileReportParser (object):
@@ -9,7 +11,15 @@ class IOTileReportParser (object):
 
     Every time new data is available on the stream, add_data should be called.
     Every time a complete report has been received, the optional callback passed in will
-    be called with an IOTileReport subclass.
+    be called with an IOTileReport subclass.  Alternatively, iter_reports can be used to
+    parse an iterable of data chunks and yield each report as soon as it is complete.
+
+    Received data is kept in a single buffer and reports are parsed in place at a read
+    offset.  Consumed data is only removed from the front of the buffer once it makes up
+    most of the buffer, so parsing a long stream of reports takes linear time.
+
+    By default a copy of every report is kept in the reports property.  For long running
+    sessions, max_reports can be used to only keep the most recent reports.
 
     Args:
         report_callback (callable): A function to be called every time a new report is received
@@ -19,6 +29,9 @@ class IOTileReportParser (object):
         error_callback (callable): A function to be called every time an error occurs.
             The signature should be error_callback(error_code, message, context).  If a fatal
             error occurs, further parsing of reports will be stopped.
+        max_reports (int): The maximum number of reports to keep in the reports property.
+            If more reports are received, the oldest ones are discarded.  If None, the
+            default, all reports are kept.
     """
 
     #States for parser state machine
@@ -32,11 +45,17 @@ class IOTileReportParser (object):
     ErrorParsingReportHeader = 2
     ErrorParsingCompleteReport = 3
 
-    def __init__(self, report_callback=None, error_callback=None):
+    # Process wide cache of known report formats shared by all parsers
+    _format_cache = None
+    _format_lock = threading.Lock()
+
+    def __init__(self, report_callback=None, error_callback=None, max_reports=None):
         self.report_callback = report_callback
         self.error_callback = error_callback
 
         self.raw_data = bytearray()
+        self._read_pos = 0
+        self._ready = None
         self.state = IOTileReportParser.WaitingForReportType
 
         self.current_type = 0
@@ -46,7 +65,17 @@ class IOTileReportParser (object):
         self.context = None
 
         self.known_formats = self._build_type_map()
-        self.reports = []
+
+        if max_reports is None:
+            self.reports = []
+        else:
+            self.reports = deque(maxlen=max_reports)
+
+    @property
+    def pending_data(self):
+        """The number of bytes received that are not part of a complete report yet."""
+
+        return len(self.raw_data) - self._read_pos
 
     def add_data(self, data):
         """Add data to our stream, emitting reports as each new one is seen
@@ -58,12 +87,59 @@ class IOTileReportParser (object):
         if self.state == self.ErrorState:
             return
 
-        self.raw_data += bytearray(data)
+        if not isinstance(data, (bytes, bytearray)):
+            data = bytearray(data)
+
+        self.raw_data += data
 
         still_processing = True
         while still_processing:
             still_processing = self.process_data()
 
+        self._compact()
+
+    def iter_reports(self, chunks):
+        """Parse a series of data chunks, yielding reports as they are completed.
+
+        Reports are still passed to the report callback and stored in the
+        reports property, subject to max_reports, if those are configured.
+
+        Args:
+            chunks (iterable of bytearray): The data to parse.
+
+        Yields:
+            IOTileReport: Each report in the order that it was received.
+        """
+
+        ready = deque()
+        self._ready = ready
+
+        try:
+            for chunk in chunks:
+                self.add_data(chunk)
+
+                while len(ready) > 0:
+                    yield ready.popleft()
+        finally:
+            self._ready = None
+
+    def _compact(self):
+        """Remove consumed data from the front of our buffer.
+
+        This is only done once consumed data makes up at least half of the
+        buffer so that each byte is moved a bounded number of times.
+        """
+
+        if self._read_pos == 0:
+            return
+
+        if self._read_pos == len(self.raw_data):
+            self.raw_data = bytearray()
+            self._read_pos = 0
+        elif self._read_pos >= len(self.raw_data) // 2:
+            del self.raw_data[:self._read_pos]
+            self._read_pos = 0
+
     def process_data(self):
         """Attempt to extract a report from the current data stream contents
 
@@ -74,8 +150,10 @@ class IOTileReportParser (object):
 
         further_processing = False
 
-        if self.state == self.WaitingForReportType and len(self.raw_data) > 0:
-            self.current_type = self.raw_data[0]
+        pending = len(self.raw_data) - self._read_pos
+
+        if self.state == self.WaitingForReportType and pending > 0:
+            self.current_type = self.raw_data[self._read_pos]
 
             try:
                 self.current_header_size = self.calculate_header_size(self.current_type)
@@ -89,9 +167,10 @@ class IOTileReportParser (object):
                 else:
                     raise
 
-        if self.state == self.WaitingForReportHeader and len(self.raw_data) >= self.current_header_size:
+        if self.state == self.WaitingForReportHeader and pending >= self.current_header_size:
             try:
-                self.current_report_size = self.calculate_report_size(self.current_type, self.raw_data[:self.current_header_size])
+                header = self.raw_data[self._read_pos:self._read_pos + self.current_header_size]
+                self.current_report_size = self.calculate_report_size(self.current_type, header)
                 self.state = self.WaitingForCompleteReport
                 further_processing = True
             except Exception as exc:
@@ -102,10 +181,10 @@ class IOTileReportParser (object):
                 else:
                     raise
 
-        if self.state == self.WaitingForCompleteReport and len(self.raw_data) >= self.current_report_size:
+        if self.state == self.WaitingForCompleteReport and pending >= self.current_report_size:
             try:
-                report_data = self.raw_data[:self.current_report_size]
-                self.raw_data = self.raw_data[self.current_report_size:]
+                report_data = self.raw_data[self._read_pos:self._read_pos + self.current_report_size]
+                self._read_pos += self.current_report_size
 
                 report = self.parse_report(self.current_type, report_data)
                 self._handle_report(report)
@@ -154,18 +233,49 @@ class IOTileReportParser (object):
         if keep_report:
             self.reports.append(report)
 
+        if self._ready is not None:
+            self._ready.append(report)
+
     @classmethod
     def _build_type_map(cls):
-        """Build a map of all of the known report format processors
+        """Get a map of all of the known report format processors
+
+        The installed report formats are only searched for the first time this
+        is called in a process.  After that, the same map is returned to every
+        caller so it must not be modified.  Use ClearFormatCache to force the
+        report formats to be found again.
+
+        Returns:
+            dict: A map of report type codes to IOTileReport subclasses.
         """
 
-        formats = {}
+        formats = IOTileReportParser._format_cache
+        if formats is not None:
+            return formats
+
+        with IOTileReportParser._format_lock:
+            if IOTileReportParser._format_cache is None:
+                formats = {}
+
+                for entry in pkg_resources.iter_entry_points('iotile.report_format'):
+                    report_format = entry.load()
+                    formats[report_format.ReportType] = report_format
+
+                IOTileReportParser._format_cache = formats
 
-        for entry in pkg_resources.iter_entry_points('iotile.report_format'):
-            report_format = entry.load()
-            formats[report_format.ReportType] = report_format
+            return IOTileReportParser._format_cache
+
+    @classmethod
+    def ClearFormatCache(cls):
+        """Forget the cached map of known report formats
+
+        The next parser that is created will search for installed report
+        formats again.  This is mainly useful for tests that install or
+        remove report formats.
+        """
 
-        return formats
+        with IOTileReportParser._format_lock:
+            IOTileReportParser._format_cache = None
 
     @classmethod
     def DeserializeReport(cls, serialized):
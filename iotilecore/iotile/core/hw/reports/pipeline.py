@@ -0,0 +1,109 @@
+"""A pipeline that verifies and decrypts many reports in parallel."""
+
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+from iotile.core.exceptions import ArgumentError, DataError
+from .parser import IOTileReportParser
+
+
+def _decode_report(args):
+    """Decode a single report inside a worker.
+
+    Constructing a report verifies its signature and decrypts it if needed.
+    """
+
+    report_format, data, received_time = args
+    return report_format(data, received_time=received_time)
+
+
+class ReportVerificationPipeline(object):
+    """Verify and decrypt raw reports on a pool of workers.
+
+    Creating an IOTileReport from its binary encoding verifies its
+    signature and decrypts its readings, which is CPU bound for large
+    reports.  This pipeline accepts many encoded reports and builds the
+    report objects on a pool of worker threads or processes, returning
+    them in the same order that they were passed in.
+
+    Thread workers are cheap to start and are effective because hashlib
+    releases the GIL while hashing large buffers.  Process workers avoid the
+    GIL entirely but need to copy each report to and from the worker.
+
+    The pipeline should be closed with close() when it is no longer needed
+    or used as a context manager.
+
+    Args:
+        workers (int): The number of workers to use.  Defaults to the number
+            of CPUs on this computer.
+        use_processes (bool): Use a pool of processes rather than threads.
+    """
+
+    def __init__(self, workers=None, use_processes=False):
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+
+        if workers < 1:
+            raise ArgumentError("You must use at least one worker to verify reports", workers=workers)
+
+        self.workers = workers
+        self.use_processes = use_processes
+        self.known_formats = IOTileReportParser._build_type_map()
+
+        if use_processes:
+            self._pool = multiprocessing.Pool(workers)
+        else:
+            self._pool = ThreadPool(workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _prepare(self, raw_reports, received_time):
+        for data in raw_reports:
+            data = bytearray(data)
+            if len(data) == 0:
+                raise DataError("Empty report passed to ReportVerificationPipeline")
+
+            report_format = self.known_formats.get(data[0])
+            if report_format is None:
+                raise DataError("Unknown report format in ReportVerificationPipeline", format=data[0])
+
+            yield report_format, data, received_time
+
+    def verify(self, raw_reports, received_time=None, chunksize=1):
+        """Verify and decode a series of encoded reports.
+
+        Reports are decoded as they are needed by the returned iterator so
+        that the input can be an iterator producing reports as they arrive.
+
+        Args:
+            raw_reports (iterable of bytearray): The encoded reports, each of
+                which must be exactly one complete report whose first byte is
+                its report format.
+            received_time (datetime): The time the reports were received.  If
+                not given, each report uses the time it was decoded.
+            chunksize (int): The number of reports to send to a worker at
+                once.  Larger values reduce overhead for small reports.
+
+        Returns:
+            iterator of IOTileReport: The decoded reports in the same order as
+                raw_reports.  Check each report's verified property to see if
+                it was verified successfully.
+        """
+
+        if self._pool is None:
+            raise ArgumentError("verify called on a ReportVerificationPipeline that was closed")
+
+        return self._pool.imap(_decode_report, self._prepare(raw_reports, received_time), chunksize)
+
+    def close(self):
+        """Stop all workers in this pipeline."""
+
+        if self._pool is None:
+            return
+
+        self._pool.close()
+        self._pool.join()
+        self._pool = None
@@ -0,0 +1,329 @@
+"""A compact, column oriented container for large numbers of readings."""
+
+from builtins import range
+import struct
+import itertools
+from array import array
+from .report import IOTileReading
+from .lazy_readings import LazyReadingList
+
+
+def _find_typecode(candidates, itemsize):
+    """Find the first array typecode whose items are itemsize bytes long."""
+
+    for typecode in candidates:
+        try:
+            if array(typecode).itemsize == itemsize:
+                return typecode
+        except ValueError:
+            pass
+
+    return candidates[-1]
+
+
+# 'L' is 8 bytes on 64-bit linux and mac so unsigned 32-bit columns use 'I'
+UINT32_TYPECODE = _find_typecode('IL', 4)
+
+# Python 2 arrays do not support 64-bit integers so fall back to a native long
+VALUE_TYPECODE = _find_typecode('ql', 8)
+
+_RECORD = LazyReadingList.RecordFormat
+
+# ReadingBatches are packed this many records at a time so that the arguments
+# to each pack_into call stay small no matter how large the batch is.
+_PACK_CHUNK = 4096
+_PACK_FIELDS = "HHLLL"
+_CHUNK_RECORDS = struct.Struct("<" + _PACK_FIELDS*_PACK_CHUNK)
+
+
+class BatchReading(object):
+    """A lightweight view of a single reading stored in a ReadingBatch.
+
+    The view has the same attributes as an IOTileReading and compares equal
+    to an IOTileReading with the same data but does not copy anything out of
+    the batch.
+
+    Args:
+        batch (ReadingBatch): The batch containing the reading.
+        index (int): The index of the reading in the batch.
+    """
+
+    __slots__ = ('_batch', '_index')
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    @property
+    def stream(self):
+        return self._batch.streams[self._index]
+
+    @property
+    def raw_time(self):
+        return self._batch.raw_times[self._index]
+
+    @property
+    def value(self):
+        return self._batch.values[self._index]
+
+    @property
+    def reading_id(self):
+        return self._batch.reading_ids[self._index]
+
+    @property
+    def reading_time(self):
+        if self._batch.reading_times is None:
+            return None
+
+        return self._batch.reading_times[self._index]
+
+    def asdict(self):
+        """Encode the data in this reading into a dictionary.
+
+        Returns:
+            dict: The same dictionary that IOTileReading.asdict() would return.
+        """
+
+        return self.to_reading().asdict()
+
+    def to_reading(self):
+        """Copy this reading into a standalone IOTileReading.
+
+        Returns:
+            IOTileReading: The copied reading.
+        """
+
+        return IOTileReading(self.raw_time, self.stream, self.value, reading_id=self.reading_id, reading_time=self.reading_time)
+
+    def __eq__(self, other):
+        if not all(hasattr(other, x) for x in ('raw_time', 'stream', 'value', 'reading_id')):
+            return NotImplemented
+
+        return self.raw_time == other.raw_time and self.stream == other.stream and self.value == other.value and self.reading_id == other.reading_id
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+
+        return not result
+
+    # Views compare by value and their batch can change, so they cannot be hashed
+    __hash__ = None
+
+    def __str__(self):
+        return str(self.to_reading())
+
+
+class ReadingBatch(object):
+    """A batch of readings stored as parallel arrays.
+
+    Each IOTileReading object carries its own attribute dictionary, which is
+    expensive when millions of readings need to be kept in memory.  A
+    ReadingBatch instead stores the stream, reading id, raw time and value of
+    every reading in compact typed arrays.  Reading times are optional and
+    are only stored if at least one reading has one.
+
+    Indexing or iterating over a batch returns BatchReading views that
+    behave like IOTileReading objects without copying any data.  Slicing a
+    batch returns a new ReadingBatch.
+
+    ReadingBatch objects can be passed anywhere a list of readings is
+    accepted by the FromReadings methods of SignedListReport,
+    BroadcastReport and FlexibleDictionaryReport.
+
+    Args:
+        streams (iterable of int): The stream of each reading.
+        raw_times (iterable of int): The raw time of each reading.
+        values (iterable of int): The value of each reading.
+        reading_ids (iterable of int): Optional reading ids.  If not given,
+            all readings have an id of IOTileReading.InvalidReadingID.
+        reading_times (iterable of datetime): Optional UTC reading times.
+            Individual times may be None.
+    """
+
+    def __init__(self, streams=(), raw_times=(), values=(), reading_ids=None, reading_times=None):
+        self.streams = array('H', streams)
+        self.raw_times = array(UINT32_TYPECODE, raw_times)
+        self.values = array(VALUE_TYPECODE, values)
+
+        if reading_ids is None:
+            reading_ids = [IOTileReading.InvalidReadingID]*len(self.values)
+
+        self.reading_ids = array(UINT32_TYPECODE, reading_ids)
+
+        if reading_times is not None:
+            reading_times = list(reading_times)
+
+        self.reading_times = reading_times
+
+        lengths = set([len(self.streams), len(self.raw_times), len(self.values), len(self.reading_ids)])
+        if self.reading_times is not None:
+            lengths.add(len(self.reading_times))
+
+        if len(lengths) != 1:
+            raise ValueError("All columns of a ReadingBatch must have the same length")
+
+    @classmethod
+    def FromReadings(cls, readings):
+        """Create a batch from a list of readings.
+
+        Args:
+            readings (iterable of IOTileReading): The readings to include.
+                If this is a LazyReadingList from a report, its columns are
+                copied directly without creating IOTileReading objects.
+
+        Returns:
+            ReadingBatch: The newly created batch.
+        """
+
+        if isinstance(readings, LazyReadingList):
+            reading_times = None
+            if readings.time_base is not None:
+                reading_times = readings.reading_times
+
+            return ReadingBatch(readings.streams, readings.raw_times, readings.values,
+                                reading_ids=readings.reading_ids, reading_times=reading_times)
+
+        batch = ReadingBatch()
+        batch.extend(readings)
+        return batch
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        for i in range(0, len(self)):
+            yield BatchReading(self, i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            reading_times = None
+            if self.reading_times is not None:
+                reading_times = self.reading_times[index]
+
+            return ReadingBatch(self.streams[index], self.raw_times[index], self.values[index],
+                                reading_ids=self.reading_ids[index], reading_times=reading_times)
+
+        if index < 0:
+            index += len(self)
+
+        if index < 0 or index >= len(self):
+            raise IndexError("Reading index out of range")
+
+        return BatchReading(self, index)
+
+    def append(self, reading):
+        """Add a reading to the end of this batch.
+
+        Args:
+            reading (IOTileReading): The reading to add.
+        """
+
+        reading_time = getattr(reading, 'reading_time', None)
+        if reading_time is not None and self.reading_times is None:
+            self.reading_times = [None]*len(self)
+
+        self.streams.append(reading.stream)
+        self.raw_times.append(reading.raw_time)
+        self.values.append(reading.value)
+        self.reading_ids.append(reading.reading_id)
+
+        if self.reading_times is not None:
+            self.reading_times.append(reading_time)
+
+    def extend(self, readings):
+        """Add a series of readings to the end of this batch.
+
+        Args:
+            readings (iterable of IOTileReading): The readings to add.
+        """
+
+        for reading in readings:
+            self.append(reading)
+
+    def id_range(self):
+        """Find the lowest and highest valid reading ids in this batch.
+
+        Returns:
+            (int, int): The lowest and highest reading id.  Both are
+                IOTileReading.InvalidReadingID if no reading has a valid id.
+        """
+
+        valid_ids = [x for x in self.reading_ids if x != IOTileReading.InvalidReadingID]
+        if len(valid_ids) == 0:
+            return IOTileReading.InvalidReadingID, IOTileReading.InvalidReadingID
+
+        return min(valid_ids), max(valid_ids)
+
+    def to_readings(self):
+        """Convert this batch into a list of IOTileReading objects.
+
+        Returns:
+            list of IOTileReading: One reading per row of this batch.
+        """
+
+        return [x.to_reading() for x in self]
+
+    def asdicts(self):
+        """Encode every reading in this batch into a dictionary.
+
+        Returns:
+            list of dict: The same dictionaries that calling asdict() on each
+                reading would return.
+        """
+
+        reading_times = self.reading_times
+        if reading_times is None:
+            reading_times = [None]*len(self)
+
+        return [{
+            'stream': stream,
+            'device_timestamp': raw_time,
+            'streamer_local_id': reading_id,
+            'timestamp': reading_time.isoformat() if reading_time is not None else None,
+            'value': value
+        } for stream, raw_time, reading_id, reading_time, value in zip(self.streams, self.raw_times, self.reading_ids, reading_times, self.values)]
+
+
+def pack_readings(readings):
+    """Pack readings into a buffer of 16-byte reading records.
+
+    This is the record format used by SignedListReport and BroadcastReport
+    (see LazyReadingList).  The output buffer is allocated once and all
+    readings are packed directly into it.
+
+    Args:
+        readings (list of IOTileReading or ReadingBatch): The readings to pack.
+            If a ReadingBatch is passed, its columns are packed a few
+            thousand records at a time without creating any per reading
+            objects.
+
+    Returns:
+        bytearray: The packed readings.
+    """
+
+    count = len(readings)
+    packed = bytearray(_RECORD.size*count)
+
+    if count == 0:
+        return packed
+
+    if isinstance(readings, ReadingBatch):
+        for start in range(0, count, _PACK_CHUNK):
+            end = min(start + _PACK_CHUNK, count)
+
+            fmt = _CHUNK_RECORDS
+            if end - start < _PACK_CHUNK:
+                fmt = struct.Struct("<" + _PACK_FIELDS*(end - start))
+
+            columns = zip(readings.streams[start:end], itertools.repeat(0), readings.reading_ids[start:end],
+                          readings.raw_times[start:end], readings.values[start:end])
+            fmt.pack_into(packed, start*_RECORD.size, *itertools.chain.from_iterable(columns))
+
+        return packed
+
+    for i, reading in enumerate(readings):
+        _RECORD.pack_into(packed, i*_RECORD.size, reading.stream, 0, reading.reading_id, reading.raw_time, reading.value)
+
+    return packed
@@ -0,0 +1,136 @@
+"""Incrementally build signed reports from a stream of readings."""
+
+from iotile.core.exceptions import ArgumentError
+from iotile.core.hw.auth.auth_provider import AuthProvider
+from .report import IOTileReading
+from .lazy_readings import LazyReadingList
+from .signed_list_format import SignedListReport
+
+
+class ReportBuilder(object):
+    """Build SignedListReports one reading at a time.
+
+    Readings are packed into a preallocated buffer as soon as they are added
+    so no list of IOTileReading objects is kept.  Once max_readings readings
+    have been added, the buffer is sealed into a signed report automatically.
+    A partially full report can be sealed at any time with seal().
+
+    Sealed reports are passed to report_callback, if one is given, and are
+    also returned from the add_reading() or seal() call that created them.
+
+    Args:
+        uuid (int): The uuid of the device that the reports come from.
+        max_readings (int): The maximum number of readings in each report.
+        root_key (int): The key that should be used to sign each report.
+        signer (AuthProvider): An optional preconfigured AuthProvider used to
+            sign reports.  If not given, the shared default ChainedAuthProvider
+            is used.
+        report_id (int): The report id to use for automatically sealed reports.
+        selector (int): The streamer selector of each report.
+        streamer (int): The streamer id that each report was sent from.
+        report_callback (callable): Optional function called with each
+            SignedListReport as it is sealed.
+    """
+
+    _RECORD = LazyReadingList.RecordFormat
+
+    def __init__(self, uuid, max_readings, root_key=AuthProvider.NoKey, signer=None, report_id=IOTileReading.InvalidReadingID,
+                 selector=0xFFFF, streamer=0, report_callback=None):
+        if max_readings < 1:
+            raise ArgumentError("Reports must be able to hold at least one reading", max_readings=max_readings)
+
+        self.uuid = uuid
+        self.max_readings = max_readings
+        self.root_key = root_key
+        self.signer = signer
+        self.report_id = report_id
+        self.selector = selector
+        self.streamer = streamer
+        self.report_callback = report_callback
+
+        self._buffer = bytearray(self._RECORD.size*max_readings)
+        self._count = 0
+        self._lowest_id = IOTileReading.InvalidReadingID
+        self._highest_id = IOTileReading.InvalidReadingID
+
+    def __len__(self):
+        """The number of readings waiting to be sealed into a report."""
+        return self._count
+
+    def add_reading(self, reading):
+        """Add a reading to the current report.
+
+        Args:
+            reading (IOTileReading): The reading to add.
+
+        Returns:
+            SignedListReport: The sealed report if this reading filled up the
+                current report, otherwise None.
+        """
+
+        self._RECORD.pack_into(self._buffer, self._count*self._RECORD.size, reading.stream, 0, reading.reading_id,
+                               reading.raw_time, reading.value)
+        self._count += 1
+
+        reading_id = reading.reading_id
+        if reading_id != IOTileReading.InvalidReadingID:
+            if self._lowest_id == IOTileReading.InvalidReadingID or reading_id < self._lowest_id:
+                self._lowest_id = reading_id
+            if self._highest_id == IOTileReading.InvalidReadingID or reading_id > self._highest_id:
+                self._highest_id = reading_id
+
+        if self._count == self.max_readings:
+            return self.seal()
+
+        return None
+
+    def add_readings(self, readings):
+        """Add a series of readings, sealing reports as they fill up.
+
+        Args:
+            readings (iterable of IOTileReading): The readings to add.
+
+        Returns:
+            list of SignedListReport: The reports that were sealed.
+        """
+
+        sealed = []
+        for reading in readings:
+            report = self.add_reading(reading)
+            if report is not None:
+                sealed.append(report)
+
+        return sealed
+
+    def seal(self, report_id=None, sent_timestamp=0):
+        """Seal all pending readings into a signed report.
+
+        Args:
+            report_id (int): The id of this report.  Defaults to the
+                report_id passed when creating this builder.
+            sent_timestamp (int): The device's uptime when this report was sent.
+
+        Returns:
+            SignedListReport: The sealed report or None if there were no
+                pending readings.
+        """
+
+        if self._count == 0:
+            return None
+
+        if report_id is None:
+            report_id = self.report_id
+
+        packed = self._buffer[:self._count*self._RECORD.size]
+        report = SignedListReport.FromPackedReadings(self.uuid, packed, self._lowest_id, self._highest_id, root_key=self.root_key,
+                                                     signer=self.signer, report_id=report_id, selector=self.selector,
+                                                     streamer=self.streamer, sent_timestamp=sent_timestamp)
+
+        self._count = 0
+        self._lowest_id = IOTileReading.InvalidReadingID
+        self._highest_id = IOTileReading.InvalidReadingID
+
+        if self.report_callback is not None:
+            self.report_callback(report)
+
+        return report
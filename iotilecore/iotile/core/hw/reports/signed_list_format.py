@@ -1,10 +1,11 @@
 """IOTileReport subclass for readings packaged as individual readings
 """
 
-from builtins import range
 import datetime
 import struct
 from .report import IOTileReport, IOTileReading
+from .lazy_readings import LazyReadingList
+from .reading_batch import ReadingBatch, pack_readings
 from iotile.core.utilities.packed import unpack
 from iotile.core.exceptions import ArgumentError, NotFoundError, ExternalError
 from iotile.core.hw.auth.auth_provider import AuthProvider
@@ -48,16 +49,16 @@ class SignedListReport(IOTileReport):
         """Generate an instance of the report format from a list of readings and a uuid.
 
         The signed list report is created using the passed readings and signed using the specified method
-        and AuthProvider.  If no auth provider is specified, the report is signed using the default authorization
-        chain.
+        and AuthProvider.  If no auth provider is specified, the report is signed using the shared default
+        authorization chain.
 
         Args:
             uuid (int): The uuid of the deviec that this report came from
-            readings (list): A list of IOTileReading objects containing the data in the report
+            readings (list): A list of IOTileReading objects or a ReadingBatch containing the data in the report
             root_key (int): The key that should be used to sign the report (must be supported
                 by an auth_provider)
             signer (AuthProvider): An optional preconfigured AuthProvider that should be used to sign this
-                report.  If no AuthProvider is provided, the default ChainedAuthProvider is used.
+                report.  If no AuthProvider is provided, the shared default ChainedAuthProvider is used.
             report_id (int): The id of the report.  If not provided it defaults to IOTileReading.InvalidReadingID.
                 Note that you can specify anything you want for the report id but for actual IOTile devices
                 the report id will always be greater than the id of all of the readings contained in the report
@@ -71,28 +72,59 @@ class SignedListReport(IOTileReport):
         lowest_id = IOTileReading.InvalidReadingID
         highest_id = IOTileReading.InvalidReadingID
 
-        report_len = 20 + 16*len(readings) + 24
+        if isinstance(readings, ReadingBatch):
+            lowest_id, highest_id = readings.id_range()
+        else:
+            unique_readings = [x.reading_id for x in readings if x.reading_id != IOTileReading.InvalidReadingID]
+            if len(unique_readings) > 0:
+                lowest_id = min(unique_readings)
+                highest_id = max(unique_readings)
+
+        packed_readings = pack_readings(readings)
+
+        return cls.FromPackedReadings(uuid, packed_readings, lowest_id, highest_id, root_key=root_key, signer=signer,
+                                      report_id=report_id, selector=selector, streamer=streamer, sent_timestamp=sent_timestamp)
+
+    @classmethod
+    def FromPackedReadings(cls, uuid, packed_readings, lowest_id, highest_id, root_key=AuthProvider.NoKey, signer=None,
+                           report_id=IOTileReading.InvalidReadingID, selector=0xFFFF, streamer=0, sent_timestamp=0):
+        """Generate a signed list report from readings that are already packed.
+
+        This is the same as FromReadings except that the readings must already
+        be packed into 16-byte reading records, for example by pack_readings,
+        and the range of reading ids they contain must be given.
+
+        Args:
+            uuid (int): The uuid of the device that this report came from
+            packed_readings (bytearray): The packed readings.
+            lowest_id (int): The lowest valid reading id in the readings.
+            highest_id (int): The highest valid reading id in the readings.
+            root_key (int): The key that should be used to sign the report.
+            signer (AuthProvider): An optional preconfigured AuthProvider that should be used to sign this
+                report.
+            report_id (int): The id of the report.
+            selector (int): The streamer selector of this report.
+            streamer (int): The streamer id that this reading was sent from.
+            sent_timestamp (int): The device's uptime that sent this report.
+
+        Returns:
+            SignedListReport: The signed report.
+        """
+
+        if len(packed_readings) % 16 != 0:
+            raise ArgumentError("Packed readings must be a multiple of 16 bytes long", length=len(packed_readings))
+
+        report_len = 20 + len(packed_readings) + 24
         len_low = report_len & 0xFF
         len_high = report_len >> 8
 
-        unique_readings = [x.reading_id for x in readings if x.reading_id != IOTileReading.InvalidReadingID]
-        if len(unique_readings) > 0:
-            lowest_id = min(unique_readings)
-            highest_id = max(unique_readings)
-
         header = struct.pack("<BBHLLLBBH", cls.ReportType, len_low, len_high, uuid, report_id, sent_timestamp, root_key, streamer, selector)
         header = bytearray(header)
 
-        packed_readings = bytearray()
-
-        for reading in readings:
-            packed_reading = struct.pack("<HHLLL", reading.stream, 0, reading.reading_id, reading.raw_time, reading.value)
-            packed_readings += bytearray(packed_reading)
-
         footer_stats = struct.pack("<LL", lowest_id, highest_id)
 
         if signer is None:
-            signer = ChainedAuthProvider()
+            signer = ChainedAuthProvider.Default()
 
         # If we are supposed to encrypt this report, do the encryption
         if root_key != signer.NoKey:
@@ -136,10 +168,8 @@ class SignedListReport(IOTileReport):
 
         assert len(self.raw_report) == length
 
-        remaining = self.raw_report[20:]
-        assert len(remaining) >= 24
-        readings = remaining[:-24]
-        footer = remaining[-24:]
+        assert length >= 20 + 24
+        footer = self.raw_report[-24:]
 
         lowest_id, highest_id, signature = unpack("<LL16s", footer)
         signature = bytearray(signature)
@@ -149,7 +179,7 @@ class SignedListReport(IOTileReport):
         self.signature = signature
 
         signed_data = self.raw_report[:-16]
-        signer = ChainedAuthProvider()
+        signer = ChainedAuthProvider.Default()
 
         if signature_flags == AuthProvider.NoKey:
             self.encrypted = False
@@ -167,26 +197,23 @@ class SignedListReport(IOTileReport):
         if not self.verified:
             return [], []
 
+        # Readings are decoded lazily directly from the raw report when they
+        # are accessed unless they had to be decrypted first
+        readings = self.raw_report
+        readings_offset = 20
+        readings_length = length - 20 - 24
+
         # If the report is encrypted, try to decrypt it before parsing the readings
         if self.encrypted:
             try:
-                result = signer.decrypt_report(device_id, signature_flags, readings, report_id=report_id, sent_timestamp=sent_timestamp)
+                result = signer.decrypt_report(device_id, signature_flags, self.raw_report[20:-24], report_id=report_id, sent_timestamp=sent_timestamp)
                 readings = result['data']
+                readings_offset = 0
             except NotFoundError:
                 return [], []
 
-        # Now parse all of the readings
         # Make sure this report has an integer number of readings
-        assert (len(readings) % 16) == 0
+        assert (readings_length % 16) == 0
 
         time_base = self.received_time - datetime.timedelta(seconds=sent_timestamp)
-        parsed_readings = []
-
-        for i in range(0, len(readings), 16):
-            reading = readings[i:i+16]
-            stream, _, reading_id, timestamp, value = unpack("<HHLLL", reading)
-
-            parsed = IOTileReading(timestamp, stream, value, time_base=time_base, reading_id=reading_id)
-            parsed_readings.append(parsed)
-
-        return parsed_readings, []
+        return LazyReadingList(readings, readings_offset, readings_length // 16, time_base=time_base), []
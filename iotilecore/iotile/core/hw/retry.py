@@ -0,0 +1,245 @@
+"""Retry policies for RPCs sent to busy tiles.
+
+A tile responds that it is busy when it cannot process an RPC right now,
+for example because it is still handling a previous command.  The RPC
+should be sent again later.  RetryPolicy decides how long to wait between
+attempts, with exponential backoff, random jitter and an overall deadline
+after which the RPC fails with ModuleBusyError.
+
+TileBusyTracker remembers which tiles are currently busy so that other
+RPCs sent to the same tile wait for it to become free instead of adding to
+its load, while RPCs to other tiles are sent immediately.  It also keeps
+statistics on how often RPCs were retried.
+
+Both classes are independent of how RPCs are sent so that they can be
+used by TileBusProxyObject.rpc as well as by asynchronous adapters.
+"""
+
+import random
+import threading
+import time
+from iotile.core.exceptions import ArgumentError
+
+# time.monotonic is not available on Python 2
+_now = getattr(time, 'monotonic', time.time)
+
+
+class RetryPolicy(object):
+    """How to retry an RPC sent to a busy tile.
+
+    The delay before retry number n (starting from 0) is
+    min(max_delay, initial_delay * backoff**n), randomly varied by up to
+    +/- jitter of its value so that many clients do not retry in lockstep.
+    Retries stop once deadline seconds have passed since the first attempt.
+
+    Args:
+        initial_delay (float): The delay before the first retry in seconds.
+        max_delay (float): The largest delay between two attempts in seconds.
+        backoff (float): The factor that the delay grows by after each retry.
+        jitter (float): The fraction of each delay to randomly vary it by,
+            between 0 and 1.
+        deadline (float): The number of seconds after the first attempt to
+            stop retrying.  If 0, busy RPCs are never retried.
+    """
+
+    def __init__(self, initial_delay=0.01, max_delay=0.5, backoff=2.0, jitter=0.2, deadline=5.0):
+        if initial_delay < 0 or max_delay < initial_delay:
+            raise ArgumentError("Invalid RPC retry delays", initial_delay=initial_delay, max_delay=max_delay)
+        if backoff < 1.0:
+            raise ArgumentError("RPC retry backoff must be at least 1", backoff=backoff)
+        if jitter < 0 or jitter > 1:
+            raise ArgumentError("RPC retry jitter must be between 0 and 1", jitter=jitter)
+        if deadline < 0:
+            raise ArgumentError("RPC retry deadline cannot be negative", deadline=deadline)
+
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.jitter = jitter
+        self.deadline = deadline
+
+    def delay(self, retry):
+        """Calculate the delay before a retry.
+
+        Args:
+            retry (int): The number of retries that have already been made.
+
+        Returns:
+            float: The number of seconds to wait.
+        """
+
+        delay = min(self.max_delay, self.initial_delay * (self.backoff ** retry))
+        if self.jitter > 0:
+            delay *= 1.0 + random.uniform(-self.jitter, self.jitter)
+
+        return max(0.0, delay)
+
+    def start(self):
+        """Start retrying a single RPC.
+
+        Returns:
+            RetryState: An object that tracks the retries of the RPC.
+        """
+
+        return RetryState(self)
+
+
+# The policy used by CMDStream unless another one is given
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class RetryState(object):
+    """The retries made for a single RPC under a RetryPolicy.
+
+    Args:
+        policy (RetryPolicy): The policy being followed.
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.retries = 0
+        self.total_delay = 0.0
+        self._deadline = _now() + policy.deadline
+
+    def next_delay(self):
+        """Get the delay before the next retry.
+
+        Returns:
+            float: The number of seconds to wait before retrying, or None if
+                the deadline has passed and the RPC should fail.  The delay
+                is shortened so that the last retry happens at the deadline.
+        """
+
+        remaining = self._deadline - _now()
+        if remaining <= 0:
+            return None
+
+        delay = min(remaining, self.policy.delay(self.retries))
+        self.retries += 1
+        self.total_delay += delay
+        return delay
+
+
+class TileBusyTracker(object):
+    """Track which tiles are busy and count RPC retries.
+
+    Tiles are identified by any hashable key, usually the tile address or a
+    (connection id, address) tuple when the tracker is shared between
+    connections.  This class is thread safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._busy_until = {}
+        self._tiles = {}
+
+    def wait_time(self, key):
+        """Get how long to wait before sending an RPC to a tile.
+
+        Args:
+            key (object): The tile.
+
+        Returns:
+            float: The number of seconds until the tile is expected to be
+                free, or 0 if it is not known to be busy.
+        """
+
+        # Avoid taking the lock for the common case of a tile that is not busy
+        if key not in self._busy_until:
+            return 0.0
+
+        with self._lock:
+            busy_until = self._busy_until.get(key)
+            if busy_until is None:
+                return 0.0
+
+            remaining = busy_until - _now()
+            if remaining <= 0:
+                del self._busy_until[key]
+                return 0.0
+
+            return remaining
+
+    def record_busy(self, key, delay):
+        """Record that a tile was busy and will be retried after a delay.
+
+        Args:
+            key (object): The tile.
+            delay (float): The number of seconds before the RPC is retried.
+        """
+
+        with self._lock:
+            busy_until = _now() + delay
+            self._busy_until[key] = max(busy_until, self._busy_until.get(key, 0.0))
+
+            stats = self._stats_for(key)
+            stats['busy_responses'] += 1
+            stats['retry_delay'] += delay
+
+    def record_done(self, key, retries, success):
+        """Record that an RPC finished.
+
+        Args:
+            key (object): The tile.
+            retries (int): The number of times the RPC was retried.
+            success (bool): False if the RPC failed because the tile stayed
+                busy past the retry deadline.
+        """
+
+        if success and retries == 0 and key not in self._busy_until:
+            return
+
+        with self._lock:
+            if success:
+                self._busy_until.pop(key, None)
+
+            stats = self._stats_for(key)
+            if retries > 0:
+                stats['retried_rpcs'] += 1
+                stats['max_retries'] = max(stats['max_retries'], retries)
+
+            if not success:
+                stats['failed_rpcs'] += 1
+
+    def stats(self):
+        """Get statistics about RPC retries.
+
+        Returns:
+            dict: Totals for all tiles with the same keys as each tile's
+                entry, plus 'tiles' with the statistics for each tile that
+                was ever busy.  The keys are busy_responses, retried_rpcs,
+                failed_rpcs, max_retries and retry_delay (the total seconds
+                spent waiting to retry).
+        """
+
+        with self._lock:
+            tiles = {key: dict(value) for key, value in self._tiles.items()}
+
+        totals = _empty_stats()
+        for tile in tiles.values():
+            for name in ('busy_responses', 'retried_rpcs', 'failed_rpcs', 'retry_delay'):
+                totals[name] += tile[name]
+
+            totals['max_retries'] = max(totals['max_retries'], tile['max_retries'])
+
+        totals['tiles'] = tiles
+        return totals
+
+    def reset(self):
+        """Forget all busy tiles and statistics."""
+
+        with self._lock:
+            self._busy_until = {}
+            self._tiles = {}
+
+    def _stats_for(self, key):
+        stats = self._tiles.get(key)
+        if stats is None:
+            stats = _empty_stats()
+            self._tiles[key] = stats
+
+        return stats
+
+
+def _empty_stats():
+    return {'busy_responses': 0, 'retried_rpcs': 0, 'failed_rpcs': 0, 'max_retries': 0, 'retry_delay': 0.0}
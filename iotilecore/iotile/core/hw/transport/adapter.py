@@ -1,8 +1,12 @@
+import logging
 import threading
+import functools
 from iotile.core.exceptions import ArgumentError
 
 MISSING = object()
 
+logger = logging.getLogger(__name__)
+
 
 class DeviceAdapter(object):
     """Classes that encapsulate access to IOTile devices over a particular communication channel
@@ -30,6 +34,9 @@ class DeviceAdapter(object):
     send_rpc_async
     send_rpc_sync
 
+    send_rpcs_async
+    send_rpcs_sync
+
     send_script_async
     send_script_sync
 
@@ -49,6 +56,11 @@ class DeviceAdapter(object):
     multiprocessing to invoke its callback, i.e. it should use multithreading since the default synchronous
     adapter function needs a shared memory lock.
 
+    send_rpcs_async sends a batch of RPCs using send_rpc_async with up to 'max_rpc_window' RPCs
+    in flight at once.  The default window is 1 so that RPCs are sent one at a time.  Adapters
+    that can have several RPCs outstanding on a connection, and that execute them in the
+    order they were sent, can increase it using set_config.
+
     periodic_callback should be a non-blocking callback that is invoked periodically to allow
     the DeviceAdapter to maintain its internal state.
 
@@ -125,8 +137,22 @@ class DeviceAdapter(object):
 
         self.callbacks[name].add(func)
 
+    def remove_callback(self, name, func):
+        """Remove a callback previously added with add_callback
+
+        Args:
+            name (str): The name of the event that func was registered for
+            func (callable): The function that should no longer be called
+        """
+
+        if name not in self.callbacks:
+            raise ValueError("Unknown callback name: %s" % name)
+
+        self.callbacks[name].discard(func)
+
     def _trigger_callback(self, name, *args, **kwargs):
-        for func in self.callbacks[name]:
+        # Copy the callbacks so they can be added or removed from other threads
+        for func in list(self.callbacks[name]):
             func(*args, **kwargs)
 
     def connect_async(self, connection_id, connection_string, callback):
@@ -351,6 +377,62 @@ class DeviceAdapter(object):
 
         return result
 
+    def send_rpcs_async(self, conn_id, rpcs, callback, window=None):
+        """Asynchronously send a batch of RPCs to this IOTile device
+
+        RPCs are sent in order using send_rpc_async with up to window RPCs in
+        flight at the same time.  The window is limited to this adapter's
+        'max_rpc_window' config value, which defaults to 1 so that adapters
+        that can only process one RPC at a time send them one after another.
+
+        Args:
+            conn_id (int): A unique identifier that will refer to this connection
+            rpcs (list of tuple): The RPCs to send as (address, rpc_id, payload, timeout)
+                tuples with the same meaning as the arguments to send_rpc_async.
+            callback (callable): A callback for when all of the RPCs have finished.  The callback
+                will be called as callback(connection_id, adapter_id, results) where results is a
+                list with one dict per RPC, in the same order as rpcs, containing the same keys as
+                the result of send_rpc_sync.
+            window (int): The maximum number of RPCs to have in flight at once.  Defaults
+                to the adapter's maximum.
+        """
+
+        max_window = self.get_config('max_rpc_window', 1)
+        if window is None:
+            window = max_window
+        elif window > max_window:
+            logger.debug("Limiting RPC window of %d to this adapter's max_rpc_window of %d", window, max_window)
+            window = max_window
+
+        _RPCBatch(self, conn_id, rpcs, max(window, 1), callback).start()
+
+    def send_rpcs_sync(self, conn_id, rpcs, window=None):
+        """Synchronously send a batch of RPCs to this IOTile device
+
+        Args:
+            conn_id (int): A unique identifier that will refer to this connection
+            rpcs (list of tuple): The RPCs to send as (address, rpc_id, payload, timeout)
+                tuples.
+            window (int): The maximum number of RPCs to have in flight at once.  Defaults
+                to the adapter's maximum.
+
+        Returns:
+            list of dict: The result of each RPC in the same order as rpcs.  Each result
+                has the same keys as the result of send_rpc_sync.
+        """
+
+        done = threading.Event()
+        result = {}
+
+        def send_rpcs_done(conn_id, adapter_id, results):
+            result['results'] = results
+            done.set()
+
+        self.send_rpcs_async(conn_id, rpcs, send_rpcs_done, window)
+        done.wait()
+
+        return result['results']
+
     def debug_async(self, conn_id, cmd_name, cmd_args, progress_callback, callback):
         """Asynchronously complete a named debug command.
 
@@ -453,3 +535,77 @@ class DeviceAdapter(object):
         done.wait()
 
         return result
+
+
+class _RPCBatch(object):
+    """Send a list of RPCs with a limited number in flight at once.
+
+    RPCs are always started in the order they were given.  Completion
+    callbacks may arrive on any thread, or synchronously from inside
+    send_rpc_async, so only one caller at a time runs the dispatch loop and
+    any other caller just lets it know that there is room for more RPCs.
+    """
+
+    def __init__(self, adapter, conn_id, rpcs, window, callback):
+        self.adapter = adapter
+        self.conn_id = conn_id
+        self.rpcs = list(rpcs)
+        self.window = window
+        self.callback = callback
+        self.results = [None]*len(self.rpcs)
+
+        self._next = 0
+        self._in_flight = 0
+        self._finished = 0
+        self._dispatching = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        if len(self.rpcs) == 0:
+            self.callback(self.conn_id, self.adapter.id, [])
+            return
+
+        self._dispatch()
+
+    def _dispatch(self):
+        with self._lock:
+            if self._dispatching:
+                return
+
+            self._dispatching = True
+
+        while True:
+            with self._lock:
+                if self._next >= len(self.rpcs) or self._in_flight >= self.window:
+                    self._dispatching = False
+                    return
+
+                index = self._next
+                self._next += 1
+                self._in_flight += 1
+
+            address, rpc_id, payload, timeout = self.rpcs[index]
+            try:
+                self.adapter.send_rpc_async(self.conn_id, address, rpc_id, payload, timeout, functools.partial(self._on_finished, index))
+            except Exception as exc:  #pylint: disable=broad-except;The batch must always finish so that send_rpcs_sync does not hang
+                logger.exception("Error sending RPC %d of batch", index)
+                self._on_finished(index, self.conn_id, self.adapter.id, False, str(exc), None, None)
+
+    def _on_finished(self, index, conn_id, adapter_id, success, failure_reason, status, payload):
+        with self._lock:
+            self.results[index] = {
+                'success': success,
+                'failure_reason': failure_reason,
+                'status': status,
+                'payload': payload
+            }
+
+            self._in_flight -= 1
+            self._finished += 1
+            done = self._finished == len(self.rpcs)
+
+        if done:
+            self.callback(self.conn_id, self.adapter.id, self.results)
+            return
+
+        self._dispatch()
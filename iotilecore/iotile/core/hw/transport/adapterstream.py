@@ -4,6 +4,7 @@
 from builtins import str
 from future.utils import viewitems
 from copy import deepcopy
+import itertools
 import queue
 from .cmdstream import CMDStream
 import datetime
@@ -27,17 +28,26 @@ class AdapterCMDStream(CMDStream):
             should immediately connect to
         record (string): The path to a file that we should use to record everything sent down
             this CMDStream
+        connection_id (int): The connection id to use with the DeviceAdapter.  Every stream that
+            shares a DeviceAdapter must use a different connection id.
+        owns_adapter (bool): Whether this stream should stop the DeviceAdapter when it is closed.
+            Streams created by share() do not own their adapter.
     """
 
-    def __init__(self, adapter, port, connection_string, record=None):
+    def __init__(self, adapter, port, connection_string, record=None, connection_id=0, owns_adapter=True):
         self.adapter = adapter
+        self.connection_id = connection_id
+        self.owns_adapter = owns_adapter
         self._scanned_devices = {}
         self._reports = None
         self._broadcast_reports = None
         self._traces = None
+        self._connection_ids = itertools.count(connection_id + 1)
         self.connection_interrupted = False
 
-        self.adapter.add_callback('on_scan', self._on_scan)
+        if owns_adapter:
+            self.adapter.add_callback('on_scan', self._on_scan)
+
         self.adapter.add_callback('on_report', self._on_report)
         self.adapter.add_callback('on_trace', self._on_trace)
         self.adapter.add_callback('on_disconnect', self._on_disconnect)
@@ -48,6 +58,28 @@ class AdapterCMDStream(CMDStream):
 
         super(AdapterCMDStream, self).__init__(port, connection_string, record)
 
+    def share(self):
+        """Create another stream that uses the same DeviceAdapter as this one.
+
+        The new stream has its own connection id, so it can be connected to
+        a different device than this stream at the same time, and its own
+        report, trace and reconnection state.  It shares this stream's scan
+        results.  Closing the new stream disconnects it but does not stop the
+        DeviceAdapter, which remains owned by this stream.
+
+        Returned streams are not recorded, even if this stream is.
+
+        Returns:
+            AdapterCMDStream: The new, unconnected stream.
+        """
+
+        stream = AdapterCMDStream(self.adapter, self.port, None, connection_id=next(self._connection_ids), owns_adapter=False)
+        stream._connection_ids = self._connection_ids
+        stream._scanned_devices = self._scanned_devices
+        stream.start_time = self.start_time
+
+        return stream
+
     def _on_scan(self, adapter_id, info, expiration_time):
         """Callback called when a new device is discovered on this CMDStream
 
@@ -71,6 +103,9 @@ class AdapterCMDStream(CMDStream):
             connection_id (int): An ID for the connection that has become disconnected
         """
 
+        if connection_id != self.connection_id:
+            return
+
         self.connection_interrupted = True
 
     def _scan(self, wait=None):
@@ -130,20 +165,20 @@ class AdapterCMDStream(CMDStream):
         return connstring
 
     def _connect_direct(self, connection_string):
-        res = self.adapter.connect_sync(0, connection_string)
+        res = self.adapter.connect_sync(self.connection_id, connection_string)
         if not res['success']:
             self.adapter.periodic_callback()
             raise HardwareError("Could not connect to device", reason=res['failure_reason'], connection_string=connection_string)
 
         try:
-            res = self.adapter.open_interface_sync(0, 'rpc')
+            res = self.adapter.open_interface_sync(self.connection_id, 'rpc')
         except Exception as exc:
-            self.adapter.disconnect_sync(0)
+            self.adapter.disconnect_sync(self.connection_id)
             self.adapter.periodic_callback()
             raise HardwareError("Could not open RPC interface on device due to an exception", exception=str(exc))
 
         if not res['success']:
-            self.adapter.disconnect_sync(0)
+            self.adapter.disconnect_sync(self.connection_id)
             self.adapter.periodic_callback()
             raise HardwareError("Could not open RPC interface on device", reason=res['failure_reason'], connection_string=connection_string)
 
@@ -153,7 +188,7 @@ class AdapterCMDStream(CMDStream):
         self._reports = None
         self._traces = None
 
-        self.adapter.disconnect_sync(0)
+        self.adapter.disconnect_sync(self.connection_id)
         self.adapter.periodic_callback()
 
     def _try_reconnect(self):
@@ -167,13 +202,13 @@ class AdapterCMDStream(CMDStream):
 
                 # Reenable streaming interface if that was open before as well
                 if self._reports is not None:
-                    res = self.adapter.open_interface_sync(0, 'streaming')
+                    res = self.adapter.open_interface_sync(self.connection_id, 'streaming')
                     if not res['success']:
                         raise HardwareError("Could not open streaming interface to device", reason=res['failure_reason'])
 
                 # Reenable tracing interface if that was open before as well
                 if self._traces is not None:
-                    res = self.adapter.open_interface_sync(0, 'tracing')
+                    res = self.adapter.open_interface_sync(self.connection_id, 'tracing')
                     if not res['success']:
                         raise HardwareError("Could not open tracing interface to device", reason=res['failure_reason'])
         except HardwareError as exc:
@@ -188,7 +223,7 @@ class AdapterCMDStream(CMDStream):
         if self.connection_interrupted:
             self._try_reconnect()
 
-        result = self.adapter.send_rpc_sync(0, address, (feature << 8) | cmd, payload, timeout)
+        result = self.adapter.send_rpc_sync(self.connection_id, address, (feature << 8) | cmd, payload, timeout)
         success = result['success']
         status = result['status']
         payload = result['payload']
@@ -203,6 +238,26 @@ class AdapterCMDStream(CMDStream):
 
         return status, payload
 
+    def _send_rpc_batch(self, rpcs, window, **kwargs):
+        timeout = 3.0
+        if 'timeout' in kwargs:
+            timeout = float(kwargs['timeout'])
+
+        if self.connection_interrupted:
+            self._try_reconnect()
+
+        calls = [(address, (feature << 8) | cmd, payload, timeout) for address, feature, cmd, payload in rpcs]
+        results = self.adapter.send_rpcs_sync(self.connection_id, calls, window)
+
+        if self.connection_interrupted:
+            self._try_reconnect()
+
+        for i, result in enumerate(results):
+            if not result['success']:
+                raise HardwareError("Could not send RPC", reason=result['failure_reason'], index=i)
+
+        return [(x['status'], x['payload']) for x in results]
+
     def _send_highspeed(self, data, progress_callback):
         if isinstance(data, str) and not isinstance(data, bytes):
             raise ArgumentError("You must send bytes or bytearray to _send_highspeed", type=type(data))
@@ -210,11 +265,11 @@ class AdapterCMDStream(CMDStream):
         if not isinstance(data, bytes):
             data = bytes(data)
 
-        self.adapter.send_script_sync(0, data, progress_callback)
+        self.adapter.send_script_sync(self.connection_id, data, progress_callback)
 
     def _enable_streaming(self):
         self._reports = queue.Queue()
-        res = self.adapter.open_interface_sync(0, 'streaming')
+        res = self.adapter.open_interface_sync(self.connection_id, 'streaming')
         if not res['success']:
             raise HardwareError("Could not open streaming interface to device", reason=res['failure_reason'])
 
@@ -228,7 +283,7 @@ class AdapterCMDStream(CMDStream):
         return self._broadcast_reports
 
     def _enable_debug(self, connection_string=None):
-        res = self.adapter.open_interface_sync(0, 'debug', connection_string)
+        res = self.adapter.open_interface_sync(self.connection_id, 'debug', connection_string)
         if not res['success']:
             raise HardwareError("Could not open debug interface to device", reason=res['failure_reason'])
 
@@ -236,7 +291,7 @@ class AdapterCMDStream(CMDStream):
         def _progress_callback(_finished, _total):
             pass
 
-        res = self.adapter.debug_sync(0, cmd, args, progress_callback)
+        res = self.adapter.debug_sync(self.connection_id, cmd, args, progress_callback)
         if not res['success']:
             raise HardwareError("Could not execute debug command %s on device" % cmd, reason=res['failure_reason'])
 
@@ -244,7 +299,7 @@ class AdapterCMDStream(CMDStream):
 
     def _enable_tracing(self):
         self._traces = queue.Queue()
-        res = self.adapter.open_interface_sync(0, 'tracing')
+        res = self.adapter.open_interface_sync(self.connection_id, 'tracing')
         if not res['success']:
             raise HardwareError("Could not open tracing interface to device", reason=res['failure_reason'])
 
@@ -258,16 +313,26 @@ class AdapterCMDStream(CMDStream):
             self._broadcast_reports.put(report)
             return
 
-        if self._reports is None:
+        if self._reports is None or conn_id != self.connection_id:
             return
 
         self._reports.put(report)
 
     def _on_trace(self, conn_id, tracing_data):
-        if self._traces is None:
+        if self._traces is None or conn_id != self.connection_id:
             return
 
         self._traces.put(tracing_data)
 
     def _close(self):
-        self.adapter.stop_sync()
+        if self.owns_adapter:
+            self.adapter.stop_sync()
+            return
+
+        self.adapter.remove_callback('on_report', self._on_report)
+        self.adapter.remove_callback('on_trace', self._on_trace)
+        self.adapter.remove_callback('on_disconnect', self._on_disconnect)
+
+        if self.connected:
+            self.adapter.disconnect_sync(self.connection_id)
+            self.connected = False
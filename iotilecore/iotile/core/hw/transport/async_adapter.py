@@ -0,0 +1,560 @@
+"""An asyncio based interface to DeviceAdapters.
+
+DeviceAdapter operations are callback based and their _sync versions block
+the calling thread until the operation finishes.  This module defines
+AsyncDeviceAdapter, an interface where every operation returns an awaitable
+and reports, traces, scan results and disconnections are delivered through
+async iterators, so that a single event loop can manage many connections
+without a thread per blocking call.
+
+AsyncAdapterShim implements AsyncDeviceAdapter on top of any existing
+callback based DeviceAdapter.
+
+This module requires Python 3.5 or later and is not imported by
+iotile.core.hw.transport automatically.  It does not use the async/await
+syntax itself so that it can be installed alongside Python 2 code, but all
+of its awaitables can be used with await and async for.
+"""
+
+import asyncio
+import functools
+from collections import deque
+from iotile.core.exceptions import HardwareError
+from iotile.core.hw.exceptions import StreamOperationNotSupportedError, ModuleBusyError
+from iotile.core.hw.retry import DEFAULT_RETRY_POLICY
+from iotile.core.hw.reports import BroadcastReport
+
+
+class AdapterEventStream(object):
+    """An async iterator over events produced by a DeviceAdapter.
+
+    Events are added from the event loop thread with push().  Each stream
+    is meant to have a single consumer.  If max_events is given, the oldest
+    events are dropped once that many are waiting to be consumed.
+
+    Iteration stops once close() is called and all waiting events have been
+    consumed.
+
+    Args:
+        loop (asyncio.AbstractEventLoop): The loop that this stream is used from.
+        max_events (int): The maximum number of events to keep waiting.
+        on_close (callable): An optional function called once when this stream
+            is closed.
+    """
+
+    def __init__(self, loop, max_events=None, on_close=None):
+        self._loop = loop
+        self._events = deque(maxlen=max_events)
+        self._waiter = None
+        self._closed = False
+        self._on_close = on_close
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        future = self._loop.create_future()
+
+        if len(self._events) > 0:
+            future.set_result(self._events.popleft())
+        elif self._closed:
+            future.set_exception(StopAsyncIteration())
+        else:
+            self._waiter = future
+
+        return future
+
+    def __len__(self):
+        return len(self._events)
+
+    def push(self, event):
+        """Add an event to this stream.
+
+        This must be called from the event loop thread.
+
+        Args:
+            event (object): The event to add.
+        """
+
+        if self._closed:
+            return
+
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(event)
+            self._waiter = None
+            return
+
+        self._events.append(event)
+
+    def close(self):
+        """Stop this stream once all waiting events are consumed."""
+
+        if self._closed:
+            return
+
+        self._closed = True
+
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_exception(StopAsyncIteration())
+            self._waiter = None
+
+        if self._on_close is not None:
+            self._on_close(self)
+
+
+class AsyncDeviceAdapter(object):
+    """The interface of an asyncio based DeviceAdapter.
+
+    All operations are coroutines or return futures that must be awaited
+    from the event loop that the adapter was created with.  Operations that
+    fail raise HardwareError with the failure reason.
+
+    Unsolicited events are delivered through AdapterEventStream objects
+    returned by reports(), traces(), scan_results() and disconnections().
+    A stream only receives events that happen after it is created, so
+    create it before opening the interface that produces the events.
+
+    Subclasses should override the operations that they support.  All
+    operations raise StreamOperationNotSupportedError by default.
+    """
+
+    def connect(self, conn_id, connection_string):
+        """Connect to a device.
+
+        Args:
+            conn_id (int): A unique identifier that will refer to this connection
+            connection_string (str): An adapter specific string identifying the device.
+        """
+
+        raise StreamOperationNotSupportedError(command="connect")
+
+    def disconnect(self, conn_id):
+        """Disconnect from a device.
+
+        Args:
+            conn_id (int): The connection to close.
+        """
+
+        raise StreamOperationNotSupportedError(command="disconnect")
+
+    def open_interface(self, conn_id, interface, connection_string=None):
+        """Open an interface (rpc, script, streaming, tracing or debug) on a device.
+
+        Args:
+            conn_id (int): The connection to use.
+            interface (str): The interface to open.
+            connection_string (str): An optional adapter specific string used by
+                the debug interface.
+        """
+
+        raise StreamOperationNotSupportedError(command="open_interface")
+
+    def close_interface(self, conn_id, interface):
+        """Close an interface on a device.
+
+        Args:
+            conn_id (int): The connection to use.
+            interface (str): The interface to close.
+        """
+
+        raise StreamOperationNotSupportedError(command="close_interface")
+
+    def send_rpc(self, conn_id, address, rpc_id, payload, timeout):
+        """Send an RPC to a device.
+
+        Args:
+            conn_id (int): The connection to use.
+            address (int): The address of the tile to send the RPC to.
+            rpc_id (int): The 16-bit id of the RPC.
+            payload (bytes): The payload of the RPC.
+            timeout (float): The number of seconds to wait for the RPC to execute.
+
+        Returns:
+            (int, bytearray): The status and response payload of the RPC.
+        """
+
+        raise StreamOperationNotSupportedError(command="send_rpc")
+
+    def send_rpcs(self, conn_id, rpcs, window=None):
+        """Send a batch of RPCs to a device.
+
+        Args:
+            conn_id (int): The connection to use.
+            rpcs (list of tuple): The RPCs to send as (address, rpc_id, payload, timeout)
+                tuples.
+            window (int): The maximum number of RPCs to have in flight at once.
+
+        Returns:
+            list of dict: The result of each RPC in the same format as
+                DeviceAdapter.send_rpcs_sync.
+        """
+
+        raise StreamOperationNotSupportedError(command="send_rpcs")
+
+    def send_script(self, conn_id, data, progress_callback=None):
+        """Send a script to a device.
+
+        Args:
+            conn_id (int): The connection to use.
+            data (bytes): The script to send.
+            progress_callback (callable): An optional function called as
+                progress_callback(done_count, total_count).  It may be called
+                from another thread.
+        """
+
+        raise StreamOperationNotSupportedError(command="send_script")
+
+    def debug(self, conn_id, cmd_name, cmd_args, progress_callback=None):
+        """Run a debug command on a device.
+
+        Args:
+            conn_id (int): The connection to use.
+            cmd_name (str): The name of the debug command.
+            cmd_args (dict): The arguments of the command.
+            progress_callback (callable): An optional function called as
+                progress_callback(done_count, total_count).  It may be called
+                from another thread.
+
+        Returns:
+            object: The command specific return value.
+        """
+
+        raise StreamOperationNotSupportedError(command="debug")
+
+    def probe(self):
+        """Probe for devices.  Results are delivered through scan_results()."""
+
+        raise StreamOperationNotSupportedError(command="probe")
+
+    def reports(self, conn_id=None, broadcast=False, max_events=None):
+        """Create a stream of reports received from devices.
+
+        Args:
+            conn_id (int): Only include reports from this connection.  If None,
+                reports from every connection are included.
+            broadcast (bool): Include broadcast reports, which are not tied to
+                a connection.
+            max_events (int): The maximum number of unconsumed reports to keep.
+
+        Returns:
+            AdapterEventStream: A stream of IOTileReport objects.
+        """
+
+        raise StreamOperationNotSupportedError(command="reports")
+
+    def traces(self, conn_id=None, max_events=None):
+        """Create a stream of tracing data received from devices.
+
+        Args:
+            conn_id (int): Only include data from this connection.
+            max_events (int): The maximum number of unconsumed traces to keep.
+
+        Returns:
+            AdapterEventStream: A stream of bytearray objects.
+        """
+
+        raise StreamOperationNotSupportedError(command="traces")
+
+    def scan_results(self, max_events=None):
+        """Create a stream of devices seen while scanning.
+
+        Args:
+            max_events (int): The maximum number of unconsumed results to keep.
+
+        Returns:
+            AdapterEventStream: A stream of (device_info, expiration_time) tuples.
+        """
+
+        raise StreamOperationNotSupportedError(command="scan_results")
+
+    def disconnections(self, max_events=None):
+        """Create a stream of the connection ids that disconnected unexpectedly.
+
+        Args:
+            max_events (int): The maximum number of unconsumed events to keep.
+
+        Returns:
+            AdapterEventStream: A stream of integer connection ids.
+        """
+
+        raise StreamOperationNotSupportedError(command="disconnections")
+
+    def stop(self):
+        """Stop this adapter and close all of its event streams."""
+
+        raise StreamOperationNotSupportedError(command="stop")
+
+
+class AsyncAdapterShim(AsyncDeviceAdapter):
+    """Use a callback based DeviceAdapter through the AsyncDeviceAdapter interface.
+
+    Each operation calls the DeviceAdapter's _async method and resolves a
+    future from its callback.  Callbacks may be invoked on any thread, so
+    every result and event is handed to the event loop with
+    call_soon_threadsafe.  No threads are created by the shim itself.
+
+    Args:
+        adapter (DeviceAdapter): The adapter to wrap.
+        loop (asyncio.AbstractEventLoop): The event loop to use.  Defaults to
+            asyncio.get_event_loop().
+    """
+
+    def __init__(self, adapter, loop=None):
+        if loop is None:
+            loop = asyncio.get_event_loop()
+
+        self.adapter = adapter
+        self.loop = loop
+
+        self._report_streams = {}
+        self._trace_streams = {}
+        self._scan_streams = set()
+        self._disconnect_streams = set()
+
+        self.adapter.add_callback('on_report', self._on_report)
+        self.adapter.add_callback('on_trace', self._on_trace)
+        self.adapter.add_callback('on_scan', self._on_scan)
+        self.adapter.add_callback('on_disconnect', self._on_disconnect)
+
+    def _call(self, func, args, result_func):
+        """Call a callback based function and return a future for its result.
+
+        result_func is called with the callback's arguments and must return
+        a (success, failure_reason, result) tuple.
+        """
+
+        future = self.loop.create_future()
+
+        def _resolve(success, reason, result):
+            if future.done():
+                return
+
+            if success:
+                future.set_result(result)
+            else:
+                future.set_exception(HardwareError(reason, operation=func.__name__))
+
+        def _callback(*callback_args):
+            self.loop.call_soon_threadsafe(_resolve, *result_func(*callback_args))
+
+        func(*(args + (_callback,)))
+        return future
+
+    def connect(self, conn_id, connection_string):
+        return self._call(self.adapter.connect_async, (conn_id, connection_string), _status_result)
+
+    def disconnect(self, conn_id):
+        return self._call(self.adapter.disconnect_async, (conn_id,), _status_result)
+
+    def open_interface(self, conn_id, interface, connection_string=None):
+        func = functools.partial(_call_with_trailing, self.adapter.open_interface_async, connection_string)
+        func.__name__ = 'open_interface_async'
+        return self._call(func, (conn_id, interface), _status_result)
+
+    def close_interface(self, conn_id, interface):
+        if not hasattr(self.adapter, 'close_interface_async'):
+            raise StreamOperationNotSupportedError(command="close_interface")
+
+        return self._call(self.adapter.close_interface_async, (conn_id, interface), _status_result)
+
+    def send_rpc(self, conn_id, address, rpc_id, payload, timeout):
+        return self._call(self.adapter.send_rpc_async, (conn_id, address, rpc_id, payload, timeout), _rpc_result)
+
+    def send_rpcs(self, conn_id, rpcs, window=None):
+        func = functools.partial(_call_with_trailing, self.adapter.send_rpcs_async, window)
+        func.__name__ = 'send_rpcs_async'
+        return self._call(func, (conn_id, rpcs), lambda _conn_id, _adapter_id, results: (True, None, results))
+
+    def send_script(self, conn_id, data, progress_callback=None):
+        if progress_callback is None:
+            progress_callback = _ignore_progress
+
+        return self._call(self.adapter.send_script_async, (conn_id, data, progress_callback), _status_result)
+
+    def debug(self, conn_id, cmd_name, cmd_args, progress_callback=None):
+        if progress_callback is None:
+            progress_callback = _ignore_progress
+
+        return self._call(self.adapter.debug_async, (conn_id, cmd_name, cmd_args, progress_callback), _debug_result)
+
+    def probe(self):
+        return self._call(self.adapter.probe_async, (), lambda _adapter_id, success, reason: (success, reason, None))
+
+    def reports(self, conn_id=None, broadcast=False, max_events=None):
+        return self._subscribe(self._report_streams, (conn_id, broadcast), max_events)
+
+    def traces(self, conn_id=None, max_events=None):
+        return self._subscribe(self._trace_streams, conn_id, max_events)
+
+    def scan_results(self, max_events=None):
+        stream = AdapterEventStream(self.loop, max_events, on_close=self._scan_streams.discard)
+        self._scan_streams.add(stream)
+        return stream
+
+    def disconnections(self, max_events=None):
+        stream = AdapterEventStream(self.loop, max_events, on_close=self._disconnect_streams.discard)
+        self._disconnect_streams.add(stream)
+        return stream
+
+    def stop(self):
+        """Stop the wrapped adapter and close all event streams.
+
+        The wrapped adapter's stop_sync method blocks, so it is run in the
+        loop's default executor.
+        """
+
+        self.adapter.remove_callback('on_report', self._on_report)
+        self.adapter.remove_callback('on_trace', self._on_trace)
+        self.adapter.remove_callback('on_scan', self._on_scan)
+        self.adapter.remove_callback('on_disconnect', self._on_disconnect)
+
+        streams = list(self._scan_streams) + list(self._disconnect_streams)
+        streams += list(self._report_streams) + list(self._trace_streams)
+        for stream in streams:
+            stream.close()
+
+        return self.loop.run_in_executor(None, self.adapter.stop_sync)
+
+    def _subscribe(self, streams, key, max_events):
+        stream = AdapterEventStream(self.loop, max_events, on_close=lambda x: streams.pop(x, None))
+        streams[stream] = key
+        return stream
+
+    def _on_report(self, conn_id, report):
+        self.loop.call_soon_threadsafe(self._dispatch_report, conn_id, report)
+
+    def _dispatch_report(self, conn_id, report):
+        is_broadcast = isinstance(report, BroadcastReport)
+
+        for stream, (stream_conn, broadcast) in list(self._report_streams.items()):
+            if is_broadcast:
+                if broadcast:
+                    stream.push(report)
+            elif stream_conn is None or stream_conn == conn_id:
+                stream.push(report)
+
+    def _on_trace(self, conn_id, data):
+        self.loop.call_soon_threadsafe(self._dispatch_trace, conn_id, data)
+
+    def _dispatch_trace(self, conn_id, data):
+        for stream, stream_conn in list(self._trace_streams.items()):
+            if stream_conn is None or stream_conn == conn_id:
+                stream.push(data)
+
+    def _on_scan(self, adapter_id, info, expiration_time):
+        self.loop.call_soon_threadsafe(_push_all, self._scan_streams, (info, expiration_time))
+
+    def _on_disconnect(self, adapter_id, conn_id):
+        self.loop.call_soon_threadsafe(_push_all, self._disconnect_streams, conn_id)
+
+
+def send_rpc_retry(adapter, conn_id, address, rpc_id, payload, timeout, policy=None, tracker=None, loop=None):
+    """Send an RPC through an AsyncDeviceAdapter, retrying while the tile is busy.
+
+    Retries are scheduled on the event loop rather than blocking it, so
+    RPCs to other tiles and connections proceed while one tile is busy.
+
+    Args:
+        adapter (AsyncDeviceAdapter): The adapter to send the RPC with.
+        conn_id (int): The connection to use.
+        address (int): The address of the tile to send the RPC to.
+        rpc_id (int): The 16-bit id of the RPC.
+        payload (bytes): The payload of the RPC.
+        timeout (float): The number of seconds to wait for each attempt.
+        policy (RetryPolicy): How to retry the RPC.  Defaults to
+            DEFAULT_RETRY_POLICY.
+        tracker (TileBusyTracker): An optional tracker of busy tiles.  RPCs
+            to a tile that it knows is busy wait until the tile should be
+            free.  Tiles are tracked by (conn_id, address).
+        loop (asyncio.AbstractEventLoop): The event loop to use.  Defaults to
+            asyncio.get_event_loop().
+
+    Returns:
+        asyncio.Future: A future for the (status, payload) of the RPC that
+            fails with ModuleBusyError if the tile is still busy once the
+            policy's deadline passes.
+    """
+
+    if loop is None:
+        loop = asyncio.get_event_loop()
+    if policy is None:
+        policy = DEFAULT_RETRY_POLICY
+
+    result = loop.create_future()
+    retry = policy.start()
+    key = (conn_id, address)
+
+    def _attempt():
+        if tracker is not None:
+            wait = tracker.wait_time(key)
+            if wait > 0:
+                loop.call_later(wait, _attempt)
+                return
+
+        try:
+            attempt = asyncio.ensure_future(adapter.send_rpc(conn_id, address, rpc_id, payload, timeout), loop=loop)
+        except Exception as exc:  #pylint:disable=broad-except; We need to pass on any error to the caller
+            result.set_exception(exc)
+            return
+
+        attempt.add_done_callback(_on_done)
+
+    def _on_done(attempt):
+        if result.done():
+            return
+
+        if attempt.exception() is not None:
+            result.set_exception(attempt.exception())
+            return
+
+        status, response = attempt.result()
+        if status != 0:
+            if tracker is not None:
+                tracker.record_done(key, retry.retries, True)
+
+            result.set_result((status, response))
+            return
+
+        delay = retry.next_delay()
+        if delay is None:
+            if tracker is not None:
+                tracker.record_done(key, retry.retries, False)
+
+            result.set_exception(ModuleBusyError(address, retries=retry.retries, retry_delay=retry.total_delay))
+            return
+
+        if tracker is not None:
+            tracker.record_busy(key, delay)
+
+        loop.call_later(delay, _attempt)
+
+    _attempt()
+    return result
+
+
+def _push_all(streams, event):
+    for stream in list(streams):
+        stream.push(event)
+
+
+def _call_with_trailing(func, trailing, *args):
+    """Call a function whose callback is followed by one more optional argument."""
+
+    callback = args[-1]
+    return func(*(args[:-1] + (callback, trailing)))
+
+
+def _ignore_progress(_done, _total):
+    pass
+
+
+def _status_result(_conn_id, _adapter_id, success, reason):
+    return success, reason, None
+
+
+def _rpc_result(_conn_id, _adapter_id, success, reason, status, payload):
+    return success, reason, (status, payload)
+
+
+def _debug_result(_conn_id, _adapter_id, success, retval, reason):
+    return success, reason, retval
@@ -9,6 +9,7 @@
 from iotile.core.hw.exceptions import *
 from iotile.core.exceptions import *
 from iotile.core.hw.commands import RPCCommand
+from iotile.core.hw.retry import DEFAULT_RETRY_POLICY, TileBusyTracker
 import atexit
 import json
 import binascii
@@ -47,6 +48,10 @@ class CMDStream(object):
         self.record = record
         self.opened = True
 
+        # How proxy objects retry RPCs to busy tiles and which tiles are busy
+        self.retry_policy = DEFAULT_RETRY_POLICY
+        self.busy_tracker = TileBusyTracker()
+
         open_streams.add(self)
 
         if self.record is not None:
@@ -136,16 +141,7 @@ class CMDStream(object):
         call_payload = call_payload[:rpc.spec]
 
         status, payload = self._send_rpc(address, feature, command, call_payload, **kwargs)
-
-        #If we are recording this, save off the call and response
-        if self.record is not None:
-            if self.connection_string not in self._recording:
-                self._recording[self.connection_string] = []
-
-            call = "{0},{1},{2},{3}".format(address, feature, command, binascii.hexlify(call_payload))
-            response = "{0},{1}".format(status, binascii.hexlify(payload))
-
-            self._recording[self.connection_string].append((call, response))
+        self._record_rpc(address, feature, command, call_payload, status, payload)
 
         if status == 0:
             raise ModuleBusyError(address)
@@ -154,6 +150,76 @@ class CMDStream(object):
 
         return status, bytearray(payload)
 
+    def send_rpc_batch(self, rpcs, window=None, **kwargs):
+        """Send a list of RPCs, keeping several in flight at once if possible.
+
+        Streams that support it send up to window RPCs before waiting for
+        their responses, which hides the round trip latency of slow
+        connections.  RPCs are always started in the order they are given.
+        Streams that cannot pipeline RPCs send them one at a time.
+
+        For streams backed by a DeviceAdapter, the window is limited to the
+        adapter's 'max_rpc_window' config value, which is 1 unless the
+        adapter supports several RPCs in flight at once, so a larger window
+        passed here may have no effect.
+
+        Unlike send_rpc, a busy or missing tile does not raise an exception
+        so that the results of the other RPCs are not lost.  Check the
+        returned status of each RPC instead.
+
+        Args:
+            rpcs (list of tuple): The RPCs to send.  Each RPC is a tuple of
+                (address, feature, command, *args) with the same meaning as
+                the arguments to send_rpc.
+            window (int): The maximum number of RPCs to have in flight at
+                once.  Defaults to, and is limited to, the maximum supported
+                by the stream.
+            **kwargs: Additional keyword arguments, such as timeout, that
+                are used for every RPC.
+
+        Returns:
+            list of (int, bytearray): The status and response payload of
+                each RPC, in the same order as rpcs.
+        """
+
+        if not self.connected:
+            raise HardwareError("Cannot send an RPC if we are not in a connected state")
+
+        if not hasattr(self, '_send_rpc'):
+            raise StreamOperationNotSupportedError(command="send_rpc_batch")
+
+        calls = []
+        for rpc_info in rpcs:
+            rpc = RPCCommand(*rpc_info)
+            call_payload = rpc._format_args()
+            calls.append((rpc.addr, rpc.feat, rpc.cmd, call_payload[:rpc.spec]))
+
+        if hasattr(self, '_send_rpc_batch'):
+            responses = self._send_rpc_batch(calls, window, **kwargs)
+        else:
+            responses = [self._send_rpc(address, feature, command, payload, **kwargs) for address, feature, command, payload in calls]
+
+        results = []
+        for (address, feature, command, call_payload), (status, payload) in zip(calls, responses):
+            self._record_rpc(address, feature, command, call_payload, status, payload)
+            results.append((status, bytearray(payload)))
+
+        return results
+
+    def _record_rpc(self, address, feature, command, call_payload, status, payload):
+        """If we are recording this stream, save off an RPC call and response."""
+
+        if self.record is None:
+            return
+
+        if self.connection_string not in self._recording:
+            self._recording[self.connection_string] = []
+
+        call = "{0},{1},{2},{3}".format(address, feature, command, binascii.hexlify(call_payload))
+        response = "{0},{1}".format(status, binascii.hexlify(payload))
+
+        self._recording[self.connection_string].append((call, response))
+
     def enable_streaming(self):
         if not self.connected:
             raise HardwareError("Cannot enable streaming if we are not in a connected state")
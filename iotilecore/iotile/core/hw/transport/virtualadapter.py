@@ -124,6 +124,9 @@ class VirtualDeviceAdapter(DeviceAdapter):
         self.set_config('probe_required', True)
         self.set_config('probe_supported', True)
 
+        # RPCs are executed in order as soon as they are sent
+        self.set_config('max_rpc_window', 8)
+
     def _find_device_script(self, script_path):
         """Import a virtual device from a file rather than an installed module
 
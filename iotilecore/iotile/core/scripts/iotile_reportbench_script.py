@@ -0,0 +1,119 @@
+"""A command line script to benchmark IOTile report processing."""
+
+from __future__ import unicode_literals, absolute_import, print_function
+import sys
+import json
+import argparse
+import platform
+from iotile.core.exceptions import ArgumentError
+from iotile.core.hw.reports.benchmark import BENCHMARKS, run_benchmarks, skipped_benchmarks
+
+DESCRIPTION = \
+"""Benchmark the processing of IOTile reports.
+
+This program times the operations that are performed on every report received
+from a device: parsing reports out of a stream of data, decoding and verifying
+SignedListReport, BroadcastReport and FlexibleDictionaryReport objects and
+serializing reports to pass them between processes.
+
+Results can be printed as a table or saved as json so that they can be
+compared between versions to catch performance regressions.
+"""
+
+
+def build_args():
+    """Create command line parser."""
+
+    parser = argparse.ArgumentParser(description=DESCRIPTION, formatter_class=argparse.RawDescriptionHelpFormatter)
+
+    parser.add_argument('-b', '--benchmark', action="append", help="Only run the named benchmark (may be passed multiple times)")
+    parser.add_argument('-s', '--scale', type=float, default=1.0, help="Multiply the number of iterations of each benchmark by this factor")
+    parser.add_argument('-f', '--format', choices=['text', 'json'], default="text", help="The output format to use for the results")
+    parser.add_argument('-o', '--output', type=str, help="Save the results to a file rather than printing them")
+    parser.add_argument('-l', '--list', action="store_true", help="List the available benchmarks and exit")
+
+    return parser
+
+
+def format_results(results, output_format, skipped=None):
+    """Format benchmark results for display or storage.
+
+    Args:
+        results (list of BenchmarkResult): The results to format.
+        output_format (str): Either text or json.
+        skipped (dict): Optional reasons that benchmarks were skipped, keyed
+            by benchmark name.
+
+    Returns:
+        str: The formatted results.
+    """
+
+    if skipped is None:
+        skipped = {}
+
+    if output_format == 'json':
+        info = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': [dict(x._asdict()) for x in results],
+            'skipped': skipped
+        }
+
+        return json.dumps(info, indent=4, sort_keys=True)
+
+    lines = ["%-24s %10s %14s %14s" % ("Benchmark", "Iterations", "Total (s)", "Per Call (us)")]
+    for result in results:
+        lines.append("%-24s %10d %14.4f %14.2f" % (result.name, result.iterations, result.total_time, result.per_call*1e6))
+
+    for name in sorted(skipped):
+        lines.append("%-24s skipped: %s" % (name, skipped[name]))
+
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Main script entry point.
+
+    Args:
+        argv (list): The command line arguments, defaults to sys.argv if not passed.
+
+    Returns:
+        int: The return value of the script.
+    """
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = build_args()
+    args = parser.parse_args(args=argv)
+
+    skipped = skipped_benchmarks()
+
+    if args.list:
+        for name, _func, _iterations, _kwargs in BENCHMARKS:
+            if name in skipped:
+                print("%s (skipped: %s)" % (name, skipped[name]))
+            else:
+                print(name)
+        return 0
+
+    try:
+        results = run_benchmarks(args.benchmark, scale=args.scale)
+    except ArgumentError as err:
+        print("ERROR: could not run benchmarks")
+        print(str(err))
+        return 1
+
+    if args.benchmark is not None:
+        skipped = {}
+
+    output = format_results(results, args.format, skipped)
+
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w") as outfile:
+            outfile.write(output)
+            outfile.write("\n")
+
+    return 0
@@ -0,0 +1,85 @@
+"""Json files that cache the results of slow operations between processes.
+
+Caches are only an optimization, so errors reading or writing them are never
+raised.  A cache that cannot be read is treated as missing and a cache that
+cannot be written is simply not saved.
+"""
+
+import os
+import sys
+import json
+from iotile.core.utilities.paths import settings_directory
+
+
+def default_cache_folder():
+    """Find the folder that cache files should be stored in by default.
+
+    Caches describe the installed packages, so they are kept inside the
+    current virtual environment if there is one and in the per user IOTile
+    settings directory otherwise.
+
+    Returns:
+        str: The path to the folder, which may not exist yet.
+    """
+
+    # Support both virtualenv and python 3 venv
+    if hasattr(sys, 'real_prefix') or getattr(sys, 'base_prefix', sys.prefix) != sys.prefix:
+        return sys.prefix
+
+    return settings_directory()
+
+
+def load_json_cache(path):
+    """Load a json cache file.
+
+    Args:
+        path (str): The path to the cache file.
+
+    Returns:
+        object: The decoded contents of the file or None if the file does
+            not exist or could not be decoded.
+    """
+
+    if not os.path.isfile(path):
+        return None
+
+    try:
+        with open(path, "r") as infile:
+            return json.load(infile)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def save_json_cache(path, data):
+    """Atomically save a json cache file.
+
+    The data is written to a temporary file that is then moved into place,
+    so parallel processes never see a partially written cache file.  The
+    folder containing the file is created if needed.
+
+    Args:
+        path (str): The path to the cache file.
+        data (object): The json serializable data to save.
+
+    Returns:
+        bool: Whether the file was saved.
+    """
+
+    temp_file = '{}.{}.tmp'.format(path, os.getpid())
+
+    try:
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder, 0o755)
+
+        with open(temp_file, "w") as outfile:
+            json.dump(data, outfile)
+
+        if os.path.exists(path) and sys.platform == 'win32':
+            os.remove(path)
+
+        os.rename(temp_file, path)
+    except (IOError, OSError):
+        return False
+
+    return True
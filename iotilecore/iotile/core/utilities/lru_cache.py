@@ -0,0 +1,67 @@
+"""A small thread safe least recently used cache."""
+
+# This file is copyright Arch Systems, Inc.
+# Except as otherwise provided in the relevant LICENSE file, all rights are reserved.
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """A fixed size mapping that forgets the least recently used entries.
+
+    Once the cache holds max_size entries, adding a new entry removes the
+    entry that was least recently stored or retrieved.  All operations are
+    protected by a lock so a single cache can be shared between threads.
+
+    Args:
+        max_size (int): The maximum number of entries to store.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """Get an entry from the cache and mark it as recently used.
+
+        Args:
+            key (object): The hashable key to look up.
+            default (object): The value to return if key is not in the cache.
+
+        Returns:
+            object: The cached value or default if there is none.
+        """
+
+        with self._lock:
+            if key not in self._data:
+                return default
+
+            value = self._data.pop(key)
+            self._data[key] = value
+            return value
+
+    def put(self, key, value):
+        """Store an entry in the cache, removing the oldest entry if full.
+
+        Args:
+            key (object): The hashable key to store.
+            value (object): The value to store.
+        """
+
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+
+        with self._lock:
+            self._data.clear()
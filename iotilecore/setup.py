@@ -38,7 +38,8 @@ setup(
         'console_scripts': [
             'iotile = iotile.core.scripts.iotile_script:main',
             'virtual_device = iotile.core.scripts.virtualdev_script:main',
-            'iotile-updateinfo = iotile.core.scripts.iotile_updateinfo_script:main'
+            'iotile-updateinfo = iotile.core.scripts.iotile_updateinfo_script:main',
+            'iotile-reportbench = iotile.core.scripts.iotile_reportbench_script:main'
         ],
         'iotile.cmdstream': [
             'ws = iotile.core.hw.transport.websocketstream:WebSocketStream',
@@ -38,3 +38,30 @@ def test_key_finding(monkeypatch):
 
     #Make sure we also find the hash only auth module
     auth.sign_report(2, 0, data, report_id=0, sent_timestamp=0)
+
+
+def test_shared_chain_caching(monkeypatch):
+    """Make sure the shared chain and its key caches track key changes."""
+
+    key1 = '0000000000000000000000000000000000000000000000000000000000000000'
+    key2 = '1111111111111111111111111111111111111111111111111111111111111111'
+    monkeypatch.setenv('USER_KEY_00000001', key1)
+
+    auth = ChainedAuthProvider.Default()
+    assert ChainedAuthProvider.Default() is auth
+
+    data = bytearray("what do ya want for nothing?".encode('utf-8'))
+
+    sig1 = auth.sign_report(1, ChainedAuthProvider.UserKey, data, report_id=5, sent_timestamp=10)['signature']
+    assert auth.sign_report(1, ChainedAuthProvider.UserKey, data, report_id=5, sent_timestamp=10)['signature'] == sig1
+    assert auth.verify_report(1, ChainedAuthProvider.UserKey, data, sig1, report_id=5, sent_timestamp=10)['verified'] is True
+
+    # Changing the key must not use any cached keys
+    monkeypatch.setenv('USER_KEY_00000001', key2)
+    sig2 = auth.sign_report(1, ChainedAuthProvider.UserKey, data, report_id=5, sent_timestamp=10)['signature']
+    assert sig2 != sig1
+    assert auth.verify_report(1, ChainedAuthProvider.UserKey, data, sig1, report_id=5, sent_timestamp=10)['verified'] is False
+
+    monkeypatch.delenv('USER_KEY_00000001')
+    with pytest.raises(NotFoundError):
+        auth.sign_report(1, ChainedAuthProvider.UserKey, data, report_id=5, sent_timestamp=10)
@@ -0,0 +1,129 @@
+"""Tests for using DeviceAdapters from asyncio."""
+
+import sys
+import threading
+import pytest
+from iotile.core.hw.transport.adapter import DeviceAdapter
+from iotile.core.hw.transport.virtualadapter import VirtualDeviceAdapter
+from iotile.core.hw.exceptions import StreamOperationNotSupportedError
+from iotile.core.exceptions import HardwareError
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 5), reason="requires asyncio")
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from iotile.core.hw.transport.async_adapter import AsyncAdapterShim, AsyncDeviceAdapter, AdapterEventStream
+
+
+class ThreadedAdapter(DeviceAdapter):
+    """An adapter that calls its callbacks from a background thread."""
+
+    def send_rpc_async(self, conn_id, address, rpc_id, payload, timeout, callback):
+        def _finish():
+            self._trigger_callback('on_trace', conn_id, bytearray(b'trace'))
+            callback(conn_id, self.id, True, None, 0, bytearray([address]) + payload)
+
+        threading.Timer(0.01, _finish).start()
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def virtual(loop):
+    adapter = VirtualDeviceAdapter('report_test')
+    shim = AsyncAdapterShim(adapter, loop=loop)
+    yield shim
+    loop.run_until_complete(shim.stop())
+
+
+def _collect(loop, stream, count):
+    return [loop.run_until_complete(stream.__anext__()) for _i in range(0, count)]
+
+
+def test_connect_and_rpc(loop, virtual):
+    """Make sure we can connect and send RPCs through the shim."""
+
+    loop.run_until_complete(virtual.connect(1, '1'))
+    loop.run_until_complete(virtual.open_interface(1, 'rpc'))
+
+    status, payload = loop.run_until_complete(virtual.send_rpc(1, 8, 0x0004, b'', 1.0))
+    assert status == 0xC0
+    assert len(payload) == 12
+
+    results = loop.run_until_complete(virtual.send_rpcs(1, [(8, 0x0004, b'', 1.0)]*3, window=2))
+    assert [x['payload'] for x in results] == [payload]*3
+
+    loop.run_until_complete(virtual.disconnect(1))
+
+
+def test_failures(loop, virtual):
+    """Make sure failed operations raise HardwareError."""
+
+    with pytest.raises(HardwareError):
+        loop.run_until_complete(virtual.connect(1, '5'))
+
+    with pytest.raises(HardwareError):
+        loop.run_until_complete(virtual.open_interface(2, 'rpc'))
+
+    with pytest.raises(StreamOperationNotSupportedError):
+        AsyncDeviceAdapter().connect(1, '1')
+
+
+def test_reports(loop, virtual):
+    """Make sure reports are delivered through an async iterator."""
+
+    reports = virtual.reports(1)
+    other = virtual.reports(2)
+
+    loop.run_until_complete(virtual.connect(1, '1'))
+    loop.run_until_complete(virtual.open_interface(1, 'streaming'))
+
+    received = _collect(loop, reports, 100)
+    assert len(received) == 100
+    assert len(other) == 0
+
+    reports.close()
+    with pytest.raises(StopAsyncIteration):
+        loop.run_until_complete(reports.__anext__())
+
+
+def test_scan_results(loop, virtual):
+    """Make sure probe results are delivered as scan events."""
+
+    results = virtual.scan_results()
+    loop.run_until_complete(virtual.probe())
+
+    info, _expiration = loop.run_until_complete(results.__anext__())
+    assert info['uuid'] == 1
+
+
+def test_threaded_callbacks(loop):
+    """Make sure callbacks from other threads are handed to the event loop."""
+
+    shim = AsyncAdapterShim(ThreadedAdapter(), loop=loop)
+    traces = shim.traces(1)
+
+    status, payload = loop.run_until_complete(shim.send_rpc(1, 10, 0x1234, b'\x01', 1.0))
+    assert status == 0
+    assert payload == bytearray([10, 1])
+
+    assert loop.run_until_complete(traces.__anext__()) == bytearray(b'trace')
+
+
+def test_bounded_stream(loop):
+    """Make sure bounded streams drop their oldest events."""
+
+    stream = AdapterEventStream(loop, max_events=2)
+    for i in range(0, 5):
+        stream.push(i)
+
+    stream.close()
+    assert _collect(loop, stream, 2) == [3, 4]
+
+    with pytest.raises(StopAsyncIteration):
+        loop.run_until_complete(stream.__anext__())
@@ -0,0 +1,159 @@
+"""Tests for lazily finding installed proxy and app classes."""
+
+import os
+import sys
+import json
+import pytest
+from iotile.core.dev.registry import ComponentRegistry
+from iotile.core.hw.discovery import PluginIndex
+
+PROXY_MODULE = """
+from iotile.core.hw.proxy.proxy import TileBusProxyObject
+
+class IndexTestProxy(TileBusProxyObject):
+    @classmethod
+    def ModuleName(cls):
+        return '{name}'
+"""
+
+APP_MODULE = """
+from iotile.core.hw.app.app import IOTileApp
+from iotile.core.dev.semver import SemanticVersionRange
+
+class IndexTestApp(IOTileApp):
+    @classmethod
+    def MatchInfo(cls):
+        return [(4321, SemanticVersionRange.FromString("^1.0.0"), 50)]
+
+    @classmethod
+    def AppName(cls):
+        return 'index_test_app'
+"""
+
+SETTINGS = {
+    "file_format": "v2",
+    "module_name": "index_test_component",
+    "products": {
+        "python/index_test_proxy.py": "proxy_module",
+        "python/index_test_app.py": "app_module"
+    }
+}
+
+
+def _write_proxy(folder, name):
+    with open(os.path.join(folder, 'python', 'index_test_proxy.py'), "w") as outfile:
+        outfile.write(PROXY_MODULE.format(name=name))
+
+
+def _forget_modules():
+    for name in ('index_test_proxy', 'index_test_app'):
+        sys.modules.pop(name, None)
+
+    PluginIndex.ClearCache()
+
+
+@pytest.fixture
+def component(tmpdir):
+    """Register a component that provides a proxy and an app."""
+
+    folder = str(tmpdir.mkdir('component'))
+    os.mkdir(os.path.join(folder, 'python'))
+
+    with open(os.path.join(folder, 'module_settings.json'), "w") as outfile:
+        json.dump(SETTINGS, outfile)
+
+    _write_proxy(folder, 'idxtst')
+    with open(os.path.join(folder, 'python', 'index_test_app.py'), "w") as outfile:
+        outfile.write(APP_MODULE)
+
+    old_type, old_file = ComponentRegistry.BackingType, ComponentRegistry.BackingFileName
+    ComponentRegistry.SetBackingStore('memory')
+
+    reg = ComponentRegistry()
+    reg.clear()
+    reg.add_component(folder)
+
+    _forget_modules()
+    yield folder, str(tmpdir.join('index.json'))
+    _forget_modules()
+
+    reg.clear()
+    ComponentRegistry.BackingType, ComponentRegistry.BackingFileName = old_type, old_file
+
+
+def test_lookup(component):
+    """Make sure proxies and apps from components and entry points are found."""
+
+    _folder, index_file = component
+    index = PluginIndex(index_file)
+
+    proxies = index.find_proxies('idxtst')
+    assert [x.__name__ for x in proxies] == ['IndexTestProxy']
+    assert index.find_proxy_class('IndexTestProxy') is proxies[0]
+    assert index.find_proxy_class('UnknownProxy') is None
+    assert 'idxtst' in index.proxy_names()
+
+    apps = index.find_apps(4321)
+    assert [x[2].__name__ for x in apps] == ['IndexTestApp']
+    assert index.find_apps(1234) == []
+    assert index.find_named_app('index_test_app') is apps[0][2]
+
+    # Apps installed through entry points are also found
+    assert index.find_named_app('device_info') is not None
+
+
+def test_lazy_loading(component):
+    """Make sure a saved index is used without importing any modules."""
+
+    _folder, index_file = component
+    PluginIndex(index_file).refresh()
+    assert os.path.isfile(index_file)
+
+    _forget_modules()
+    index = PluginIndex(index_file)
+    index.refresh()
+    assert 'index_test_proxy' not in sys.modules
+    assert 'index_test_app' not in sys.modules
+
+    assert index.find_named_app('index_test_app').__name__ == 'IndexTestApp'
+    assert 'index_test_app' in sys.modules
+    assert 'index_test_proxy' not in sys.modules
+
+    assert len(index.find_proxies('idxtst')) == 1
+    assert 'index_test_proxy' in sys.modules
+
+
+def test_invalidation(component):
+    """Make sure modules that change are indexed again."""
+
+    folder, index_file = component
+    assert len(PluginIndex(index_file).find_proxies('idxtst')) == 1
+
+    _forget_modules()
+    _write_proxy(folder, 'newnam')
+    proxy_path = os.path.join(folder, 'python', 'index_test_proxy.py')
+    mtime = os.path.getmtime(proxy_path) + 10
+    os.utime(proxy_path, (mtime, mtime))
+
+    index = PluginIndex(index_file)
+    assert index.find_proxies('idxtst') == []
+    assert len(index.find_proxies('newnam')) == 1
+
+    # Components removed from the registry are dropped from the index
+    ComponentRegistry().clear()
+    index = PluginIndex(index_file)
+    assert index.find_proxies('newnam') == []
+    assert index.find_named_app('index_test_app') is None
+
+
+def test_corrupt_index(component):
+    """Make sure a corrupt index file is rebuilt."""
+
+    _folder, index_file = component
+    with open(index_file, "w") as outfile:
+        outfile.write("not json")
+
+    assert len(PluginIndex(index_file).find_proxies('idxtst')) == 1
+
+    with open(index_file, "r") as infile:
+        assert json.load(infile)['version'] == PluginIndex.IndexVersion
@@ -0,0 +1,144 @@
+"""Tests for sending batches of RPCs with a window of outstanding RPCs."""
+
+import logging
+import threading
+import pytest
+from iotile.core.hw.hwmanager import HardwareManager
+from iotile.core.hw.transport.adapter import DeviceAdapter
+from iotile.core.hw.transport.cmdstream import CMDStream
+from iotile.core.exceptions import HardwareError
+
+
+class DelayedAdapter(DeviceAdapter):
+    """An adapter that finishes each RPC on a background thread."""
+
+    def __init__(self, synchronous=False):
+        super(DelayedAdapter, self).__init__()
+        self.synchronous = synchronous
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = []
+        self.broken_ids = set()
+        self._lock = threading.Lock()
+
+    def send_rpc_async(self, conn_id, address, rpc_id, payload, timeout, callback):
+        if rpc_id in self.broken_ids:
+            raise RuntimeError("Could not send RPC")
+
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.started.append(rpc_id)
+
+        def _finish():
+            with self._lock:
+                self.in_flight -= 1
+
+            callback(conn_id, self.id, True, None, 0xC0, bytearray([address, rpc_id & 0xFF]) + payload)
+
+        if self.synchronous:
+            _finish()
+        else:
+            threading.Timer(0.001, _finish).start()
+
+
+def make_rpcs(count):
+    return [(8, i, bytearray([i & 0xFF]), 1.0) for i in range(0, count)]
+
+
+def test_default_window(caplog):
+    """Make sure adapters send one RPC at a time unless they opt in."""
+
+    adapter = DelayedAdapter()
+    with caplog.at_level(logging.DEBUG, logger='iotile.core.hw.transport.adapter'):
+        results = adapter.send_rpcs_sync(0, make_rpcs(10), window=5)
+
+    assert "max_rpc_window of 1" in caplog.text
+    assert adapter.max_in_flight == 1
+    assert adapter.started == list(range(0, 10))
+    assert [x['payload'] for x in results] == [bytearray([8, i, i]) for i in range(0, 10)]
+
+
+def test_rpc_window():
+    """Make sure several RPCs are kept in flight and results stay in order."""
+
+    adapter = DelayedAdapter()
+    adapter.set_config('max_rpc_window', 4)
+
+    results = adapter.send_rpcs_sync(0, make_rpcs(40))
+    assert adapter.max_in_flight == 4
+    assert adapter.started == list(range(0, 40))
+    assert all(x['success'] for x in results)
+    assert [x['payload'][1] for x in results] == list(range(0, 40))
+
+    adapter.max_in_flight = 0
+    adapter.send_rpcs_sync(0, make_rpcs(10), window=2)
+    assert adapter.max_in_flight == 2
+
+    assert adapter.send_rpcs_sync(0, []) == []
+
+
+@pytest.mark.parametrize("synchronous", [False, True])
+def test_send_error(synchronous):
+    """Make sure an error sending one RPC fails only that RPC."""
+
+    adapter = DelayedAdapter(synchronous=synchronous)
+    adapter.set_config('max_rpc_window', 4)
+    adapter.broken_ids = set([3, 7])
+
+    results = adapter.send_rpcs_sync(0, make_rpcs(10))
+    assert [x['success'] for x in results] == [i not in (3, 7) for i in range(0, 10)]
+    assert results[3]['failure_reason'] == "Could not send RPC"
+    assert adapter.started == [0, 1, 2, 4, 5, 6, 8, 9]
+
+
+def test_synchronous_adapter():
+    """Make sure adapters that call back immediately do not recurse."""
+
+    adapter = DelayedAdapter(synchronous=True)
+    adapter.set_config('max_rpc_window', 8)
+
+    results = adapter.send_rpcs_sync(0, make_rpcs(5000))
+    assert len(results) == 5000
+    assert results[-1]['payload'] == bytearray([8, 4999 & 0xFF, 4999 & 0xFF])
+    assert adapter.max_in_flight == 1
+
+
+class SimpleStream(CMDStream):
+    """A stream that only knows how to send single RPCs."""
+
+    def _connect_direct(self, connection_string):
+        pass
+
+    def _send_rpc(self, address, feature, cmd, payload, **kwargs):
+        return 0xC0, bytearray([address, feature, cmd]) + payload
+
+
+def test_stream_fallback():
+    """Make sure streams without batch support send RPCs one at a time."""
+
+    stream = SimpleStream(None, 'device')
+    try:
+        results = stream.send_rpc_batch([(8, 0, 4), (9, 1, 2, b'\x01\x02')])
+        assert results == [(0xC0, bytearray([8, 0, 4])), (0xC0, bytearray([9, 1, 2, 1, 2]))]
+    finally:
+        stream.close()
+
+
+def test_adapter_stream_batch():
+    """Make sure batches sent through a HardwareManager match single RPCs."""
+
+    hw = HardwareManager('virtual:report_test')
+    try:
+        assert hw.stream.adapter.get_config('max_rpc_window') > 1
+
+        with pytest.raises(HardwareError):
+            hw.stream.send_rpc_batch([(8, 0, 4)])
+
+        hw.connect(1)
+        expected = hw.stream.send_rpc(8, 0x00, 0x04)
+
+        results = hw.stream.send_rpc_batch([(8, 0x00, 0x04)]*10, timeout=1.0)
+        assert results == [expected]*10
+    finally:
+        hw.close()
@@ -0,0 +1,169 @@
+"""Tests for retrying RPCs sent to busy tiles."""
+
+import sys
+import pytest
+from iotile.core.hw.transport.cmdstream import CMDStream
+from iotile.core.hw.proxy.proxy import TileBusProxyObject
+from iotile.core.hw.retry import RetryPolicy, TileBusyTracker
+from iotile.core.hw.exceptions import ModuleBusyError
+from iotile.core.exceptions import ArgumentError
+
+FAST_POLICY = RetryPolicy(initial_delay=0.001, max_delay=0.005, jitter=0.1, deadline=1.0)
+
+
+class BusyStream(CMDStream):
+    """A stream whose tiles are busy for a fixed number of RPCs."""
+
+    def __init__(self, busy_counts):
+        self.busy_counts = busy_counts
+        self.sent = []
+        super(BusyStream, self).__init__(None, 'device')
+
+    def _connect_direct(self, connection_string):
+        pass
+
+    def _send_rpc(self, address, feature, cmd, payload, **kwargs):
+        self.sent.append(address)
+
+        if self.busy_counts.get(address, 0) > 0:
+            self.busy_counts[address] -= 1
+            return 0, bytearray()
+
+        return 0xC0, bytearray([address, 0])
+
+
+@pytest.fixture
+def busy_stream():
+    stream = BusyStream({8: 3, 9: 0})
+    stream.retry_policy = FAST_POLICY
+    yield stream
+    stream.close()
+
+
+def test_policy_delays():
+    """Make sure delays back off exponentially up to their maximum."""
+
+    policy = RetryPolicy(initial_delay=0.1, max_delay=1.0, backoff=2.0, jitter=0.0)
+    assert [policy.delay(i) for i in range(0, 6)] == pytest.approx([0.1, 0.2, 0.4, 0.8, 1.0, 1.0])
+
+    policy = RetryPolicy(initial_delay=0.1, jitter=0.5)
+    for _i in range(0, 100):
+        assert 0.05 <= policy.delay(0) <= 0.15
+
+    with pytest.raises(ArgumentError):
+        RetryPolicy(backoff=0.5)
+
+    with pytest.raises(ArgumentError):
+        RetryPolicy(jitter=2.0)
+
+
+def test_deadline():
+    """Make sure retries stop at the policy's deadline."""
+
+    retry = RetryPolicy(deadline=0.0).start()
+    assert retry.next_delay() is None
+
+    retry = RetryPolicy(initial_delay=10.0, max_delay=10.0, jitter=0.0, deadline=0.5).start()
+    assert retry.next_delay() <= 0.5
+    assert retry.retries == 1
+
+
+def test_proxy_retry(busy_stream):
+    """Make sure proxy objects retry RPCs until the tile is no longer busy."""
+
+    proxy = TileBusProxyObject(busy_stream, 8)
+    res = proxy.rpc(0x00, 0x04, result_type=(1, False))
+    assert res['ints'] == [8]
+    assert busy_stream.sent == [8, 8, 8, 8]
+
+    stats = busy_stream.busy_tracker.stats()
+    assert stats['busy_responses'] == 3
+    assert stats['retried_rpcs'] == 1
+    assert stats['max_retries'] == 3
+    assert stats['failed_rpcs'] == 0
+    assert list(stats['tiles']) == [8]
+
+    # Tiles that are not busy are not tracked
+    proxy = TileBusProxyObject(busy_stream, 9)
+    proxy.rpc(0x00, 0x04, result_type=(1, False))
+    assert list(busy_stream.busy_tracker.stats()['tiles']) == [8]
+
+
+def test_proxy_busy_deadline(busy_stream):
+    """Make sure a tile that stays busy raises ModuleBusyError."""
+
+    busy_stream.busy_counts[8] = 1000000
+
+    proxy = TileBusProxyObject(busy_stream, 8)
+    with pytest.raises(ModuleBusyError):
+        proxy.rpc(0x00, 0x04, retry_policy=RetryPolicy(initial_delay=0.001, max_delay=0.002, deadline=0.05))
+
+    assert busy_stream.busy_tracker.stats()['failed_rpcs'] == 1
+
+    with pytest.raises(ModuleBusyError):
+        proxy.rpc(0x00, 0x04, retry_policy=RetryPolicy(deadline=0.0))
+
+
+def test_busy_tracker():
+    """Make sure busy tiles are tracked separately."""
+
+    tracker = TileBusyTracker()
+    tracker.record_busy(8, 10.0)
+
+    assert tracker.wait_time(8) > 9.0
+    assert tracker.wait_time(9) == 0.0
+
+    tracker.record_done(8, 1, True)
+    assert tracker.wait_time(8) == 0.0
+    assert tracker.stats()['retry_delay'] == 10.0
+
+    tracker.reset()
+    assert tracker.stats()['tiles'] == {}
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5), reason="requires asyncio")
+def test_async_retry():
+    """Make sure async RPCs are retried without blocking other tiles."""
+
+    import asyncio
+    from iotile.core.hw.transport.async_adapter import AsyncDeviceAdapter, send_rpc_retry
+
+    class BusyAdapter(AsyncDeviceAdapter):
+        def __init__(self, loop):
+            self.loop = loop
+            self.busy = {8: 3}
+            self.sent = []
+
+        def send_rpc(self, conn_id, address, rpc_id, payload, timeout):
+            self.sent.append(address)
+
+            future = self.loop.create_future()
+            if self.busy.get(address, 0) > 0:
+                self.busy[address] -= 1
+                future.set_result((0, bytearray()))
+            else:
+                future.set_result((0xC0, bytearray([address])))
+
+            return future
+
+    loop = asyncio.new_event_loop()
+    try:
+        adapter = BusyAdapter(loop)
+        tracker = TileBusyTracker()
+
+        busy = send_rpc_retry(adapter, 1, 8, 0x0004, b'', 1.0, policy=FAST_POLICY, tracker=tracker, loop=loop)
+        free = send_rpc_retry(adapter, 1, 9, 0x0004, b'', 1.0, policy=FAST_POLICY, tracker=tracker, loop=loop)
+
+        results = loop.run_until_complete(asyncio.gather(busy, free))
+        assert results == [(0xC0, bytearray([8])), (0xC0, bytearray([9]))]
+
+        # The free tile is not held up by the busy one
+        assert adapter.sent.index(9) < 2
+        assert tracker.stats()['tiles'][(1, 8)]['busy_responses'] == 3
+
+        adapter.busy[8] = 1000000
+        with pytest.raises(ModuleBusyError):
+            loop.run_until_complete(send_rpc_retry(adapter, 1, 8, 0x0004, b'', 1.0,
+                                                   policy=RetryPolicy(initial_delay=0.001, max_delay=0.002, deadline=0.05), loop=loop))
+    finally:
+        loop.close()
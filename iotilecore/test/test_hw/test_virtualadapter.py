@@ -220,3 +220,81 @@ def test_tilebased_device(tile_based):
 
     assert tile1.add(3, 5) == 8
     tile1.count()
+
+
+@pytest.fixture
+def multi_report_hw():
+    conf_file = os.path.join(os.path.dirname(__file__), 'report_test_config_hash.json')
+
+    if '@' in conf_file or ',' in conf_file or ';' in conf_file:
+        pytest.skip('Cannot pass device config because path has [@,;] in it')
+
+    hw = HardwareManager('virtual:report_test;report_test@%s' % conf_file)
+    yield hw
+
+    hw.close()
+
+
+def test_connect_many(multi_report_hw):
+    """Make sure we can connect to many devices through one adapter."""
+
+    hw = multi_report_hw
+
+    dev1, dev2 = hw.connect_many([1, 2])
+    assert dev1.stream.adapter is hw.stream.adapter
+    assert dev1.stream.connection_id != dev2.stream.connection_id
+
+    dev1.enable_streaming()
+    dev2.enable_streaming()
+    assert dev1.count_reports() == 100
+    assert dev2.count_reports() == 11
+
+    assert all(x.origin == 1 for x in dev1.iter_reports())
+    assert all(x.origin == 2 for x in dev2.iter_reports())
+
+    # Each handle has its own proxies and a disconnect only affects one device
+    dev1.disconnect()
+    assert dev2.stream.connected
+    assert dev2.controller().tile_name() == 'Rptdev'
+
+    dev1.close()
+    dev1, = hw.connect_many_direct(['1'])
+    assert dev1.controller().tile_name() == 'Rptdev'
+
+
+def test_connect_many_failure(multi_report_hw):
+    """Make sure a failed connection does not leave other devices connected."""
+
+    hw = multi_report_hw
+
+    with pytest.raises(HardwareError):
+        hw.connect_many([1, 3])
+
+    with pytest.raises(HardwareError):
+        hw.connect_many_direct(['1', '3'])
+
+    assert len(hw.stream.adapter.connections) == 0
+
+    hw.connect(1)
+    hw.disconnect()
+
+
+def test_connect_many_unexpected_error(multi_report_hw, monkeypatch):
+    """Make sure connections are cleaned up after any kind of error."""
+
+    hw = multi_report_hw
+    connect_direct = HardwareManager.connect_direct
+
+    def _connect_direct(self, connection_string):
+        if connection_string == '2':
+            raise ValueError("Unexpected error")
+
+        return connect_direct(self, connection_string)
+
+    monkeypatch.setattr(HardwareManager, 'connect_direct', _connect_direct)
+
+    with pytest.raises(HardwareError) as excinfo:
+        hw.connect_many_direct(['1', '2'])
+
+    assert list(excinfo.value.params['failures']) == ['2']
+    assert len(hw.stream.adapter.connections) == 0
@@ -80,3 +80,65 @@ def test_decoding_flexible_report():
         "delta_v_y": 0.0,
         "delta_v_z": 0.0
     }
+
+
+def _make_event_report(raw_size):
+    data = {
+        "format": "v100",
+        "device": 10,
+        "incremental_id": 5,
+        "events": [
+            {
+                "stream": 0x5020,
+                "device_timestamp": i,
+                "timestamp": None,
+                "streamer_local_id": i + 1,
+                "extra_data": {"peak": i},
+                "data": {"waveform": list(range(0, min(raw_size, 100))), "blob": b'\x00'*raw_size}
+            } for i in range(0, 3)
+        ],
+        "data": [
+            {"stream": 0x1000, "device_timestamp": 1, "streamer_local_id": 10, "timestamp": None, "value": 2}
+        ]
+    }
+
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def test_skip_raw_data():
+    """Make sure we can decode event summaries without their raw data."""
+
+    encoded = _make_event_report(2*1024*1024)
+
+    report = FlexibleDictionaryReport(encoded, False, False, include_raw_data=False)
+    assert report.origin == 10
+    assert report.report_id == 5
+    assert len(report.visible_readings) == 1
+    assert report.visible_readings[0].value == 2
+    assert [x.summary_data for x in report.visible_events] == [{"peak": 0}, {"peak": 1}, {"peak": 2}]
+    assert all(x.raw_data is None for x in report.visible_events)
+    assert report._report_dict is None
+
+    # Raw data can still be streamed one event at a time
+    events = list(report.iter_events(include_raw_data=True))
+    assert len(events[2].raw_data['blob']) == 2*1024*1024
+    assert report._report_dict is None
+
+    readings = list(report.iter_readings())
+    assert readings == report.visible_readings
+
+
+def test_cached_dict():
+    """Make sure a fully decoded report is only unpacked once."""
+
+    encoded = _make_event_report(10)
+
+    report = FlexibleDictionaryReport(encoded, False, False)
+    assert report.visible_events[1].raw_data['waveform'] == list(range(0, 10))
+    assert report.asdict() is report.asdict()
+    assert report.asdict() == msgpack.unpackb(encoded, raw=False)
+
+    events = list(report.iter_events())
+    assert [x.reading_id for x in events] == [1, 2, 3]
+    assert all(x.raw_data is None for x in events)
+    assert 'data' in report.asdict()['events'][0]
@@ -0,0 +1,74 @@
+"""Tests for lazily decoded lists of readings."""
+
+import struct
+import datetime
+import pytest
+from iotile.core.hw.reports import IOTileReading, LazyReadingList, SignedListReport, BroadcastReport
+
+
+def make_readings(count):
+    return [IOTileReading(i*10, 0x5000 + i, i*2, reading_id=i+1) for i in range(0, count)]
+
+
+def pack_readings(readings, prefix=b''):
+    data = bytearray(prefix)
+    for reading in readings:
+        data += struct.pack("<HHLLL", reading.stream, 0, reading.reading_id, reading.raw_time, reading.value)
+
+    return data
+
+
+def test_lazy_list():
+    """Make sure a lazy reading list behaves like a list of readings."""
+
+    readings = make_readings(10)
+    lazy = LazyReadingList(pack_readings(readings, b'abcd'), 4, 10)
+
+    assert len(lazy) == 10
+    assert lazy == readings
+    assert list(lazy) == readings
+    assert lazy[-1] == readings[-1]
+    assert lazy[2:5] == readings[2:5]
+    assert lazy[3] is lazy[3]
+    assert lazy != readings[:-1]
+
+    with pytest.raises(IndexError):
+        lazy[10]
+
+    assert lazy.streams == [x.stream for x in readings]
+    assert lazy.reading_ids == [x.reading_id for x in readings]
+    assert lazy.raw_times == [x.raw_time for x in readings]
+    assert lazy.values == [x.value for x in readings]
+    assert lazy.reading_times == [None]*10
+
+    with pytest.raises(ValueError):
+        LazyReadingList(pack_readings(readings), 4, 10)
+
+
+def test_lazy_reading_times():
+    """Make sure we correctly calculate reading times."""
+
+    time_base = datetime.datetime(2018, 1, 1)
+    readings = make_readings(3)
+    readings.append(IOTileReading(0xFFFFFFFF, 0x5000, 1))
+
+    lazy = LazyReadingList(pack_readings(readings), 0, 4, time_base=time_base)
+
+    assert lazy.reading_times == [time_base, time_base + datetime.timedelta(seconds=10),
+                                  time_base + datetime.timedelta(seconds=20), None]
+    assert [x.reading_time for x in lazy] == lazy.reading_times
+
+
+def test_report_readings():
+    """Make sure reports decode their readings lazily."""
+
+    readings = make_readings(100)
+
+    report = SignedListReport(SignedListReport.FromReadings(1, readings).encode())
+    assert isinstance(report.visible_readings, LazyReadingList)
+    assert report.visible_readings == readings
+    assert report.visible_readings.values == [x.value for x in readings]
+
+    report = BroadcastReport(BroadcastReport.FromReadings(1, readings).encode())
+    assert isinstance(report.visible_readings, LazyReadingList)
+    assert report.visible_readings == readings
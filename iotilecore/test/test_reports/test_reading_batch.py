@@ -0,0 +1,93 @@
+"""Tests for columnar batches of readings."""
+
+import datetime
+import pytest
+from iotile.core.hw.reports import (IOTileReading, ReadingBatch, SignedListReport, BroadcastReport,
+                                    FlexibleDictionaryReport)
+from iotile.core.hw.reports.reading_batch import UINT32_TYPECODE, VALUE_TYPECODE
+
+
+def make_readings(count):
+    return [IOTileReading(i*10, 0x5000 + (i % 3), i*2, reading_id=i+1) for i in range(0, count)]
+
+
+def test_batch_basics():
+    """Make sure batches behave like lists of readings."""
+
+    readings = make_readings(10)
+    batch = ReadingBatch.FromReadings(readings)
+
+    assert len(batch) == 10
+    assert list(batch) == readings
+    assert batch[-1] == readings[-1]
+    assert batch[3].stream == readings[3].stream
+    assert batch[3].reading_time is None
+    assert batch[3] != readings[4]
+    assert batch[3] != None
+    assert batch[3] != 'reading'
+
+    with pytest.raises(TypeError):
+        hash(batch[3])
+    assert batch.to_readings() == readings
+    assert batch.asdicts() == [x.asdict() for x in readings]
+    assert batch.id_range() == (1, 10)
+
+    sliced = batch[2:5]
+    assert isinstance(sliced, ReadingBatch)
+    assert list(sliced) == readings[2:5]
+
+    with pytest.raises(IndexError):
+        batch[10]
+
+    with pytest.raises(ValueError):
+        ReadingBatch([1, 2], [1], [1])
+
+    assert ReadingBatch([1], [2], [3]).id_range() == (0, 0)
+
+
+def test_column_types():
+    """Make sure reading ids and times are 4 bytes wide on every platform."""
+
+    batch = ReadingBatch([1], [0xFFFFFFFF], [-1], reading_ids=[0xFFFFFFFF])
+    assert batch.raw_times.typecode == UINT32_TYPECODE
+    assert batch.reading_ids.itemsize == 4
+    assert batch.values.typecode == VALUE_TYPECODE
+    assert batch[0].value == -1
+
+
+def test_batch_reading_times():
+    """Make sure reading times are only stored when needed."""
+
+    now = datetime.datetime(2018, 1, 1)
+    batch = ReadingBatch.FromReadings(make_readings(2))
+    assert batch.reading_times is None
+
+    batch.append(IOTileReading(5, 0x5000, 1, reading_time=now))
+    assert batch.reading_times == [None, None, now]
+    assert batch[2].reading_time == now
+    assert batch[2].asdict()['timestamp'] == now.isoformat()
+    assert batch.asdicts()[2] == batch[2].to_reading().asdict()
+
+
+def test_report_interop():
+    """Make sure reports can be built from and converted to batches."""
+
+    readings = make_readings(20)
+    batch = ReadingBatch.FromReadings(readings)
+
+    signed = SignedListReport.FromReadings(1, batch, report_id=100)
+    assert signed.visible_readings == readings
+    assert signed.lowest_id == 1
+    assert signed.highest_id == 20
+
+    decoded = ReadingBatch.FromReadings(signed.visible_readings)
+    assert list(decoded) == readings
+    assert decoded.reading_times == signed.visible_readings.reading_times
+
+    broadcast = BroadcastReport.FromReadings(1, batch)
+    assert broadcast.visible_readings == readings
+
+    flexible = FlexibleDictionaryReport.FromReadings(1, batch, [])
+    assert flexible.visible_readings == readings
+    assert flexible.lowest_id == 1
+    assert flexible.highest_id == 20
@@ -0,0 +1,199 @@
+"""Tests for appending reports to and searching report archives."""
+
+import os
+import datetime
+import pytest
+from iotile.core.hw.reports import (IOTileReading, SignedListReport, IndividualReadingReport, BroadcastReport,
+                                    FlexibleDictionaryReport, ReportArchive, ReportArchiveWriter)
+
+
+def make_report(uuid, first_id, count, received_time):
+    readings = [IOTileReading(i, 0x5000, i*2, reading_id=i) for i in range(first_id, first_id + count)]
+    report = SignedListReport.FromReadings(uuid, readings, report_id=first_id)
+    report.received_time = received_time
+    return report
+
+
+@pytest.fixture
+def archive_path(tmpdir):
+    path = str(tmpdir.join('reports.bin'))
+    start = datetime.datetime(2018, 1, 1)
+
+    with ReportArchiveWriter(path) as writer:
+        for i in range(0, 10):
+            uuid = 1 + (i % 2)
+            writer.append(make_report(uuid, 1 + i*10, 10, start + datetime.timedelta(hours=i)))
+
+    return path
+
+
+def test_find_reports(archive_path):
+    """Make sure we can search the index by device, time and reading id."""
+
+    start = datetime.datetime(2018, 1, 1)
+
+    with ReportArchive(archive_path) as archive:
+        assert len(archive) == 10
+        assert archive.devices == [1, 2]
+
+        entries = archive.find(device=2)
+        assert [x.report_id for x in entries] == [11, 31, 51, 71, 91]
+
+        entries = archive.find(start=start + datetime.timedelta(hours=2), end=start + datetime.timedelta(hours=5))
+        assert [x.report_id for x in entries] == [21, 31, 41]
+        assert entries[0].received_time == start + datetime.timedelta(hours=2)
+
+        entries = archive.find(device=1, min_reading_id=25, max_reading_id=55)
+        assert [(x.lowest_id, x.highest_id) for x in entries] == [(21, 30), (41, 50)]
+
+        assert archive.find(device=3) == []
+
+
+def test_read_reports(archive_path):
+    """Make sure reports are decoded with their original received time."""
+
+    with ReportArchive(archive_path) as archive:
+        reports = list(archive.iter_reports(device=1, min_reading_id=41, max_reading_id=41))
+        assert len(reports) == 1
+
+        report = reports[0]
+        assert isinstance(report, SignedListReport)
+        assert report.origin == 1
+        assert report.received_time == datetime.datetime(2018, 1, 1, 4)
+        assert report.visible_readings[0] == IOTileReading(41, 0x5000, 82, reading_id=41)
+
+        entry = archive.find(device=1)[0]
+        assert archive.read_raw(entry) == make_report(1, 1, 10, None).encode()
+
+
+def test_append_and_rebuild(archive_path):
+    """Make sure archives can be reopened and their index rebuilt."""
+
+    received = datetime.datetime(2018, 2, 1)
+    with ReportArchiveWriter(archive_path) as writer:
+        individual = IndividualReadingReport.FromReadings(5, [IOTileReading(10, 0x1000, 3)])
+        individual.received_time = received
+        writer.append(individual)
+
+        broadcast = BroadcastReport.FromReadings(6, [IOTileReading(1, 0x1000, 4, reading_id=7)])
+        broadcast.received_time = received
+        writer.append(broadcast)
+
+    os.remove(archive_path + '.idx')
+
+    with ReportArchive(archive_path) as archive:
+        assert len(archive) == 12
+        assert archive.devices == [1, 2, 5, 6]
+
+        individual = list(archive.iter_reports(device=5))[0]
+        assert isinstance(individual, IndividualReadingReport)
+        assert individual.received_time == received
+
+        assert [x.origin for x in archive.find(min_reading_id=7, max_reading_id=7)] == [1, 6]
+
+    # Readers never write the index, the next writer rebuilds it
+    assert not os.path.exists(archive_path + '.idx')
+    ReportArchiveWriter(archive_path).close()
+
+    # A partially written index entry is dropped
+    with open(archive_path + '.idx', "ab") as outfile:
+        outfile.write(b'\x01\x02')
+
+    with ReportArchive(archive_path) as archive:
+        assert len(archive) == 12
+        assert archive.devices == [1, 2, 5, 6]
+
+
+def test_truncated_archive(archive_path):
+    """Make sure a partially written record is ignored and then overwritten."""
+
+    with open(archive_path, "ab") as outfile:
+        outfile.write(b'\x10\x00\x00')
+
+    with ReportArchive(archive_path) as archive:
+        assert len(archive) == 10
+
+    with ReportArchiveWriter(archive_path) as writer:
+        writer.append(make_report(3, 101, 5, datetime.datetime(2018, 3, 1)))
+
+    with ReportArchive(archive_path) as archive:
+        assert len(archive) == 11
+        assert list(archive.iter_reports(device=3))[0].highest_id == 105
+
+
+def test_flexible_report(tmpdir):
+    """Make sure FlexibleDictionaryReports can be archived and read back."""
+
+    path = str(tmpdir.join('reports.bin'))
+    received = datetime.datetime(2018, 1, 1)
+    report = FlexibleDictionaryReport.FromReadings(7, [IOTileReading(0, 1, 2, reading_id=5)], [], report_id=3,
+                                                   received_time=received)
+
+    with ReportArchiveWriter(path) as writer:
+        writer.append(report)
+
+    with ReportArchive(path) as archive:
+        entry = archive.find(device=7, min_reading_id=5)[0]
+        assert entry.report_id == 3
+
+        decoded = archive.read(entry)
+        assert isinstance(decoded, FlexibleDictionaryReport)
+        assert decoded.received_time == received
+        assert decoded.visible_readings == report.visible_readings
+
+
+def test_unordered_times(tmpdir):
+    """Make sure time windows are found even if reports arrive out of order."""
+
+    path = str(tmpdir.join('reports.bin'))
+    start = datetime.datetime(2018, 1, 1)
+    hours = [5, 1, 3, 0, 4, 2]
+
+    with ReportArchiveWriter(path) as writer:
+        for i, hour in enumerate(hours):
+            writer.append(make_report(1 + (i % 2), 1 + i*10, 10, start + datetime.timedelta(hours=hour)))
+
+    with ReportArchive(path) as archive:
+        entries = archive.find(start=start + datetime.timedelta(hours=1), end=start + datetime.timedelta(hours=4))
+        assert [x.report_id for x in entries] == [11, 21, 51]
+
+        entries = archive.find(device=2, start=start + datetime.timedelta(hours=1))
+        assert [x.report_id for x in entries] == [11, 51]
+
+        assert archive.find(device=1, end=start) == []
+
+
+def test_unflushed_writer(archive_path):
+    """Make sure readers can open an archive while a writer is appending to it."""
+
+    index_path = archive_path + '.idx'
+    index_size = os.path.getsize(index_path)
+    os.chmod(archive_path, 0o444)
+    os.chmod(index_path, 0o444)
+
+    try:
+        with ReportArchive(archive_path) as archive:
+            assert len(archive) == 10
+    finally:
+        os.chmod(archive_path, 0o644)
+        os.chmod(index_path, 0o644)
+
+    writer = ReportArchiveWriter(archive_path)
+    try:
+        writer.append(make_report(3, 101, 5, datetime.datetime(2018, 3, 1)))
+        writer.append(make_report(4, 201, 5, datetime.datetime(2018, 3, 2)))
+
+        # The data has been written but the index has not
+        writer._data.flush()
+        with ReportArchive(archive_path) as archive:
+            assert len(archive) == 12
+            assert archive.devices == [1, 2, 3, 4]
+            assert list(archive.iter_reports(device=4))[0].highest_id == 205
+
+        assert os.path.getsize(index_path) == index_size
+    finally:
+        writer.close()
+
+    with ReportArchive(archive_path) as archive:
+        assert len(archive) == 12
+        assert [x.report_id for x in archive.find(start=datetime.datetime(2018, 3, 1))] == [101, 201]
@@ -0,0 +1,65 @@
+"""Make sure the report benchmark suite and its command line program run."""
+
+import json
+import pytest
+from iotile.core.exceptions import ArgumentError
+from iotile.core.hw.reports import benchmark
+from iotile.core.hw.reports.benchmark import BENCHMARKS, run_benchmarks, skipped_benchmarks
+from iotile.core.scripts.iotile_reportbench_script import main
+
+
+def test_run_all_benchmarks():
+    """Make sure every benchmark runs and produces a result."""
+
+    results = run_benchmarks(scale=0.001)
+
+    skipped = skipped_benchmarks()
+    assert [x.name for x in results] == [x[0] for x in BENCHMARKS if x[0] not in skipped]
+    for result in results:
+        assert result.iterations == 1
+        assert result.total_time >= 0.0
+
+
+def test_unknown_benchmark():
+    """Make sure we complain about benchmarks that do not exist."""
+
+    with pytest.raises(ArgumentError):
+        run_benchmarks(['not_a_benchmark'])
+
+
+def test_json_output(tmpdir):
+    """Make sure the command line program saves json results."""
+
+    out_path = str(tmpdir.join('results.json'))
+    retval = main(['-b', 'broadcast_decode', '-b', 'parser_add_data_512', '-s', '0.01', '-f', 'json', '-o', out_path])
+    assert retval == 0
+
+    with open(out_path, "r") as infile:
+        info = json.load(infile)
+
+    assert [x['name'] for x in info['results']] == ['parser_add_data_512', 'broadcast_decode']
+    assert info['results'][1]['iterations'] == 10
+
+
+def test_missing_crypto(monkeypatch, tmpdir):
+    """Make sure user key benchmarks are skipped without pycryptodome."""
+
+    monkeypatch.setattr(benchmark, 'crypto_available', lambda: False)
+    assert list(skipped_benchmarks()) == ['signed_decode_user_key']
+
+    results = run_benchmarks(['signed_decode'], scale=0.001)
+    assert [x.name for x in results] == ['signed_decode']
+
+    with pytest.raises(ArgumentError):
+        run_benchmarks(['signed_decode_user_key'])
+
+    assert main(['-b', 'signed_decode_user_key']) == 1
+
+    out_path = str(tmpdir.join('results.json'))
+    assert main(['-s', '0.001', '-f', 'json', '-o', out_path]) == 0
+
+    with open(out_path, "r") as infile:
+        info = json.load(infile)
+
+    assert list(info['skipped']) == ['signed_decode_user_key']
+    assert 'signed_decode_user_key' not in [x['name'] for x in info['results']]
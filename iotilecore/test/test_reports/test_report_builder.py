@@ -0,0 +1,78 @@
+"""Tests for bulk report encoding and incremental report building."""
+
+import struct
+import pytest
+from iotile.core.exceptions import ArgumentError
+from iotile.core.hw.reports import IOTileReading, ReadingBatch, SignedListReport, ReportBuilder, pack_readings
+
+
+def make_readings(count, start=0):
+    return [IOTileReading(i, 0x5000, i*3, reading_id=i+1) for i in range(start, start + count)]
+
+
+def test_pack_readings():
+    """Make sure bulk packing matches packing each reading."""
+
+    readings = make_readings(50)
+    expected = bytearray()
+    for reading in readings:
+        expected += struct.pack("<HHLLL", reading.stream, 0, reading.reading_id, reading.raw_time, reading.value)
+
+    assert pack_readings(readings) == expected
+    assert pack_readings(ReadingBatch.FromReadings(readings)) == expected
+    assert pack_readings([]) == bytearray()
+    assert pack_readings(ReadingBatch()) == bytearray()
+
+
+def test_pack_large_batch():
+    """Make sure large batches are packed correctly across chunk boundaries."""
+
+    count = 100003
+    batch = ReadingBatch([0x5000 + (i % 7) for i in range(0, count)], range(0, count),
+                         [i*3 for i in range(0, count)], reading_ids=range(1, count + 1))
+
+    packed = pack_readings(batch)
+    assert len(packed) == 16*count
+
+    for i in (0, 4095, 4096, 50000, count - 1):
+        assert struct.unpack_from("<HHLLL", packed, i*16) == (0x5000 + (i % 7), 0, i + 1, i, i*3)
+
+    assert packed[16*8192:16*8200] == pack_readings(batch[8192:8200])
+
+
+def test_report_builder():
+    """Make sure we can build reports incrementally."""
+
+    seen = []
+    builder = ReportBuilder(10, 4, report_id=100, report_callback=seen.append)
+
+    readings = make_readings(10)
+    sealed = builder.add_readings(readings)
+
+    assert len(sealed) == 2
+    assert len(builder) == 2
+    assert seen == sealed
+
+    last = builder.seal(report_id=200, sent_timestamp=50)
+    assert len(builder) == 0
+    assert builder.seal() is None
+
+    reports = sealed + [last]
+    for i, report in enumerate(reports):
+        decoded = SignedListReport(report.encode())
+        assert decoded.verified
+        assert decoded.origin == 10
+        assert decoded.visible_readings == readings[i*4:(i + 1)*4]
+        assert decoded.lowest_id == i*4 + 1
+        assert decoded.highest_id == min(i*4 + 4, 10)
+
+    assert reports[0].report_id == 100
+    assert reports[2].report_id == 200
+    assert reports[2].sent_timestamp == 50
+
+    # Make sure reports match ones created with FromReadings
+    direct = SignedListReport.FromReadings(10, readings[:4], report_id=100)
+    assert direct.encode() == reports[0].encode()
+
+    with pytest.raises(ArgumentError):
+        ReportBuilder(10, 0)
@@ -137,3 +137,75 @@ class TestReportParser(unittest.TestCase):
             assert reading.raw_time == i
             assert reading.reading_id == i+1
             assert reading.stream == 2
+
+
+def test_iter_reports():
+    """Make sure we can parse a long stream of reports in chunks."""
+
+    data = bytearray()
+    for i in range(0, 100):
+        data += make_report(i, 1, i, 3, 4)
+        data += make_sequential(i, 2, 5, True)
+
+    chunks = [data[i:i+7] for i in range(0, len(data), 7)]
+
+    parser = IOTileReportParser(max_reports=10)
+    reports = list(parser.iter_reports(chunks))
+
+    assert len(reports) == 200
+    assert [x.origin for x in reports[::2]] == list(range(0, 100))
+    assert all(isinstance(x, SignedListReport) for x in reports[1::2])
+    assert [x.visible_readings[0].value for x in reports[::2]] == list(range(0, 100))
+
+    assert len(parser.reports) == 10
+    assert list(parser.reports) == reports[-10:]
+    assert parser.pending_data == 0
+    assert len(parser.raw_data) == 0
+
+
+def test_partial_report_compaction():
+    """Make sure consumed data is dropped while a partial report is kept."""
+
+    report1 = make_sequential(1, 2, 50)
+    report2 = make_sequential(2, 2, 50)
+
+    parser = IOTileReportParser(max_reports=0)
+    parser.add_data(report1 + report2[:10])
+
+    assert len(parser.reports) == 0
+    assert parser.pending_data == 10
+    assert len(parser.raw_data) == 10
+
+    seen = list(parser.iter_reports([report2[10:]]))
+    assert len(seen) == 1
+    assert seen[0].origin == 2
+
+
+def test_shared_format_cache():
+    """Make sure all parsers share a single cached map of report formats."""
+
+    IOTileReportParser.ClearFormatCache()
+
+    parser1 = IOTileReportParser()
+    parser2 = IOTileReportParser()
+    assert parser1.known_formats is parser2.known_formats
+    assert parser1.known_formats[SignedListReport.ReportType] is SignedListReport
+
+    IOTileReportParser.ClearFormatCache()
+    parser3 = IOTileReportParser()
+    assert parser3.known_formats is not parser1.known_formats
+    assert parser3.known_formats == parser1.known_formats
+
+
+def test_format_benchmarks():
+    """Make sure the report format benchmarks run."""
+
+    from iotile.core.hw.reports.benchmark import bench_parser_setup, bench_deserialize
+
+    for cached in (True, False):
+        result = bench_parser_setup(iterations=2, cached=cached)
+        assert result.iterations == 2
+        assert result.total_time >= 0.0
+
+        result = bench_deserialize(iterations=2, cached=cached)
+        assert result.per_call >= 0.0
@@ -0,0 +1,58 @@
+"""Tests for verifying reports in parallel."""
+
+import datetime
+import pytest
+from iotile.core.exceptions import DataError, ArgumentError
+from iotile.core.hw.reports import IOTileReading, SignedListReport, BroadcastReport, ReportVerificationPipeline
+
+
+def make_report(uuid, count, root_key=0):
+    readings = [IOTileReading(i, 0x5000, i, reading_id=i+1) for i in range(0, count)]
+    return SignedListReport.FromReadings(uuid, readings, root_key=root_key, report_id=count+1)
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_pipeline_order(use_processes):
+    """Make sure reports are verified and returned in order."""
+
+    reports = [make_report(i, i + 1) for i in range(0, 20)]
+    reports.append(BroadcastReport.FromReadings(50, [IOTileReading(1, 0x5000, 2)]))
+
+    received = datetime.datetime(2018, 1, 1)
+
+    with ReportVerificationPipeline(workers=3, use_processes=use_processes) as pipeline:
+        decoded = list(pipeline.verify((x.encode() for x in reports), received_time=received))
+
+    assert len(decoded) == len(reports)
+    for orig, report in zip(reports, decoded):
+        assert type(report) is type(orig)
+        assert report.origin == orig.origin
+        assert report.received_time == received
+        assert report.visible_readings == orig.visible_readings
+
+    assert all(x.verified for x in decoded[:-1])
+
+
+def test_pipeline_errors(monkeypatch):
+    """Make sure invalid reports are reported as unverified or raise errors."""
+
+    monkeypatch.delenv('USER_KEY_00000001', raising=False)
+
+    good = make_report(1, 5).encode()
+    bad = bytearray(good)
+    bad[25] ^= 0xFF
+
+    with ReportVerificationPipeline(workers=2) as pipeline:
+        decoded = list(pipeline.verify([good, bad]))
+        assert decoded[0].verified is True
+        assert decoded[1].verified is False
+        assert len(decoded[1].visible_readings) == 0
+
+        with pytest.raises(DataError):
+            list(pipeline.verify([bytearray([0xEE, 0, 0])]))
+
+    with pytest.raises(ArgumentError):
+        pipeline.verify([good])
+
+    with pytest.raises(ArgumentError):
+        ReportVerificationPipeline(workers=0)
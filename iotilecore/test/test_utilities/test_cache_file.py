@@ -0,0 +1,31 @@
+"""Tests for saving and loading json cache files."""
+
+import os
+from iotile.core.utilities.cache_file import load_json_cache, save_json_cache
+
+
+def test_cache_roundtrip(tmpdir):
+    """Make sure caches are saved into new folders and loaded back."""
+
+    path = str(tmpdir.join('subdir', 'cache.json'))
+    assert load_json_cache(path) is None
+
+    assert save_json_cache(path, {'version': 1, 'items': [1, 2]})
+    assert load_json_cache(path) == {'version': 1, 'items': [1, 2]}
+
+    assert save_json_cache(path, {'version': 2})
+    assert load_json_cache(path) == {'version': 2}
+    assert os.listdir(os.path.dirname(path)) == ['cache.json']
+
+
+def test_cache_errors(tmpdir):
+    """Make sure unreadable and unwritable caches are not errors."""
+
+    path = str(tmpdir.join('cache.json'))
+    with open(path, "w") as outfile:
+        outfile.write("not json")
+
+    assert load_json_cache(path) is None
+
+    # A folder cannot be created inside of a file
+    assert not save_json_cache(os.path.join(path, 'cache.json'), {})
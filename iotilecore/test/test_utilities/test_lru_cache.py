@@ -0,0 +1,26 @@
+from iotile.core.utilities.lru_cache import LRUCache
+
+
+def test_lru_cache():
+    """Make sure the least recently used entry is removed first."""
+
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+
+    assert cache.get('a') == 1
+
+    cache.put('c', 3)
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('b', 5) == 5
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+    cache.put('a', 4)
+    cache.put('d', 5)
+    assert cache.get('c') is None
+    assert cache.get('a') == 4
+
+    cache.clear()
+    assert len(cache) == 0
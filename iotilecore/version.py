@@ -1 +1 @@
-version = "3.22.12"
+version = "3.23.0"
@@ -1,3 +1,5 @@
 from .in_memory import InMemoryStorageEngine
+from .ring_buffer import RingBufferStorageEngine
+from .file_backed import FileStorageEngine
 
-__all__ = ['InMemoryStorageEngine']
+__all__ = ['InMemoryStorageEngine', 'RingBufferStorageEngine', 'FileStorageEngine']
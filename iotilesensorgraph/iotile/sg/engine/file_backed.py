@@ -0,0 +1,231 @@
+"""A persistent, memory mapped storage engine for sensor graph."""
+
+import os
+import mmap
+import struct
+from builtins import str, range
+from iotile.core.exceptions import ArgumentError
+from iotile.core.hw.reports import IOTileReading
+from iotile.sg.exceptions import StorageFullError, StreamEmptyError
+
+# The encoded stream type of output streams (see DataStream.OutputType)
+_OUTPUT_STREAM_TYPE = 5
+
+
+class FileStorageEngine(object):
+    """A storage engine for sensor graph that keeps its data in a file.
+
+    The file is memory mapped and contains a fixed size header followed by
+    two fixed size ring buffers of 16-byte reading records, one for storage
+    and one for streaming readings.  Each record has the same layout as a
+    reading inside a SignedListReport:
+
+        H: stream
+        H: reserved, always 0
+        L: reading id
+        L: raw time
+        L: value
+
+    The head and count of each buffer are stored in the file header so
+    opening an existing file restores all of the readings that were stored
+    in it, which allows a SensorLog to survive process restarts.  Readings
+    are only decoded when they are requested so the file can be inspected
+    without loading it all into memory.
+
+    Values are stored as 32-bit unsigned integers, just like on an actual
+    device, so negative values are returned in their two's complement form.
+
+    Args:
+        model (DeviceModel): A model for the device type that we are
+            emulating so that we can constrain our total memory
+            size appropriately to get the same behavior that would
+            be seen on an actual device.
+        path (str): The path to the file that should hold our data.  If it
+            does not exist, it is created.  If it does exist, it must have
+            been created with the same buffer sizes.
+    """
+
+    Magic = b'SGLG'
+    Version = 1
+
+    HeaderFormat = "<4sHHLLLLLL"
+    HeaderLength = 32
+    RecordFormat = "<HHLLL"
+    RecordLength = 16
+
+    StorageBuffer = 0
+    StreamingBuffer = 1
+
+    def __init__(self, model, path):
+        self.model = model
+        self.path = path
+        self.storage_length = model.get(u'max_storage_buffer')
+        self.streaming_length = model.get(u'max_streaming_buffer')
+
+        self._capacities = [self.storage_length, self.streaming_length]
+        self._bases = [self.HeaderLength, self.HeaderLength + self.RecordLength*self.storage_length]
+        self._heads = [0, 0]
+        self._counts = [0, 0]
+
+        file_size = self.HeaderLength + self.RecordLength*(self.storage_length + self.streaming_length)
+        exists = os.path.isfile(path) and os.path.getsize(path) > 0
+
+        if not exists:
+            with open(path, "wb") as outfile:
+                outfile.truncate(file_size)
+        elif os.path.getsize(path) != file_size:
+            raise ArgumentError("Storage file size does not match device model", path=path,
+                                expected_size=file_size, actual_size=os.path.getsize(path))
+
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), file_size)
+
+        if exists:
+            self._load_header()
+        else:
+            self._save_header()
+
+    def _load_header(self):
+        magic, version, _reserved, storage_length, streaming_length, \
+            storage_head, storage_count, streaming_head, streaming_count = struct.unpack_from(self.HeaderFormat, self._map, 0)
+
+        if magic != self.Magic or version != self.Version:
+            self.close()
+            raise ArgumentError("Storage file is not a valid sensor graph storage file", path=self.path, magic=magic, version=version)
+
+        if storage_length != self.storage_length or streaming_length != self.streaming_length:
+            self.close()
+            raise ArgumentError("Storage file buffer sizes do not match device model", path=self.path,
+                                file_sizes=(storage_length, streaming_length), model_sizes=tuple(self._capacities))
+
+        self._heads = [storage_head, streaming_head]
+        self._counts = [storage_count, streaming_count]
+
+    def _save_header(self):
+        struct.pack_into(self.HeaderFormat, self._map, 0, self.Magic, self.Version, 0, self.storage_length,
+                         self.streaming_length, self._heads[0], self._counts[0], self._heads[1], self._counts[1])
+
+    def _save_state(self, index):
+        struct.pack_into("<LL", self._map, 16 + 8*index, self._heads[index], self._counts[index])
+
+    def _record_offset(self, index, offset):
+        position = (self._heads[index] + offset) % self._capacities[index]
+        return self._bases[index] + position*self.RecordLength
+
+    def _read_record(self, index, offset):
+        stream, _, reading_id, raw_time, value = struct.unpack_from(self.RecordFormat, self._map, self._record_offset(index, offset))
+        return IOTileReading(raw_time, stream, value, reading_id=reading_id)
+
+    @classmethod
+    def _buffer_index(cls, buffer_type):
+        if buffer_type == u'streaming':
+            return cls.StreamingBuffer
+
+        return cls.StorageBuffer
+
+    def count(self):
+        """Count the number of readings.
+
+        Returns:
+            (int, int): The number of readings in storage and streaming
+        """
+
+        return (self._counts[self.StorageBuffer], self._counts[self.StreamingBuffer])
+
+    def clear(self):
+        """Clear all data from this storage engine."""
+
+        self._heads = [0, 0]
+        self._counts = [0, 0]
+        self._save_header()
+
+    def push(self, value):
+        """Store a new value for the given stream.
+
+        Args:
+            value (IOTileReading): The value to store.  The stream
+                parameter must have the correct value
+        """
+
+        if (value.stream >> 12) == _OUTPUT_STREAM_TYPE:
+            index = self.StreamingBuffer
+            name = 'Streaming'
+        else:
+            index = self.StorageBuffer
+            name = 'Storage'
+
+        if self._counts[index] == self._capacities[index]:
+            raise StorageFullError('{} buffer full'.format(name))
+
+        struct.pack_into(self.RecordFormat, self._map, self._record_offset(index, self._counts[index]),
+                         value.stream, 0, value.reading_id, value.raw_time, value.value & 0xFFFFFFFF)
+
+        self._counts[index] += 1
+        self._save_state(index)
+
+    def get(self, buffer_type, offset):
+        """Get a reading from the buffer at offset.
+
+        Offset is specified relative to the start of the data buffer.
+        This means that if the buffer rolls over, the offset for a given
+        item will appear to change.  Anyone holding an offset outside of this
+        engine object will need to be notified when rollovers happen (i.e.
+        popn is called so that they can update their offset indices)
+
+        Args:
+            buffer_type (str): The buffer to pop from (either u"storage" or u"streaming")
+            offset (int): The offset of the reading to get
+        """
+
+        index = self._buffer_index(buffer_type)
+        count = self._counts[index]
+
+        if offset < 0 or offset >= count:
+            raise StreamEmptyError("Invalid index given in get command", requested=offset, stored=count, buffer=buffer_type)
+
+        return self._read_record(index, offset)
+
+    def popn(self, buffer_type, count):
+        """Remove and return the oldest count values from the named buffer
+
+        Args:
+            buffer_type (str): The buffer to pop from (either u"storage" or u"streaming")
+            count (int): The number of readings to pop
+
+        Returns:
+            list(IOTileReading): The values popped from the buffer
+        """
+
+        buffer_type = str(buffer_type)
+        index = self._buffer_index(buffer_type)
+
+        if count > self._counts[index]:
+            raise StreamEmptyError("Not enough data in buffer for popn command", requested=count, stored=self._counts[index], buffer=buffer_type)
+
+        popped = [self._read_record(index, i) for i in range(0, count)]
+
+        self._heads[index] = (self._heads[index] + count) % self._capacities[index]
+        self._counts[index] -= count
+        self._save_state(index)
+
+        return popped
+
+    def flush(self):
+        """Make sure all data is written to the underlying file."""
+
+        self._map.flush()
+
+    def close(self):
+        """Flush and close the underlying file.
+
+        The engine cannot be used after it has been closed.
+        """
+
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
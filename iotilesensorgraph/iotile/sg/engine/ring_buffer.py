@@ -0,0 +1,258 @@
+"""A fixed capacity, array backed storage engine for sensor graph."""
+
+from array import array
+from builtins import str, range
+from iotile.core.hw.reports import IOTileReading, ReadingBatch
+from iotile.core.hw.reports.reading_batch import UINT32_TYPECODE, VALUE_TYPECODE
+from iotile.sg.exceptions import StorageFullError, StreamEmptyError
+
+# The encoded stream type of output streams (see DataStream.OutputType)
+_OUTPUT_STREAM_TYPE = 5
+
+
+class ReadingRingBuffer(object):
+    """A fixed capacity FIFO of readings stored as parallel integer arrays.
+
+    Readings are not stored as IOTileReading objects but rather split into
+    stream, reading_id, raw_time and value columns that are preallocated
+    when the buffer is created.  Pushing a reading is O(1) and popping n
+    readings is O(n) since only the head pointer is moved.
+
+    Offsets passed to get() are relative to the oldest reading in the buffer,
+    just like in InMemoryStorageEngine.
+
+    Args:
+        capacity (int): The maximum number of readings that can be stored.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+
+        self._streams = array('H', [0]) * capacity
+        self._ids = array(UINT32_TYPECODE, [0]) * capacity
+        self._times = array(UINT32_TYPECODE, [0]) * capacity
+        self._values = array(VALUE_TYPECODE, [0]) * capacity
+
+        self._head = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def full(self):
+        """Whether there is no more space in this buffer."""
+
+        return self._count == self.capacity
+
+    def clear(self):
+        """Remove all readings from this buffer."""
+
+        self._head = 0
+        self._count = 0
+
+    def push(self, reading):
+        """Add a reading to the end of the buffer.
+
+        Args:
+            reading (IOTileReading): The reading to store.
+
+        Raises:
+            StorageFullError: If there is no space left in the buffer.
+        """
+
+        if self._count == self.capacity:
+            raise StorageFullError('Ring buffer full', capacity=self.capacity)
+
+        index = (self._head + self._count) % self.capacity
+
+        self._streams[index] = reading.stream
+        self._ids[index] = reading.reading_id
+        self._times[index] = reading.raw_time
+        self._values[index] = reading.value
+
+        self._count += 1
+
+    def get(self, offset):
+        """Get the reading at offset from the oldest reading.
+
+        Args:
+            offset (int): The offset of the reading to get.
+
+        Returns:
+            IOTileReading: A newly created reading with the stored data.
+        """
+
+        if offset < 0 or offset >= self._count:
+            raise StreamEmptyError("Invalid index given in get command", requested=offset, stored=self._count)
+
+        return self._build_reading((self._head + offset) % self.capacity)
+
+    def get_block(self, offsets):
+        """Copy the readings at the given offsets into a block.
+
+        Args:
+            offsets (list(int)): The offsets of the readings to copy,
+                relative to the oldest reading.
+
+        Returns:
+            ReadingBatch: The requested readings.
+        """
+
+        for offset in offsets:
+            if offset < 0 or offset >= self._count:
+                raise StreamEmptyError("Invalid index given in get_block command", requested=offset, stored=self._count)
+
+        indices = [(self._head + x) % self.capacity for x in offsets]
+
+        return ReadingBatch(streams=[self._streams[i] for i in indices],
+                            raw_times=[self._times[i] for i in indices],
+                            values=[self._values[i] for i in indices],
+                            reading_ids=[self._ids[i] for i in indices])
+
+    def popn(self, count):
+        """Remove and return the oldest count readings.
+
+        Args:
+            count (int): The number of readings to pop.
+
+        Returns:
+            list(IOTileReading): The readings that were removed.
+        """
+
+        if count > self._count:
+            raise StreamEmptyError("Not enough data in buffer for popn command", requested=count, stored=self._count)
+
+        popped = [self._build_reading((self._head + i) % self.capacity) for i in range(0, count)]
+
+        self._head = (self._head + count) % self.capacity
+        self._count -= count
+
+        return popped
+
+    def _build_reading(self, index):
+        return IOTileReading(self._times[index], self._streams[index], self._values[index],
+                             reading_id=self._ids[index])
+
+
+class RingBufferStorageEngine(object):
+    """A storage engine for sensor graph that keeps readings in ring buffers.
+
+    This engine has the same interface and behavior as InMemoryStorageEngine
+    but its storage and streaming buffers are fixed size ring buffers
+    allocated up front based on the device model.  This makes rolling over
+    a full buffer cheap and reduces the memory used per reading, which
+    matters when simulating long running devices with full buffers.
+
+    Only the stream, reading_id, raw_time and value of each reading are
+    stored.  Readings returned from get() and popn() are newly created
+    IOTileReading objects.
+
+    Args:
+        model (DeviceModel): A model for the device type that we are
+            emulating so that we can constrain our total memory
+            size appropriately to get the same behavior that would
+            be seen on an actual device.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.storage_length = model.get(u'max_storage_buffer')
+        self.streaming_length = model.get(u'max_streaming_buffer')
+        self.storage_data = ReadingRingBuffer(self.storage_length)
+        self.streaming_data = ReadingRingBuffer(self.streaming_length)
+
+    def count(self):
+        """Count the number of readings.
+
+        Returns:
+            (int, int): The number of readings in storage and streaming
+        """
+
+        return (len(self.storage_data), len(self.streaming_data))
+
+    def clear(self):
+        """Clear all data from this storage engine."""
+
+        self.storage_data.clear()
+        self.streaming_data.clear()
+
+    def push(self, value):
+        """Store a new value for the given stream.
+
+        Args:
+            value (IOTileReading): The value to store.  The stream
+                parameter must have the correct value
+        """
+
+        if (value.stream >> 12) == _OUTPUT_STREAM_TYPE:
+            if self.streaming_data.full:
+                raise StorageFullError('Streaming buffer full')
+
+            self.streaming_data.push(value)
+        else:
+            if self.storage_data.full:
+                raise StorageFullError('Storage buffer full')
+
+            self.storage_data.push(value)
+
+    def get(self, buffer_type, offset):
+        """Get a reading from the buffer at offset.
+
+        Offset is specified relative to the start of the data buffer.
+        This means that if the buffer rolls over, the offset for a given
+        item will appear to change.  Anyone holding an offset outside of this
+        engine object will need to be notified when rollovers happen (i.e.
+        popn is called so that they can update their offset indices)
+
+        Args:
+            buffer_type (str): The buffer to pop from (either u"storage" or u"streaming")
+            offset (int): The offset of the reading to get
+        """
+
+        chosen_buffer = self._choose_buffer(buffer_type)
+
+        if offset >= len(chosen_buffer):
+            raise StreamEmptyError("Invalid index given in get command", requested=offset, stored=len(chosen_buffer), buffer=buffer_type)
+
+        return chosen_buffer.get(offset)
+
+    def get_block(self, buffer_type, offsets):
+        """Get a block of readings from the buffer at the given offsets.
+
+        Offsets have the same meaning as in get().
+
+        Args:
+            buffer_type (str): The buffer to read from (either u"storage" or u"streaming")
+            offsets (list(int)): The offsets of the readings to get
+
+        Returns:
+            ReadingBatch: The requested readings.
+        """
+
+        return self._choose_buffer(buffer_type).get_block(offsets)
+
+    def popn(self, buffer_type, count):
+        """Remove and return the oldest count values from the named buffer
+
+        Args:
+            buffer_type (str): The buffer to pop from (either u"storage" or u"streaming")
+            count (int): The number of readings to pop
+
+        Returns:
+            list(IOTileReading): The values popped from the buffer
+        """
+
+        buffer_type = str(buffer_type)
+        chosen_buffer = self._choose_buffer(buffer_type)
+
+        if count > len(chosen_buffer):
+            raise StreamEmptyError("Not enough data in buffer for popn command", requested=count, stored=len(chosen_buffer), buffer=buffer_type)
+
+        return chosen_buffer.popn(count)
+
+    def _choose_buffer(self, buffer_type):
+        if buffer_type == u'streaming':
+            return self.streaming_data
+
+        return self.storage_data
@@ -1,13 +1,13 @@
 """Sensor Graph main object."""
 
 from collections import deque
-from pkg_resources import iter_entry_points
-from toposort import toposort_flatten
+from toposort import toposort_flatten, CircularDependencyError
 from iotile.core.exceptions import ArgumentError
-from iotile.core.hw.reports import IOTileReading
+from iotile.core.hw.reports import IOTileReading, ReadingBatch
 from .node_descriptor import parse_node_descriptor
 from .slot import SlotIdentifier
 from .stream import DataStream
+from .processor_registry import default_registry
 from .known_constants import config_fast_tick_secs, config_tick1_secs, config_tick2_secs
 from .exceptions import NodeConnectionError, ProcessingFunctionError
 
@@ -34,6 +34,11 @@ class SensorGraph(object):
         self.sensor_log = sensor_log
         self.model = model
 
+        # Execution plans compiled by process_input, keyed by encoded input
+        # stream.  None means that the graph has a cycle and cannot be
+        # compiled so process_input falls back to a breadth first search.
+        self._plans = {}
+
     def add_node(self, node_descriptor):
         """Add a node to the sensor graph based on the description given.
 
@@ -82,8 +87,9 @@ class SensorGraph(object):
         if func is None:
             raise ProcessingFunctionError("Could not find processing function in installed packages", func_name=processor)
 
-        node.set_func(processor, func)
+        node.set_func(processor, func, self.find_block_processing_function(processor))
         self.nodes.append(node)
+        self.invalidate_plans()
 
     def add_config(self, slot, config_id, config_type, value):
         """Add a config variable assignment to this sensor graph.
@@ -276,6 +282,11 @@ class SensorGraph(object):
         The tick information in value should be correct and is transfered
         to all results produced by nodes acting on this tick.
 
+        The first time an input is received on a given stream, an execution
+        plan is compiled that lists the nodes downstream of it in topological
+        order.  Each node in the plan is checked at most once per input and
+        only if it is a root node or one of its upstream nodes produced data.
+
         Args:
             stream (DataStream): The stream the input is part of
             value (IOTileReading): The value to process
@@ -284,6 +295,127 @@ class SensorGraph(object):
         """
 
         self.sensor_log.push(stream, value)
+        self._propagate_input(stream, value.raw_time, rpc_executor)
+
+    def process_inputs(self, streams, raw_times, values, rpc_executor):
+        """Process a batch of inputs through this sensor graph.
+
+        This is equivalent to calling process_input once for each input but
+        the inputs are given as parallel columns of integers rather than
+        IOTileReading objects.  It is meant for replaying large amounts of
+        recorded data into a sensor graph.
+
+        Consecutive inputs on a stream that no node depends on are pushed
+        into the sensor log all at once with SensorLog.push_columns, so no
+        reading object is created for them unless one is stored in a buffer
+        or passed to a monitor.  Inputs that can trigger a node are still
+        pushed and processed one at a time, since every input may change
+        whether and how each node runs.
+
+        Args:
+            streams (sequence of int): The encoded stream of each input.
+            raw_times (sequence of int): The tick of each input, which is
+                transferred to all results produced by nodes acting on it.
+            values (sequence of int): The value of each input.
+            rpc_executor (RPCExecutor): An object capable of executing RPCs
+                in case we need to do that.
+        """
+
+        if not len(streams) == len(raw_times) == len(values):
+            raise ArgumentError("Batch columns must all have the same length", streams=len(streams),
+                                raw_times=len(raw_times), values=len(values))
+
+        decoded = {}
+        count = len(streams)
+
+        start = 0
+        while start < count:
+            encoded = streams[start]
+            stream = decoded.get(encoded)
+            if stream is None:
+                stream = DataStream.FromEncoded(encoded)
+                decoded[encoded] = stream
+
+            if self._has_dependents(stream):
+                self.sensor_log.push_value(stream, raw_times[start], values[start])
+                self._propagate_input(stream, raw_times[start], rpc_executor)
+                start += 1
+                continue
+
+            end = start + 1
+            while end < count and streams[end] == encoded:
+                end += 1
+
+            self.sensor_log.push_columns(stream, raw_times[start:end], values[start:end])
+            start = end
+
+    def _find_plan(self, stream):
+        """Find the execution plan for inputs on a stream, compiling it if needed.
+
+        Returns:
+            tuple: The plan returned by _compile_plan or None if inputs must be
+                processed with a breadth first search.
+        """
+
+        if self._plans is None:
+            return None
+
+        encoded = stream.encode()
+        plan = self._plans.get(encoded)
+        if plan is None:
+            plan = self._compile_plan(stream)
+            if plan is not None:
+                self._plans[encoded] = plan
+
+        return plan
+
+    def _has_dependents(self, stream):
+        """Check if an input on a stream could cause any node to run."""
+
+        plan = self._find_plan(stream)
+        return plan is None or len(plan[0]) > 0
+
+    def _propagate_input(self, stream, raw_time, rpc_executor):
+        """Run all nodes that are triggered by an input that was just pushed.
+
+        Args:
+            stream (DataStream): The stream the input was pushed to.
+            raw_time (int): The tick of the input that is transferred to
+                all results produced by nodes.
+            rpc_executor (RPCExecutor): An object capable of executing RPCs
+                in case we need to do that.
+        """
+
+        plan = self._find_plan(stream)
+        if plan is None:
+            self._process_input_bfs(raw_time, rpc_executor)
+            return
+
+        nodes, outputs, roots = plan
+
+        dirty = [False]*len(nodes)
+        for i in roots:
+            dirty[i] = True
+
+        for i, node in enumerate(nodes):
+            if not dirty[i] or not node.triggered():
+                continue
+
+            results = node.process(rpc_executor)
+            self._push_results(node, results, raw_time)
+
+            # If we generated any outputs, mark our downstream nodes
+            # so that they are also checked to see if they should run.
+            if len(results) > 0:
+                for j in outputs[i]:
+                    dirty[j] = True
+
+    def _process_input_bfs(self, raw_time, rpc_executor):
+        """Process an input by checking nodes in breadth first order.
+
+        This is used for graphs that contain cycles and therefore cannot
+        have an execution plan compiled for them.
+        """
 
         to_check = deque([x for x in self.roots])
 
@@ -291,15 +423,97 @@ class SensorGraph(object):
             node = to_check.popleft()
             if node.triggered():
                 results = node.process(rpc_executor)
-                for result in results:
-                    result.raw_time = value.raw_time
-                    self.sensor_log.push(node.stream, result)
+                self._push_results(node, results, raw_time)
 
                 # If we generated any outputs, notify our downstream nodes
                 # so that they are also checked to see if they should run.
                 if len(results) > 0:
                     to_check.extend(node.outputs)
 
+    def _push_results(self, node, results, raw_time):
+        """Push the results of running a node into its output stream.
+
+        Args:
+            node (SGNode): The node that was run.
+            results (list(IOTileReading) or ReadingBatch): The results
+                returned by the node.
+            raw_time (int): The tick of the input that caused the node
+                to run.
+        """
+
+        if isinstance(results, ReadingBatch):
+            self.sensor_log.push_block(node.stream, raw_time, results)
+            return
+
+        for result in results:
+            result.raw_time = raw_time
+            self.sensor_log.push(node.stream, result)
+
+    def _compile_plan(self, stream):
+        """Compile the execution plan for inputs on a given stream.
+
+        The plan contains only the nodes that are downstream of the root
+        nodes that have an input matching stream, in topological order, so
+        that each node is checked at most once per input, after all of the
+        nodes that feed it.
+
+        If the graph contains a cycle, no plan can be compiled and all
+        future inputs are processed with a breadth first search.
+
+        Args:
+            stream (DataStream): The input stream to compile a plan for.
+
+        Returns:
+            (list(SGNode), list(list(int)), list(int)): The nodes to check, the
+                plan indices of each node's outputs and the plan indices of the
+                root nodes that should be checked first.  None is returned if
+                the graph contains a cycle.
+        """
+
+        node_map = {id(node): i for i, node in enumerate(self.nodes)}
+        node_deps = {i: set() for i in range(len(self.nodes))}
+
+        for node in self.nodes:
+            for output in node.outputs:
+                node_deps[node_map[id(output)]].add(node_map[id(node)])
+
+        try:
+            node_order = toposort_flatten(node_deps)
+        except CircularDependencyError:
+            self._plans = None
+            return None
+
+        roots = [node for node in self.roots if node.find_input(stream) is not None]
+
+        # Find all nodes that could be affected by an input on this stream
+        reachable = set()
+        to_check = deque(roots)
+        while len(to_check) > 0:
+            node = to_check.popleft()
+            if id(node) in reachable:
+                continue
+
+            reachable.add(id(node))
+            to_check.extend(node.outputs)
+
+        nodes = [self.nodes[i] for i in node_order if id(self.nodes[i]) in reachable]
+        plan_map = {id(node): i for i, node in enumerate(nodes)}
+
+        outputs = [[plan_map[id(x)] for x in node.outputs] for node in nodes]
+        root_indices = [plan_map[id(x)] for x in roots]
+
+        return nodes, outputs, root_indices
+
+    def invalidate_plans(self):
+        """Discard all compiled execution plans.
+
+        This must be called whenever nodes are added, removed or
+        reconnected outside of add_node so that process_input will
+        compile a new plan based on the current structure of the graph.
+        """
+
+        self._plans = {}
+
     def iterate_bfs(self):
         """Generator that yields node, [inputs], [outputs] in breadth first order.
 
@@ -365,7 +579,8 @@ class SensorGraph(object):
         """Find a processing function by name.
 
         This function searches through installed processing functions
-        using pkg_resources.
+        using the process wide ProcessorRegistry so entry points are only
+        scanned once.
 
         Args:
             name (str): The name of the function we're looking for
@@ -374,8 +589,25 @@ class SensorGraph(object):
             callable: The processing function
         """
 
-        for entry in iter_entry_points(u'iotile.sg_processor', name):
-            return entry.load()
+        return default_registry().find_processing_function(name)
+
+    @classmethod
+    def find_block_processing_function(cls, name):
+        """Find the block version of a processing function by name.
+
+        Block processing functions are optional and are registered under the
+        same name as the processing function they replace.  If there is no
+        block version of a function, the normal processing function is used.
+
+        Args:
+            name (str): The name of the function we're looking for
+
+        Returns:
+            callable: The block processing function or None if there is no
+                block version of the function.
+        """
+
+        return default_registry().find_block_processing_function(name)
 
     def dump_nodes(self):
         """Dump all of the nodes in this sensor graph as a list of strings."""
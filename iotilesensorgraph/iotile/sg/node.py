@@ -175,6 +175,7 @@ class SGNode(object):
         self.stream = stream
         self.func_name = None
         self.func = None
+        self.block_func = None
         self.trigger_combiner = SGNode.OrTriggerCombiner
 
         self.max_outputs = max_outputs
@@ -308,7 +309,7 @@ class SGNode(object):
 
         return False not in trigs
 
-    def set_func(self, name, func):
+    def set_func(self, name, func, block_func=None):
         """Set the processing function to use for this node.
 
         Args:
@@ -320,10 +321,19 @@ class SGNode(object):
                 callable(input1_walker, input2_walker, ...)
                 It should return a list of IOTileReadings that are then pushed into
                 the node's output stream
+            block_func (callable): An optional block version of func that is
+                used instead of it if given.  It is called with all of the
+                available readings from each input as a ReadingBatch:
+                callable(input1_block, input2_block, ...)
+                It should return a ReadingBatch with the readings that are then
+                pushed into the node's output stream.  If the function has a
+                block_inputs attribute, only that many leading inputs are
+                passed to it and all readings in the other inputs are skipped.
         """
 
         self.func_name = name
         self.func = func
+        self.block_func = block_func
 
     def process(self, rpc_executor):
         """Run this node's processing function.
@@ -333,11 +343,25 @@ class SGNode(object):
                 in case we need to do that.
 
         Returns:
-            list(IOTileReading): A list of IOTileReadings with the results of
-                the processing function or an empty list if no results were
-                produced
+            list(IOTileReading) or ReadingBatch: The results of the processing
+                function or an empty list if no results were produced.  A
+                ReadingBatch is returned if the node has a block processing
+                function.
         """
 
+        if self.block_func is not None:
+            used = getattr(self.block_func, 'block_inputs', len(self.inputs))
+
+            blocks = [x[0].pop_block() for x in self.inputs[:used]]
+            for walker, _trigger in self.inputs[used:]:
+                walker.skip_all()
+
+            results = self.block_func(*blocks, rpc_executor=rpc_executor)
+            if results is None:
+                results = []
+
+            return results
+
         if self.func is None:
             raise ProcessingFunctionError('No processing function set for node', stream=self.stream)
 
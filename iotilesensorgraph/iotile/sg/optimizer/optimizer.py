@@ -106,3 +106,5 @@ class SensorGraphOptimizer(object):
 
             while rerun:
                 rerun = pass_instance.run(sensor_graph, model=model)
+
+        sensor_graph.invalidate_plans()
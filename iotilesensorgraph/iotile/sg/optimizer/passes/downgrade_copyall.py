@@ -77,6 +77,7 @@ class ConvertCopyAllToCopyLatest(object):
 
             if can_downgrade:
                 did_downgrade = True
-                node.set_func(u'copy_latest_a', sensor_graph.find_processing_function(u'copy_latest_a'))
+                node.set_func(u'copy_latest_a', sensor_graph.find_processing_function(u'copy_latest_a'),
+                              sensor_graph.find_block_processing_function(u'copy_latest_a'))
 
         return did_downgrade
@@ -0,0 +1,201 @@
+"""A cached registry of all installed sensor graph processing functions."""
+
+import os
+import hashlib
+import pkg_resources
+from iotile.core.utilities.cache_file import default_cache_folder, load_json_cache, save_json_cache
+
+
+class ProcessorRegistry(object):
+    """An index of the processing functions registered by installed packages.
+
+    Processing functions are registered as entry points in the
+    iotile.sg_processor and iotile.sg_block_processor groups.  Scanning entry
+    points is slow, so the registry scans them at most once per process and
+    remembers where each function is defined.  Functions are only imported
+    the first time they are looked up.
+
+    The index can also be saved to a cache file so that new processes do not
+    need to scan entry points at all.  The cache is keyed by the name, version
+    and location of every installed distribution and is ignored if anything
+    has been installed, removed or upgraded since it was written.  If a
+    processing function is not found in a cached index, entry points are
+    rescanned once in case the cache is stale.  Since most processing
+    functions do not have a block version, a missing block processing
+    function does not cause a rescan.
+
+    Args:
+        cache_file (str): Optional path to the file used to cache the index
+            between processes.  If not given, a file in the current virtual
+            environment or the IOTile settings directory is used.
+        use_cache (bool): Whether to load and save the cache file at all.
+    """
+
+    ProcessorGroup = u'iotile.sg_processor'
+    BlockProcessorGroup = u'iotile.sg_block_processor'
+
+    CacheFileName = 'sg_processor_cache.json'
+
+    def __init__(self, cache_file=None, use_cache=True):
+        if cache_file is None:
+            cache_file = os.path.join(default_cache_folder(), self.CacheFileName)
+
+        self.cache_file = cache_file
+        self.use_cache = use_cache
+
+        self._index = None
+        self._scanned = False
+        self._loaded = {}
+
+    @classmethod
+    def _environment_key(cls):
+        """Build a key that changes whenever the installed packages change."""
+
+        dists = sorted(u'{}=={}@{}'.format(x.project_name, x.version, x.location) for x in pkg_resources.working_set)
+        return hashlib.sha1(u'\n'.join(dists).encode('utf-8')).hexdigest()
+
+    def _scan(self):
+        """Scan all installed entry points and save the result."""
+
+        index = {}
+        for group in (self.ProcessorGroup, self.BlockProcessorGroup):
+            index[group] = {}
+
+            for entry in pkg_resources.iter_entry_points(group):
+                # The first registered function with a name wins, just like
+                # when iterating over entry points by name.
+                if entry.name not in index[group]:
+                    index[group][entry.name] = [entry.module_name, list(entry.attrs)]
+
+        self._index = index
+        self._scanned = True
+        self._save_cache()
+
+    def _load_cache(self):
+        """Load the index from our cache file if it is still valid.
+
+        Returns:
+            bool: Whether the index was loaded.
+        """
+
+        if not self.use_cache:
+            return False
+
+        data = load_json_cache(self.cache_file)
+        if not isinstance(data, dict) or data.get('key') != self._environment_key():
+            return False
+
+        self._index = data.get('index', {})
+        return True
+
+    def _save_cache(self):
+        if not self.use_cache:
+            return
+
+        data = {'key': self._environment_key(), 'index': self._index}
+        save_json_cache(self.cache_file, data)
+
+    def _ensure_index(self):
+        if self._index is None and not self._load_cache():
+            self._scan()
+
+    @classmethod
+    def _import(cls, module_name, attrs):
+        obj = __import__(module_name, fromlist=['__name__'])
+        for attr in attrs:
+            obj = getattr(obj, attr)
+
+        return obj
+
+    def _find(self, group, name, rescan_missing):
+        key = (group, name)
+        if key in self._loaded:
+            return self._loaded[key]
+
+        self._ensure_index()
+
+        location = self._index.get(group, {}).get(name)
+
+        if location is None and rescan_missing and not self._scanned:
+            self._scan()
+            location = self._index[group].get(name)
+
+        if location is None:
+            return None
+
+        try:
+            func = self._import(*location)
+        except (ImportError, AttributeError):
+            if self._scanned:
+                raise
+
+            # Our cached index is stale so rescan and try again
+            self._scan()
+            return self._find(group, name, rescan_missing)
+
+        self._loaded[key] = func
+        return func
+
+    def processor_names(self):
+        """List the names of all installed processing functions.
+
+        Returns:
+            list(str): The sorted names of all processing functions.
+        """
+
+        self._ensure_index()
+        return sorted(self._index.get(self.ProcessorGroup, {}))
+
+    def find_processing_function(self, name):
+        """Find a processing function by name.
+
+        Args:
+            name (str): The name of the function we're looking for
+
+        Returns:
+            callable: The processing function or None if there is no
+                function with that name.
+        """
+
+        return self._find(self.ProcessorGroup, name, True)
+
+    def find_block_processing_function(self, name):
+        """Find the block version of a processing function by name.
+
+        Args:
+            name (str): The name of the function we're looking for
+
+        Returns:
+            callable: The block processing function or None if there is no
+                block version of the function.
+        """
+
+        return self._find(self.BlockProcessorGroup, name, False)
+
+    def rescan(self):
+        """Rescan all installed entry points and update the cache file.
+
+        This should be called if packages are installed while a process is
+        running and their processing functions need to be found.
+        """
+
+        self._loaded = {}
+        self._scan()
+
+
+_default_registry = None
+
+
+def default_registry():
+    """Get the process wide processor registry.
+
+    Returns:
+        ProcessorRegistry: The shared registry.
+    """
+
+    global _default_registry
+
+    if _default_registry is None:
+        _default_registry = ProcessorRegistry()
+
+    return _default_registry
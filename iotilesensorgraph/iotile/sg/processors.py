@@ -3,11 +3,20 @@
 These functions should not be used directly but rather will be invoked by name
 when creating a sensor graph node inside the SensorGraph class.  They are found
 by looking at the installed python packages using pkg_resources.
+
+Some functions also have a block version, named with a _block suffix, that is
+registered under the same name in the iotile.sg_block_processor entry point
+group.  Block functions are passed all of the available readings from each
+input as a ReadingBatch rather than the input walkers and return a ReadingBatch,
+so they can operate on all of the readings at once.  A block function that
+only uses its first few inputs sets a block_inputs attribute to the number it
+uses so that the readings in the other inputs are skipped without copying
+them into blocks.
 """
 
 from iotile.core.exceptions import HardwareError
 from iotile.sg import StreamEmptyError
-from iotile.core.hw.reports import IOTileReading
+from iotile.core.hw.reports import IOTileReading, ReadingBatch
 
 
 def copy_all_a(input_a, *other_inputs, **kwargs):
@@ -32,6 +41,21 @@ def copy_all_a(input_a, *other_inputs, **kwargs):
     return output
 
 
+def copy_all_a_block(block_a, **kwargs):
+    """Copy all readings in input a into the output.
+
+    Block version of copy_all_a.
+
+    Returns:
+        ReadingBatch
+    """
+
+    return block_a
+
+
+copy_all_a_block.block_inputs = 1
+
+
 def copy_latest_a(input_a, *other_inputs, **kwargs):
     """Copy the latest reading from input a into the output.
 
@@ -62,6 +86,24 @@ def copy_latest_a(input_a, *other_inputs, **kwargs):
     return output
 
 
+def copy_latest_a_block(block_a, **kwargs):
+    """Copy the latest reading from input a into the output.
+
+    Block version of copy_latest_a.
+
+    Returns:
+        ReadingBatch
+    """
+
+    if len(block_a) == 0:
+        return ReadingBatch()
+
+    return block_a[-1:]
+
+
+copy_latest_a_block.block_inputs = 1
+
+
 def copy_count_a(input_a, *other_inputs, **kwargs):
     """Copy the latest reading from input a into the output.
 
@@ -12,6 +12,7 @@ from .stream import DataStreamSelector, DataStream
 from .walker import VirtualStreamWalker, CounterStreamWalker, BufferedStreamWalker
 from .exceptions import StreamEmptyError, StorageFullError
 from iotile.sg.model import DeviceModel
+from iotile.core.hw.reports import IOTileReading
 from iotile.core.exceptions import ArgumentError
 
 
@@ -38,6 +39,11 @@ class SensorLog(object):
         self._virtual_walkers = []
         self._queue_walkers = []
 
+        # Cache of the monitors and walkers that match each stream that has
+        # been pushed, keyed by encoded stream.  It is rebuilt lazily whenever
+        # a monitor or walker is added or removed.
+        self._dispatch = {}
+
         if model is None:
             model = DeviceModel()
 
@@ -61,6 +67,7 @@ class SensorLog(object):
             self._monitors[selector] = set()
 
         self._monitors[selector].add(callback)
+        self._dispatch.clear()
 
     def create_walker(self, selector):
         """Create a stream walker based on the given selector.
@@ -78,6 +85,8 @@ class SensorLog(object):
                 streams that we want to iterate over.
         """
 
+        self._dispatch.clear()
+
         if selector.buffered:
             walker = BufferedStreamWalker(selector, self._engine)
             self._queue_walkers.append(walker)
@@ -105,6 +114,8 @@ class SensorLog(object):
         else:
             self._virtual_walkers.remove(walker)
 
+        self._dispatch.clear()
+
     def clear(self):
         """Clear all data from this sensor_log.
 
@@ -129,37 +140,175 @@ class SensorLog(object):
         """
 
         # Make sure the stream is correct
+        encoded = stream.encode()
         reading = copy.copy(reading)
-        reading.stream = stream.encode()
+        reading.stream = encoded
+
+        self._push_reading(stream, encoded, reading)
+
+    def push_value(self, stream, raw_time, value, reading_id=None):
+        """Push a raw value into a stream, updating any associated stream walkers.
+
+        This is the same as push() except that the reading is created here
+        from its raw time and value, so it does not need to be copied.
+
+        Args:
+            stream (DataStream): the stream to push the reading into
+            raw_time (int): the tick at which the reading was taken
+            value (int): the value of the reading
+            reading_id (int): an optional reading id for the reading
+
+        Returns:
+            IOTileReading: The reading that was pushed.
+        """
+
+        encoded = stream.encode()
+        reading = IOTileReading(raw_time, encoded, value, reading_id=reading_id)
+        self._push_reading(stream, encoded, reading)
+        return reading
+
+    def push_block(self, stream, raw_time, batch):
+        """Push all of the readings in a batch into a stream at once.
+
+        This is the bulk version of push_value() used for the results of
+        block processing functions.  Every reading is given raw_time and its
+        value and reading id from the batch.  Stream walkers are notified
+        once for the whole batch rather than once per reading, and
+        IOTileReading objects are only created for readings that need to be
+        stored in a buffer or passed to a monitor.  Virtual streams only
+        keep the last reading of the batch.
+
+        Args:
+            stream (DataStream): the stream to push the readings into
+            raw_time (int): the tick at which the readings were taken
+            batch (ReadingBatch): the readings to push
+        """
+
+        self._push_rows(stream, [raw_time]*len(batch), batch.values, batch.reading_ids)
+
+    def push_columns(self, stream, raw_times, values, reading_ids=None):
+        """Push a series of raw values into a stream at once.
+
+        This is the same as calling push_value() for each value, with the
+        same savings as push_block(): walkers are notified once and
+        IOTileReading objects are only created for readings that are stored
+        in a buffer or passed to a monitor.
+
+        Args:
+            stream (DataStream): the stream to push the readings into
+            raw_times (sequence of int): the tick of each reading
+            values (sequence of int): the value of each reading
+            reading_ids (sequence of int): optional reading ids, all readings
+                have an id of IOTileReading.InvalidReadingID if not given.
+        """
+
+        if reading_ids is None:
+            reading_ids = [IOTileReading.InvalidReadingID]*len(values)
+
+        self._push_rows(stream, raw_times, values, reading_ids)
+
+    def _push_rows(self, stream, raw_times, values, reading_ids):
+        """Push parallel columns of readings into a stream and notify walkers once."""
+
+        if len(values) == 0:
+            return
+
+        encoded = stream.encode()
+        callbacks, queue_walkers, virtual_walkers = self._dispatch_entry(stream, encoded)
+
+        if stream.buffered or len(callbacks) > 0:
+            readings = [IOTileReading(raw_time, encoded, value, reading_id=reading_id)
+                        for raw_time, value, reading_id in zip(raw_times, values, reading_ids)]
+            last = readings[-1]
+        else:
+            readings = None
+            last = IOTileReading(raw_times[-1], encoded, values[-1], reading_id=reading_ids[-1])
 
         if stream.buffered:
-            output_buffer = stream.output
+            added = 0
+            for reading in readings:
+                try:
+                    self._engine.push(reading)
+                except StorageFullError:
+                    # Walkers must learn about the readings pushed so far
+                    # before the buffer erase shifts their positions.
+                    for walker in queue_walkers:
+                        walker.notify_added(stream, added)
+
+                    added = 0
+                    self._erase_buffer(stream.output)
+                    self._engine.push(reading)
+
+                added += 1
+
+            for walker in queue_walkers:
+                walker.notify_added(stream, added)
+
+        if len(callbacks) > 0:
+            for reading in readings:
+                for callback in callbacks:
+                    callback(stream, reading)
+
+        for walker in virtual_walkers:
+            walker.push(stream, last, count=len(values))
 
+        self._last_values[stream] = last
+
+    def _push_reading(self, stream, encoded, reading):
+        """Store a reading that already has the correct stream and notify walkers."""
+
+        callbacks, queue_walkers, virtual_walkers = self._dispatch_entry(stream, encoded)
+
+        if stream.buffered:
             try:
                 self._engine.push(reading)
             except StorageFullError:
                 self._erase_buffer(stream.output)
                 self._engine.push(reading)
 
-            for walker in self._queue_walkers:
-                # Only notify the walkers that are on this queue
-                if walker.selector.output == output_buffer:
-                    walker.notify_added(stream)
+            for walker in queue_walkers:
+                walker.notify_added(stream)
 
         # Activate any monitors we have for this stream
-        for selector in self._monitors:
-            if selector.matches(stream):
-                for callback in self._monitors[selector]:
-                    callback(stream, reading)
+        for callback in callbacks:
+            callback(stream, reading)
 
         # Virtual streams live only in their walkers, so update each walker
         # that contains this stream.
-        for walker in self._virtual_walkers:
-            if walker.matches(stream):
-                walker.push(stream, reading)
+        for walker in virtual_walkers:
+            walker.push(stream, reading)
 
         self._last_values[stream] = reading
 
+    def _dispatch_entry(self, stream, encoded):
+        """Find the monitor callbacks and walkers that match a stream.
+
+        The result is cached so that matching every selector against a
+        stream only happens the first time that stream is pushed after a
+        monitor or walker has been added or removed.
+
+        Args:
+            stream (DataStream): The stream to find matches for.
+            encoded (int): The encoded version of stream.
+
+        Returns:
+            (tuple, tuple, tuple): The matching monitor callbacks, queue walkers and
+                virtual walkers.
+        """
+
+        entry = self._dispatch.get(encoded)
+        if entry is not None:
+            return entry
+
+        callbacks = tuple(callback for selector, selector_callbacks in self._monitors.items()
+                          if selector.matches(stream) for callback in selector_callbacks)
+        queue_walkers = tuple(walker for walker in self._queue_walkers if walker.matches(stream))
+        virtual_walkers = tuple(walker for walker in self._virtual_walkers if walker.matches(stream))
+
+        entry = (callbacks, queue_walkers, virtual_walkers)
+        self._dispatch[encoded] = entry
+        return entry
+
     def _erase_buffer(self, output_buffer):
         """Erase readings in the specified buffer to make space."""
 
@@ -171,15 +320,11 @@ class SensorLog(object):
 
         old_readings = self._engine.popn(buffer_type, erase_size)
 
-        # Now go through all of our walkers that could match and
-        # update their availability counts and data buffer pointers
-        for reading in old_readings:
-            stream = DataStream.FromEncoded(reading.stream)
-
-            for walker in self._queue_walkers:
-                # Only notify the walkers that are on this queue
-                if walker.selector.output == output_buffer:
-                    walker.notify_rollover(stream)
+        # Now go through all of our walkers on this buffer and update their
+        # availability counts and data buffer pointers
+        for walker in self._queue_walkers:
+            if walker.selector.output == output_buffer:
+                walker.notify_rollover(len(old_readings))
 
     def inspect_last(self, stream):
         """Return the last value pushed into a stream.
@@ -1,6 +1,7 @@
 from .simulator import SensorGraphSimulator
+from .fleet import FleetSimulator
 
 # FIXME: add this back once we merge the port of py36 compatible typedargs
 # from .hosted_executor import SemihostedRPCExecutor
 
-__all__ = ['SensorGraphSimulator']#, 'SemihostedRPCExecutor']
+__all__ = ['SensorGraphSimulator', 'FleetSimulator']#, 'SemihostedRPCExecutor']
@@ -0,0 +1,207 @@
+"""Simulate many independent sensor graphs in parallel across processes.
+
+Each simulated device is described by a FleetDevice object that lists the
+sensor graph file to load along with the stimuli and stop conditions for that
+device.  FleetSimulator distributes the devices across a pool of worker
+processes, each of which compiles and runs one sensor graph at a time and
+sends back the readings in its trace packed into a compact binary format.
+"""
+
+import struct
+import multiprocessing
+from builtins import range
+from iotile.core.exceptions import ArgumentError
+from iotile.core.hw.reports import IOTileReading
+from ..model import DeviceModel
+from ..stream import DataStreamSelector
+from ..parser import SensorGraphFileParser
+from ..optimizer import SensorGraphOptimizer
+from .simulator import SensorGraphSimulator
+from .trace import SimulationTrace
+
+# stream, reading_id, raw_time, value
+_TRACE_RECORD = struct.Struct("<HLLq")
+
+
+class FleetDevice(object):
+    """A description of one device that should be simulated in a fleet.
+
+    Args:
+        device_id (int): A unique identifier for this device.
+        sensor_graph (str): The path to the sensor graph file to load.
+        stop_conditions (list of str): The stop conditions for the simulation,
+            in the same format as SensorGraphSimulator.stop_condition().
+        stimuli (list of str): Optional stimuli for the simulation in the same
+            format as SensorGraphSimulator.stimulus().
+        watch (list of str): Optional selectors for the streams to trace.  If
+            not given, the outputs of the sensor graph's streamers are traced.
+        optimize (bool): Whether to run the sensor graph optimizer before
+            simulating.  Defaults to True.
+    """
+
+    def __init__(self, device_id, sensor_graph, stop_conditions, stimuli=None, watch=None, optimize=True):
+        if stimuli is None:
+            stimuli = []
+
+        if len(stop_conditions) == 0:
+            raise ArgumentError("You must specify at least one stop condition for each simulated device", device_id=device_id)
+
+        self.device_id = device_id
+        self.sensor_graph = sensor_graph
+        self.stop_conditions = list(stop_conditions)
+        self.stimuli = list(stimuli)
+        self.watch = watch
+        self.optimize = optimize
+
+
+def pack_trace(trace):
+    """Pack the readings in a simulation trace into a binary blob.
+
+    Each reading is packed as a fixed size record containing its stream,
+    reading id, raw time and value.
+
+    Args:
+        trace (list of IOTileReading): The readings to pack.
+
+    Returns:
+        bytes: The packed readings.
+    """
+
+    packed = bytearray(_TRACE_RECORD.size*len(trace))
+
+    for i, reading in enumerate(trace):
+        _TRACE_RECORD.pack_into(packed, i*_TRACE_RECORD.size, reading.stream, reading.reading_id, reading.raw_time, reading.value)
+
+    return bytes(packed)
+
+
+def unpack_trace(packed, selectors):
+    """Unpack a binary blob created by pack_trace into a SimulationTrace.
+
+    Args:
+        packed (bytes): The packed readings.
+        selectors (list of DataStreamSelector): The selectors used to
+            produce the trace.
+
+    Returns:
+        SimulationTrace: The unpacked trace.
+    """
+
+    readings = []
+    for i in range(0, len(packed) // _TRACE_RECORD.size):
+        stream, reading_id, raw_time, value = _TRACE_RECORD.unpack_from(packed, i*_TRACE_RECORD.size)
+        readings.append(IOTileReading(raw_time, stream, value, reading_id=reading_id))
+
+    return SimulationTrace(readings, selectors=selectors)
+
+
+def _simulate_device(device):
+    """Compile and simulate a single device inside a worker process.
+
+    Returns:
+        (int, list of str, bytes, str): The device id, the selectors that were
+            traced, the packed trace and an error message if the simulation
+            failed, otherwise None.
+    """
+
+    try:
+        model = DeviceModel()
+
+        parser = SensorGraphFileParser()
+        parser.parse_file(device.sensor_graph)
+        parser.compile(model)
+
+        if device.optimize:
+            opt = SensorGraphOptimizer()
+            opt.optimize(parser.sensor_graph, model=model)
+
+        graph = parser.sensor_graph
+        sim = SensorGraphSimulator(graph)
+
+        for stop in device.stop_conditions:
+            sim.stop_condition(stop)
+
+        for stim in device.stimuli:
+            sim.stimulus(stim)
+
+        graph.load_constants()
+
+        selectors = None
+        if device.watch is not None:
+            selectors = [DataStreamSelector.FromString(x) for x in device.watch]
+
+        sim.record_trace(selectors)
+        sim.run()
+    except Exception as exc:  #pylint: disable=broad-except;One bad device should not stop the rest of the fleet
+        return device.device_id, [], b'', str(exc)
+
+    return device.device_id, [str(x) for x in sim.trace.selectors], pack_trace(sim.trace), None
+
+
+class FleetSimulator(object):
+    """Simulate many independent sensor graphs using a pool of processes.
+
+    Devices are added with add_device() and then all simulated with a call
+    to run(), which returns the trace for each device that was simulated
+    successfully.  Devices whose simulation failed are listed in the
+    failures property with the reason that they failed.
+
+    Args:
+        processes (int): The number of worker processes to use.  If not
+            specified, one process per CPU is used.  If 1 is given, all
+            devices are simulated in the calling process.
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes
+        self.devices = []
+        self.failures = {}
+
+    def add_device(self, device_id, sensor_graph, stop_conditions, stimuli=None, watch=None, optimize=True):
+        """Add a device to be simulated.
+
+        See FleetDevice for a description of the arguments.
+        """
+
+        if any(x.device_id == device_id for x in self.devices):
+            raise ArgumentError("Attempted to add the same device twice", device_id=device_id)
+
+        self.devices.append(FleetDevice(device_id, sensor_graph, stop_conditions, stimuli, watch, optimize))
+
+    def run(self, chunksize=1):
+        """Simulate all devices that have been added.
+
+        Args:
+            chunksize (int): The number of devices sent to a worker process
+                at a time.
+
+        Returns:
+            dict: A map of device id to the SimulationTrace from that device.
+        """
+
+        self.failures = {}
+
+        if self.processes == 1:
+            results = [_simulate_device(x) for x in self.devices]
+            return self._collect(results)
+
+        pool = multiprocessing.Pool(self.processes)
+
+        try:
+            return self._collect(pool.imap_unordered(_simulate_device, self.devices, chunksize))
+        finally:
+            pool.close()
+            pool.join()
+
+    def _collect(self, results):
+        traces = {}
+
+        for device_id, selectors, packed, error in results:
+            if error is not None:
+                self.failures[device_id] = error
+                continue
+
+            selectors = [DataStreamSelector.FromString(x) for x in selectors]
+            traces[device_id] = unpack_trace(packed, selectors)
+
+        return traces
@@ -1,6 +1,7 @@
 """A SensorGraph simulator that can drive the sensor graph either in realtime or as fast as possible."""
 
 import time
+import heapq
 from monotonic import monotonic
 from ..known_constants import system_tick, fast_tick, tick_1, tick_2, battery_voltage
 from .null_executor import NullRPCExecutor
@@ -107,6 +108,24 @@ class SensorGraphSimulator(object):
         reading = IOTileReading(input_stream.encode(), self.tick_count, value)
         self.sensor_graph.process_input(input_stream, reading, self.rpc_executor)
 
+    def step_many(self, input_streams, values):
+        """Step the sensor graph through a batch of inputs.
+
+        This is the same as calling step() once for each input but the
+        inputs are passed to SensorGraph.process_inputs as columns, so runs
+        of inputs that no node depends on are stored without creating an
+        IOTileReading per input.  All inputs are given the current tick
+        count, which is not advanced.
+
+        Args:
+            input_streams (sequence of int): The encoded input stream for
+                each value.
+            values (sequence of int): The reading values to push.
+        """
+
+        raw_times = [self.tick_count]*len(values)
+        self.sensor_graph.process_inputs(input_streams, raw_times, values, self.rpc_executor)
+
     def run(self, include_reset=True, accelerated=True):
         """Run this sensor graph until a stop condition is hit.
 
@@ -114,6 +133,13 @@ class SensorGraphSimulator(object):
         there has been some change in the stop conditions that would
         cause the second call to not exit immediately.
 
+        In accelerated mode, the simulator does not step through every
+        second of simulated time.  Instead it jumps directly from one
+        event to the next, where an event is a tick or stimulus that sends
+        an input to the sensor graph or the time when a time based stop
+        condition is met.  This makes the cost of a simulation proportional
+        to the number of inputs rather than the number of simulated seconds.
+
         Args:
             include_reset (bool): Start the sensor graph run with
                 a reset event to match what would happen when an
@@ -132,16 +158,14 @@ class SensorGraphSimulator(object):
             pass  # TODO: include a reset event here
 
         # Process all stimuli that occur at the start of the simulation
-        i = None
-        for i, stim in enumerate(self.stimuli):
-            if stim.time != 0:
-                break
-
+        while len(self.stimuli) > 0 and self.stimuli[0].time == 0:
+            stim = self.stimuli.pop(0)
             reading = IOTileReading(self.tick_count, stim.stream.encode(), stim.value)
             self.sensor_graph.process_input(stim.stream, reading, self.rpc_executor)
 
-        if i is not None and i > 0:
-            self.stimuli = self.stimuli[i:]
+        if accelerated:
+            self._run_accelerated()
+            return
 
         while not self._check_stop_conditions(self.sensor_graph):
             # Process one more one second tick
@@ -151,35 +175,80 @@ class SensorGraphSimulator(object):
             # To match what is done in actual hardware, we increment tick count so the first tick
             # is 1.
             self.tick_count += 1
+            self._process_tick(self.tick_count)
 
-            # Process all stimuli that occur at this tick of the simulation
-            i = None
-            for i, stim in enumerate(self.stimuli):
-                if stim.time != self.tick_count:
-                    break
+            now = monotonic()
 
-                reading = IOTileReading(self.tick_count, stim.stream.encode(), stim.value)
-                self.sensor_graph.process_input(stim.stream, reading, self.rpc_executor)
+            # If we are trying to execute this sensor graph in realtime, wait for
+            # the remaining slice of this tick.
+            if now < next_tick:
+                time.sleep(next_tick - now)
 
-            if i is not None and i > 0:
-                self.stimuli = self.stimuli[i:]
+    def _run_accelerated(self):
+        """Run the simulation by jumping directly between events.
 
-            self._check_additional_ticks(self.tick_count)
+        A priority queue holds the next tick at which each periodic tick
+        source fires.  The next event is the earliest of these, the next
+        pending stimulus and the earliest time based stop condition.
+        """
 
-            if (self.tick_count % 10) == 0:
-                reading = IOTileReading(self.tick_count, system_tick.encode(), self.tick_count)
-                self.sensor_graph.process_input(system_tick, reading, self.rpc_executor)
+        tick_intervals = [10]
+        for name in ('fast', 'user1', 'user2'):
+            interval = self.sensor_graph.get_tick(name)
+            if interval != 0:
+                tick_intervals.append(interval)
 
-                # Every 10 seconds the battery voltage is reported in 16.16 fixed point format in volts
-                reading = IOTileReading(self.tick_count, battery_voltage.encode(), int(self.voltage * 65536))
-                self.sensor_graph.process_input(battery_voltage, reading, self.rpc_executor)
+        pending = [((self.tick_count // interval + 1) * interval, interval) for interval in tick_intervals]
+        heapq.heapify(pending)
 
-            now = monotonic()
+        stop_tick = None
+        for stop in self.stop_conditions:
+            max_time = stop.max_run_time()
+            if max_time is None:
+                continue
 
-            # If we are trying to execute this sensor graph in realtime, wait for
-            # the remaining slice of this tick.
-            if (not accelerated) and (now < next_tick):
-                time.sleep(next_tick - now)
+            stop_at = self._start_tick + max_time
+            if stop_tick is None or stop_at < stop_tick:
+                stop_tick = stop_at
+
+        while True:
+            next_tick = pending[0][0]
+
+            if len(self.stimuli) > 0:
+                next_tick = min(next_tick, max(self.stimuli[0].time, self.tick_count + 1))
+
+            if stop_tick is not None and stop_tick < next_tick:
+                self.tick_count = stop_tick
+            else:
+                self.tick_count = next_tick
+                self._process_tick(next_tick)
+
+                while pending[0][0] == next_tick:
+                    _tick, interval = pending[0]
+                    heapq.heapreplace(pending, (next_tick + interval, interval))
+
+            if self._check_stop_conditions(self.sensor_graph):
+                return
+
+    def _process_tick(self, tick):
+        """Send all of the inputs that happen at a given tick to the sensor graph."""
+
+        # Process all stimuli that occur at this tick of the simulation, any
+        # stimuli that were scheduled in the past are injected now.
+        while len(self.stimuli) > 0 and self.stimuli[0].time <= tick:
+            stim = self.stimuli.pop(0)
+            reading = IOTileReading(tick, stim.stream.encode(), stim.value)
+            self.sensor_graph.process_input(stim.stream, reading, self.rpc_executor)
+
+        self._check_additional_ticks(tick)
+
+        if (tick % 10) == 0:
+            reading = IOTileReading(tick, system_tick.encode(), tick)
+            self.sensor_graph.process_input(system_tick, reading, self.rpc_executor)
+
+            # Every 10 seconds the battery voltage is reported in 16.16 fixed point format in volts
+            reading = IOTileReading(tick, battery_voltage.encode(), int(self.voltage * 65536))
+            self.sensor_graph.process_input(battery_voltage, reading, self.rpc_executor)
 
     def _check_additional_ticks(self, tick_value):
         fast_interval = self.sensor_graph.get_tick('fast')
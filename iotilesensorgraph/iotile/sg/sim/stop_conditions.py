@@ -41,6 +41,11 @@ class StopCondition(object):
     There should be a second class method, FromString(cls, desc) that
     tries to parse this stop condition from a text string.  The function
     must raise an ArgumentError if it could not match the input string.
+
+    When a simulation is run in accelerated mode, stop conditions are only
+    checked after ticks where an input is sent to the sensor graph.  Stop
+    conditions that depend on the passage of time must override
+    max_run_time() so that the simulator knows when to check them.
     """
 
     def should_stop(self, abs_second_count, rel_second_count, sensor_graph):
@@ -60,6 +65,16 @@ class StopCondition(object):
 
         return False
 
+    def max_run_time(self):
+        """The number of seconds after the start of `run` when this condition is met.
+
+        Returns:
+            int: The relative second count when this condition stops the
+                simulation or None if it does not depend on time.
+        """
+
+        return None
+
 
 class TimeBasedStopCondition(StopCondition):
     """Stop the simulation after a fixed period of time.
@@ -91,6 +106,15 @@ class TimeBasedStopCondition(StopCondition):
 
         return rel_seconds >= self.max_time
 
+    def max_run_time(self):
+        """The number of seconds after the start of `run` when this condition is met.
+
+        Returns:
+            int: The maximum run time of the simulation.
+        """
+
+        return self.max_time
+
     @classmethod
     def FromString(cls, desc):
         """Parse this stop condition from a string representation.
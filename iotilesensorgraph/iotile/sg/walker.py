@@ -1,6 +1,9 @@
 """Stream walkers are the basic data retrieval mechanism in sensor graph."""
 
-from iotile.core.exceptions import ArgumentError, InternalError
+from builtins import range
+from collections import deque
+from iotile.core.hw.reports import ReadingBatch
+from iotile.core.exceptions import ArgumentError
 from iotile.sg.exceptions import StreamEmptyError
 from iotile.sg.stream import DataStream
 
@@ -32,10 +35,30 @@ class StreamWalker(object):
     def buffered(self):
         return self.selector.buffered
 
+    def pop_block(self):
+        """Pop all available readings from this walker as a single block.
+
+        Returns:
+            ReadingBatch: All of the readings that were available.
+        """
+
+        block = ReadingBatch()
+
+        while self.count() > 0:
+            block.append(self.pop())
+
+        return block
+
 
 class BufferedStreamWalker(StreamWalker):
     """A stream walker backed by a storage buffer.
 
+    The walker keeps an index of the positions of all of the readings in the
+    storage buffer that match its selector so that it can jump directly to
+    its next reading without scanning over readings from other streams.
+    Positions are counted from the first reading this walker saw in the
+    buffer so they are not affected when older readings are erased.
+
     Args:
         selector (DataStreamSelector): The selector for the streams
             that we are walking
@@ -45,91 +68,118 @@ class BufferedStreamWalker(StreamWalker):
     def __init__(self, selector, engine):
         super(BufferedStreamWalker, self).__init__(selector)
         self.engine = engine
-        self._count = 0
-
-        storage, streaming = self.engine.count()
 
         if selector.output:
-            self.offset = streaming
             self.storage_type = u'streaming'
         else:
-            self.offset = storage
             self.storage_type = u'storage'
 
+        self._positions = deque()
+        self._base = 0
+        self._next = self._engine_count()
+
+    def _engine_count(self):
+        storage, streaming = self.engine.count()
+
+        if self.selector.output:
+            return streaming
+
+        return storage
+
+    @property
+    def offset(self):
+        """The offset in the storage buffer just past our last consumed reading."""
+
+        return self._next - self._base
+
     def count(self):
-        return self._count
+        return len(self._positions)
 
     def pop(self):
         """Pop a reading off of this stream and return it."""
 
-        if self._count == 0:
+        if len(self._positions) == 0:
             raise StreamEmptyError("Pop called on buffered stream walker without any data", selector=self.selector)
 
-        while True:
-            curr = self.engine.get(self.storage_type, self.offset)
-            self.offset += 1
+        position = self._positions.popleft()
+        self._next = position + 1
 
-            stream = DataStream.FromEncoded(curr.stream)
-            if self.matches(stream):
-                self._count -= 1
-                return curr
+        return self.engine.get(self.storage_type, position - self._base)
 
     def peek(self):
         """Peek at the oldest reading in this virtual stream."""
 
-        if self._count == 0:
+        if len(self._positions) == 0:
             raise StreamEmptyError("Peek called on buffered stream walker without any data", selector=self.selector)
 
-        offset = self.offset
+        return self.engine.get(self.storage_type, self._positions[0] - self._base)
 
-        while True:
-            curr = self.engine.get(self.storage_type, offset)
-            offset += 1
+    def pop_block(self):
+        """Pop all available readings from this walker as a single block.
 
-            stream = DataStream.FromEncoded(curr.stream)
-            if self.matches(stream):
-                return curr
+        If the storage engine supports fetching readings directly into a
+        block with get_block(), no IOTileReading objects are created.
 
-    def skip_all(self):
-        """Skip all readings in this walker."""
+        Returns:
+            ReadingBatch: All of the readings that were available.
+        """
 
-        storage, streaming = self.engine.count()
+        offsets = [x - self._base for x in self._positions]
 
-        if self.selector.output:
-            self.offset = streaming
+        get_block = getattr(self.engine, 'get_block', None)
+        if get_block is not None:
+            block = get_block(self.storage_type, offsets)
         else:
-            self.offset = storage
+            block = ReadingBatch.FromReadings(self.engine.get(self.storage_type, x) for x in offsets)
 
-        self._count = 0
+        if len(self._positions) > 0:
+            self._next = self._positions[-1] + 1
+            self._positions.clear()
 
-    def notify_added(self, stream):
-        """Notify that a new reading has been added.
+        return block
+
+    def skip_all(self):
+        """Skip all readings in this walker."""
+
+        self._positions.clear()
+        self._base = 0
+        self._next = self._engine_count()
+
+    def notify_added(self, stream, count=1):
+        """Notify that new readings have been added.
+
+        The readings must have just been pushed into the storage engine so
+        that they are the newest readings in their buffer.
 
         Args:
             stream (DataStream): The stream that had new data
+            count (int): The number of readings that were added.
         """
 
         if not self.matches(stream):
             return
 
-        self._count += 1
+        end = self._base + self._engine_count()
+        self._positions.extend(range(end - count, end))
 
-    def notify_rollover(self, stream):
-        """Notify that a reading in the given stream was overwritten.
+    def notify_rollover(self, count):
+        """Notify that the oldest readings in our buffer were erased.
+
+        Any readings that were erased before we consumed them are dropped
+        from this walker.
 
         Args:
-            stream (DataStream): The stream that had overwritten data.
+            count (int): The number of readings that were erased from
+                the start of the buffer.
         """
 
-        self.offset -= 1
-
-        if not self.matches(stream):
-            return
+        self._base += count
 
-        if self._count == 0:
-            raise InternalError("BufferedStreamWalker out of sync with storage engine, count was wrong.")
+        while len(self._positions) > 0 and self._positions[0] < self._base:
+            self._positions.popleft()
 
-        self._count -= 1
+        if self._next < self._base:
+            self._next = self._base
 
 
 class VirtualStreamWalker(StreamWalker):
@@ -148,11 +198,17 @@ class VirtualStreamWalker(StreamWalker):
 
         self.reading = None
 
-    def push(self, stream, value):
+    def push(self, stream, value, count=1):
         """Update this stream walker with a new responsive reading.
 
         Virtual stream walkers keep at most one reading so this function
         just overwrites whatever was previously stored.
+
+        Args:
+            stream (DataStream): The stream that we're pushing
+            value (IOTileReading): The reading that we're pushing
+            count (int): The number of readings that were pushed, value
+                being the last of them.
         """
 
         if not self.matches(stream):
@@ -197,6 +253,20 @@ class VirtualStreamWalker(StreamWalker):
 
         return self.reading
 
+    def pop_block(self):
+        """Pop the reading in this virtual stream as a block.
+
+        Constant streams always return a block with their one reading.
+
+        Returns:
+            ReadingBatch: A block with zero or one readings.
+        """
+
+        if self.reading is None:
+            return ReadingBatch()
+
+        return ReadingBatch.FromReadings([self.pop()])
+
     def skip_all(self):
         """Skip all readings in this walker."""
 
@@ -229,19 +299,21 @@ class CounterStreamWalker(StreamWalker):
         self.reading = None
         self._count = 0
 
-    def push(self, stream, value):
+    def push(self, stream, value, count=1):
         """Update this stream walker with a new responsive reading.
 
         Args:
             stream (DataStream): The stream that we're pushing
             value (IOTileReading): The reading tha we're pushing
+            count (int): The number of readings that were pushed, value
+                being the last of them.
         """
 
         if not self.matches(stream):
             raise ArgumentError("Attempting to push reading to stream walker that does not match", selector=self.selector, stream=stream)
 
         self.reading = value
-        self._count += 1
+        self._count += count
 
     def iter(self):
         """Iterate over the readings that are responsive to this stream walker."""
@@ -307,12 +379,13 @@ class InvalidStreamWalker(StreamWalker):
 
         return False
 
-    def push(self, stream, value):
+    def push(self, stream, value, count=1):
         """Update this stream walker with a new responsive reading.
 
         Args:
             stream (DataStream): The stream that we're pushing
             value (IOTileReading): The reading tha we're pushing
+            count (int): The number of readings that were pushed.
         """
 
         raise ArgumentError("Attempting to push reading to an invalid stream walker that cannot hold data", selector=self.selector, stream=stream)
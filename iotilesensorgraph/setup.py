@@ -27,7 +27,7 @@ setup(
         "future>=0.16.0",
         "monotonic>=1.3.0",
         "toposort>=1.5",
-        "iotile-core>=3.16.7"
+        "iotile-core>=3.23.0"
     ],
     entry_points={'iotile.sg_processor': ['copy_all_a = iotile.sg.processors:copy_all_a',
                                           'copy_latest_a = iotile.sg.processors:copy_latest_a',
@@ -35,6 +35,8 @@ setup(
                                           'call_rpc = iotile.sg.processors:call_rpc',
                                           'trigger_streamer = iotile.sg.processors:trigger_streamer',
                                           'subtract_afromb = iotile.sg.processors:subtract_afromb'],
+                  'iotile.sg_block_processor': ['copy_all_a = iotile.sg.processors:copy_all_a_block',
+                                                'copy_latest_a = iotile.sg.processors:copy_latest_a_block'],
                   'iotile.update_record': ['add_node = iotile.sg.update:AddNodeRecord',
                                            'add_streamer = iotile.sg.update:AddStreamerRecord',
                                            'set_config = iotile.sg.update:SetConfigRecord',
@@ -0,0 +1,101 @@
+"""Tests for the memory mapped file storage engine."""
+
+import pytest
+from iotile.core.exceptions import ArgumentError
+from iotile.sg.model import DeviceModel
+from iotile.sg.sensor_log import SensorLog
+from iotile.sg.engine import FileStorageEngine
+from iotile.sg.exceptions import StorageFullError
+from iotile.sg import DataStreamSelector, DataStream, StreamEmptyError
+from iotile.core.hw.reports import IOTileReading
+
+
+@pytest.fixture
+def small_model():
+    model = DeviceModel()
+    model.set('max_storage_buffer', 16)
+    model.set('max_streaming_buffer', 8)
+    model.set('buffer_erase_size', 4)
+    return model
+
+
+def test_engine_basic(small_model, tmpdir):
+    """Make sure we can push, get and popn readings."""
+
+    path = str(tmpdir.join('storage.bin'))
+    engine = FileStorageEngine(small_model, path)
+
+    storage = DataStream.FromString('buffered 1')
+    output = DataStream.FromString('output 1')
+
+    for i in range(0, 8):
+        engine.push(IOTileReading(i, storage.encode(), i, reading_id=i + 1))
+        engine.push(IOTileReading(i, output.encode(), 10 + i))
+
+    assert engine.count() == (8, 8)
+
+    with pytest.raises(StorageFullError):
+        engine.push(IOTileReading(8, output.encode(), 18))
+
+    reading = engine.get(u'storage', 3)
+    assert reading.stream == storage.encode()
+    assert reading.raw_time == 3
+    assert reading.value == 3
+    assert reading.reading_id == 4
+
+    popped = engine.popn(u'streaming', 3)
+    assert [x.value for x in popped] == [10, 11, 12]
+    assert engine.count() == (8, 5)
+
+    engine.push(IOTileReading(8, output.encode(), 18))
+    assert [engine.get(u'streaming', i).value for i in range(0, 6)] == [13, 14, 15, 16, 17, 18]
+
+    with pytest.raises(StreamEmptyError):
+        engine.get(u'streaming', 6)
+
+    engine.clear()
+    assert engine.count() == (0, 0)
+    engine.close()
+
+
+def test_engine_persistence(small_model, tmpdir):
+    """Make sure readings survive closing and reopening the engine."""
+
+    path = str(tmpdir.join('storage.bin'))
+    engine = FileStorageEngine(small_model, path)
+    log = SensorLog(engine, small_model)
+
+    stream = DataStream.FromString('buffered 1')
+    for i in range(0, 20):
+        log.push(stream, IOTileReading(i, 0, i))
+
+    engine.close()
+
+    engine = FileStorageEngine(small_model, path)
+    assert engine.count() == (16, 0)
+    assert [engine.get(u'storage', i).value for i in range(0, 16)] == list(range(4, 20))
+    engine.close()
+
+    # Make sure we don't open a file created with a different model
+    small_model.set('max_streaming_buffer', 16)
+    with pytest.raises(ArgumentError):
+        FileStorageEngine(small_model, path)
+
+
+def test_sensorlog_walker(small_model, tmpdir):
+    """Make sure walkers work with a file backed engine."""
+
+    engine = FileStorageEngine(small_model, str(tmpdir.join('storage.bin')))
+    log = SensorLog(engine, small_model)
+
+    walk = log.create_walker(DataStreamSelector.FromString('output 1'))
+    stream1 = DataStream.FromString('output 1')
+    stream2 = DataStream.FromString('output 2')
+
+    for i in range(0, 3):
+        log.push(stream1, IOTileReading(i, 0, i))
+        log.push(stream2, IOTileReading(i, 0, 100 + i))
+
+    assert walk.count() == 3
+    assert [walk.pop().value for _i in range(0, 3)] == [0, 1, 2]
+    engine.close()
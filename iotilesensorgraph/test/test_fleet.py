@@ -0,0 +1,69 @@
+"""Tests for simulating a fleet of sensor graphs in parallel."""
+
+import os.path
+import pytest
+from iotile.core.exceptions import ArgumentError
+from iotile.sg import DataStream
+from iotile.sg.sim import FleetSimulator
+
+
+def get_path(name):
+    return os.path.join(os.path.dirname(__file__), 'sensor_graphs', name)
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_fleet_simulation(processes):
+    """Make sure we can simulate several devices and get each trace back."""
+
+    fleet = FleetSimulator(processes=processes)
+    fleet.add_device(1, get_path('basic_streamer.sgf'), ['run_time 1 minute'])
+    fleet.add_device(2, get_path('basic_streamer.sgf'), ['run_time 2 minutes'])
+    fleet.add_device(3, get_path('basic_every_1min.sgf'), ['run_time 2 minutes'], watch=['counter 15'])
+    fleet.add_device(4, get_path('missing_file.sgf'), ['run_time 1 minute'])
+
+    traces = fleet.run()
+
+    assert sorted(traces.keys()) == [1, 2, 3]
+    assert list(fleet.failures.keys()) == [4]
+
+    output1 = DataStream.FromString('output 1').encode()
+    assert len(traces[1]) == 6
+    assert len(traces[2]) == 12
+    assert all(x.stream == output1 for x in traces[1])
+    assert [x.raw_time for x in traces[1]] == [10, 20, 30, 40, 50, 60]
+
+    assert [str(x) for x in traces[3].selectors] == ['counter 15']
+    assert [x.raw_time for x in traces[3]] == [60, 120]
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_fleet_parse_error(tmpdir, processes):
+    """Make sure a malformed sensor graph only fails its own device."""
+
+    bad_path = str(tmpdir.join('bad.sgf'))
+    with open(bad_path, "w") as outfile:
+        outfile.write("every 10 seconds {{{ this is not a sensor graph\n")
+
+    fleet = FleetSimulator(processes=processes)
+    fleet.add_device(1, get_path('basic_streamer.sgf'), ['run_time 1 minute'])
+    fleet.add_device(2, bad_path, ['run_time 1 minute'])
+    fleet.add_device(3, get_path('basic_streamer.sgf'), ['run_time 2 minutes'])
+
+    traces = fleet.run()
+
+    assert sorted(traces.keys()) == [1, 3]
+    assert list(fleet.failures.keys()) == [2]
+    assert len(fleet.failures[2]) > 0
+
+
+def test_fleet_arguments():
+    """Make sure we catch invalid device descriptions."""
+
+    fleet = FleetSimulator()
+    fleet.add_device(1, get_path('basic_streamer.sgf'), ['run_time 1 minute'])
+
+    with pytest.raises(ArgumentError):
+        fleet.add_device(1, get_path('basic_streamer.sgf'), ['run_time 1 minute'])
+
+    with pytest.raises(ArgumentError):
+        fleet.add_device(2, get_path('basic_streamer.sgf'), [])
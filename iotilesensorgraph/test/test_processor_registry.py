@@ -0,0 +1,61 @@
+"""Tests for the cached processing function registry."""
+
+import json
+from iotile.sg.processor_registry import ProcessorRegistry
+from iotile.sg.processors import copy_all_a, copy_all_a_block
+
+
+def test_registry_lookup(tmpdir):
+    """Make sure we can find processing functions and cache the index."""
+
+    cache_file = str(tmpdir.join('cache.json'))
+    reg = ProcessorRegistry(cache_file=cache_file)
+
+    assert reg.find_processing_function(u'copy_all_a') is copy_all_a
+    assert reg.find_block_processing_function(u'copy_all_a') is copy_all_a_block
+    assert reg.find_block_processing_function(u'copy_count_a') is None
+    assert reg.find_processing_function(u'unknown_function') is None
+    assert u'copy_count_a' in reg.processor_names()
+
+    with open(cache_file, "r") as infile:
+        data = json.load(infile)
+
+    assert data['index'][ProcessorRegistry.ProcessorGroup][u'copy_all_a'] == [u'iotile.sg.processors', [u'copy_all_a']]
+
+    # A new registry should use the cached index without scanning
+    reg2 = ProcessorRegistry(cache_file=cache_file)
+    assert reg2.find_processing_function(u'copy_all_a') is copy_all_a
+    assert reg2._scanned is False
+
+
+def test_stale_cache(tmpdir):
+    """Make sure we rescan entry points if the cache is out of date."""
+
+    cache_file = str(tmpdir.join('cache.json'))
+    reg = ProcessorRegistry(cache_file=cache_file)
+    reg.processor_names()
+
+    with open(cache_file, "r") as infile:
+        data = json.load(infile)
+
+    # Point a function at the wrong place and remove another
+    index = data['index'][ProcessorRegistry.ProcessorGroup]
+    index[u'copy_all_a'] = [u'iotile.sg.processors', [u'missing_function']]
+    del index[u'copy_latest_a']
+
+    with open(cache_file, "w") as outfile:
+        json.dump(data, outfile)
+
+    reg = ProcessorRegistry(cache_file=cache_file)
+    assert reg.find_processing_function(u'copy_all_a') is copy_all_a
+    assert reg._scanned is True
+
+    reg = ProcessorRegistry(cache_file=cache_file)
+    assert reg.find_processing_function(u'copy_latest_a') is not None
+
+    # An invalid cache file is ignored
+    with open(cache_file, "w") as outfile:
+        outfile.write("not json")
+
+    reg = ProcessorRegistry(cache_file=cache_file)
+    assert reg.find_processing_function(u'copy_all_a') is copy_all_a
@@ -0,0 +1,93 @@
+"""Tests for the ring buffer storage engine."""
+
+import pytest
+from iotile.sg.model import DeviceModel
+from iotile.sg.sensor_log import SensorLog
+from iotile.sg.engine import RingBufferStorageEngine
+from iotile.sg.exceptions import StorageFullError
+from iotile.sg import DataStreamSelector, DataStream, StreamEmptyError
+from iotile.core.hw.reports import IOTileReading
+
+
+@pytest.fixture
+def small_model():
+    model = DeviceModel()
+    model.set('max_storage_buffer', 16)
+    model.set('max_streaming_buffer', 16)
+    model.set('buffer_erase_size', 4)
+    return model
+
+
+def test_engine_basic(small_model):
+    """Make sure we can push, get and popn readings."""
+
+    engine = RingBufferStorageEngine(small_model)
+    storage = DataStream.FromString('buffered 1')
+    output = DataStream.FromString('output 1')
+
+    for i in range(0, 10):
+        engine.push(IOTileReading(i, storage.encode(), -i, reading_id=i + 1))
+        engine.push(IOTileReading(i, output.encode(), i))
+
+    assert engine.count() == (10, 10)
+
+    reading = engine.get(u'storage', 3)
+    assert reading.stream == storage.encode()
+    assert reading.raw_time == 3
+    assert reading.value == -3
+    assert reading.reading_id == 4
+
+    popped = engine.popn(u'streaming', 4)
+    assert [x.value for x in popped] == [0, 1, 2, 3]
+    assert engine.count() == (10, 6)
+    assert engine.get(u'streaming', 0).value == 4
+
+    with pytest.raises(StreamEmptyError):
+        engine.get(u'streaming', 6)
+
+    with pytest.raises(StreamEmptyError):
+        engine.popn(u'streaming', 7)
+
+    engine.clear()
+    assert engine.count() == (0, 0)
+
+
+def test_engine_wraparound(small_model):
+    """Make sure the ring buffer wraps around correctly when full."""
+
+    engine = RingBufferStorageEngine(small_model)
+    storage = DataStream.FromString('buffered 1')
+
+    for i in range(0, 16):
+        engine.push(IOTileReading(i, storage.encode(), i))
+
+    with pytest.raises(StorageFullError):
+        engine.push(IOTileReading(16, storage.encode(), 16))
+
+    engine.popn(u'storage', 4)
+
+    for i in range(16, 20):
+        engine.push(IOTileReading(i, storage.encode(), i))
+
+    assert engine.count() == (16, 0)
+    assert [engine.get(u'storage', i).value for i in range(0, 16)] == list(range(4, 20))
+
+
+def test_sensorlog_rollover(small_model):
+    """Make sure walkers stay in sync with a ring buffer engine on rollover."""
+
+    engine = RingBufferStorageEngine(small_model)
+    log = SensorLog(engine, small_model)
+
+    walk = log.create_walker(DataStreamSelector.FromString('buffered 1'))
+    stream1 = DataStream.FromString('buffered 1')
+    stream2 = DataStream.FromString('buffered 2')
+
+    for i in range(0, 20):
+        log.push(stream1, IOTileReading(i, 0, i))
+        log.push(stream2, IOTileReading(i, 0, 100 + i))
+
+    # 40 readings were pushed into a 16 entry buffer with 4 entry erases
+    # leaving the last 16 readings, 8 of which are from stream 1.
+    assert walk.count() == 8
+    assert [walk.pop().value for _i in range(0, 8)] == list(range(12, 20))
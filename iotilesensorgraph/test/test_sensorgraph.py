@@ -1,6 +1,6 @@
 """Test to make sure we can create and use SensorGraph objects."""
 
-from iotile.sg import SensorGraph, DeviceModel, SensorLog, DataStream, SlotIdentifier
+from iotile.sg import SensorGraph, DeviceModel, SensorLog, DataStream, DataStreamSelector, SlotIdentifier
 from iotile.sg.known_constants import config_fast_tick_secs
 from iotile.core.hw.reports import IOTileReading
 
@@ -71,3 +71,86 @@ def test_iteration():
     assert len(in1) == 1
     assert len(out1) == 0
     assert str(in1[0].stream) == u'unbuffered 1'
+
+
+def test_execution_plan():
+    """Make sure each node runs at most once per input, after its inputs."""
+
+    model = DeviceModel()
+    log = SensorLog(model=model)
+    sg = SensorGraph(log, model=model)
+
+    sg.add_node('(input 1 always) => buffered 1 using copy_all_a')
+    sg.add_node('(input 1 always) => buffered 2 using copy_all_a')
+    sg.add_node('(buffered 1 always || buffered 2 always) => counter 1 using copy_count_a')
+    sg.add_node('(input 2 always) => buffered 3 using copy_all_a')
+
+    output = log.create_walker(DataStreamSelector.FromString('counter 1'))
+    unrelated = log.create_walker(DataStreamSelector.FromString('buffered 3'))
+
+    sg.process_input(DataStream.FromString('input 1'), IOTileReading(0, 1, 5), rpc_executor=None)
+
+    # The counting node should run once, after both of its inputs have data
+    assert output.count() == 1
+    assert output.pop().value == 1
+    assert unrelated.count() == 0
+
+    # Adding a node must cause the plan to be recompiled
+    sg.add_node('(input 1 always) => buffered 4 using copy_all_a')
+    added = log.create_walker(DataStreamSelector.FromString('buffered 4'))
+
+    sg.process_input(DataStream.FromString('input 1'), IOTileReading(0, 1, 6), rpc_executor=None)
+    assert added.count() == 1
+    assert output.count() == 1
+
+
+def test_block_processing_functions():
+    """Make sure block processing functions are used when available."""
+
+    model = DeviceModel()
+    log = SensorLog(model=model)
+    sg = SensorGraph(log, model=model)
+
+    sg.add_node('(input 1 always) => buffered 1 using copy_all_a')
+    sg.add_node('(buffered 1 when count >= 3) => buffered 2 using copy_all_a')
+    sg.add_node('(buffered 1 when count >= 3) => unbuffered 1 using copy_latest_a')
+    sg.add_node('(buffered 1 when count >= 3) => unbuffered 2 using copy_count_a')
+
+    assert sg.nodes[1].block_func is not None
+    assert sg.nodes[2].block_func is not None
+    assert sg.nodes[3].block_func is None
+
+    copied = log.create_walker(DataStreamSelector.FromString('buffered 2'))
+
+    for i in range(0, 3):
+        sg.process_input(DataStream.FromString('input 1'), IOTileReading(i, 1, 10 + i), rpc_executor=None)
+
+    assert [copied.pop().value for _i in range(0, 3)] == [10, 11, 12]
+    assert copied.count() == 0
+    assert log.inspect_last(DataStream.FromString('unbuffered 1')).value == 12
+    assert log.inspect_last(DataStream.FromString('unbuffered 1')).raw_time == 2
+    assert log.inspect_last(DataStream.FromString('unbuffered 2')).value == 3
+
+
+def test_block_processing_unused_inputs():
+    """Make sure block functions only receive the inputs that they use."""
+
+    model = DeviceModel()
+    log = SensorLog(model=model)
+    sg = SensorGraph(log, model=model)
+
+    sg.add_node('(input 1 always && input 2 always) => buffered 1 using copy_all_a')
+    unused = sg.nodes[0].inputs[1][0]
+
+    def _fail():
+        raise AssertionError("An unused input was copied into a block")
+
+    unused.pop_block = _fail
+    copied = log.create_walker(DataStreamSelector.FromString('buffered 1'))
+
+    sg.process_input(DataStream.FromString('input 2'), IOTileReading(0, 1, 5), rpc_executor=None)
+    sg.process_input(DataStream.FromString('input 1'), IOTileReading(1, 1, 6), rpc_executor=None)
+
+    assert unused.count() == 0
+    assert copied.count() == 1
+    assert copied.pop().value == 6
@@ -2,8 +2,9 @@ import pytest
 
 from iotile.sg.model import DeviceModel
 from iotile.sg.sensor_log import SensorLog
+from iotile.sg.engine import InMemoryStorageEngine, RingBufferStorageEngine
 from iotile.sg import DataStreamSelector, DataStream, StreamEmptyError
-from iotile.core.hw.reports import IOTileReading
+from iotile.core.hw.reports import IOTileReading, ReadingBatch
 
 
 def test_counter_walker():
@@ -159,3 +160,142 @@ def test_storage_streaming_walkers():
 
     assert output_walk.count() == 0
     assert output_walk.offset == 0
+
+
+def test_push_dispatch():
+    """Make sure walkers and monitors added after a push are still updated."""
+
+    log = SensorLog(model=DeviceModel())
+
+    stream1 = DataStream.FromString('buffered 1')
+    stream2 = DataStream.FromString('buffered 2')
+    all_walk = log.create_walker(DataStreamSelector.FromString('all buffered'))
+
+    log.push(stream1, IOTileReading(0, 0, 1))
+    log.push(stream2, IOTileReading(0, 0, 2))
+    assert all_walk.count() == 2
+
+    # Add a walker and a monitor after the dispatch for stream 1 was cached
+    seen = []
+    walk1 = log.create_walker(DataStreamSelector.FromString('buffered 1'))
+    log.watch(DataStreamSelector.FromString('all buffered'), lambda stream, value: seen.append(value.value))
+
+    log.push(stream1, IOTileReading(0, 0, 3))
+    log.push(stream2, IOTileReading(0, 0, 4))
+
+    assert all_walk.count() == 4
+    assert walk1.count() == 1
+    assert walk1.pop().value == 3
+    assert seen == [3, 4]
+
+    # Make sure destroyed walkers are no longer updated
+    log.destroy_walker(walk1)
+    log.push(stream1, IOTileReading(0, 0, 5))
+    assert walk1.count() == 0
+    assert all_walk.count() == 5
+
+
+def test_sparse_walker_rollover():
+    """Make sure a walker on a sparse stream stays in sync across rollovers."""
+
+    model = DeviceModel()
+    model.set('max_storage_buffer', 32)
+    model.set('buffer_erase_size', 8)
+    log = SensorLog(model=model)
+
+    sparse = DataStream.FromString('buffered 1')
+    busy = DataStream.FromString('buffered 2')
+    walk = log.create_walker(DataStreamSelector.FromString('buffered 1'))
+
+    for i in range(0, 4):
+        log.push(sparse, IOTileReading(0, 0, i))
+        for _j in range(0, 5):
+            log.push(busy, IOTileReading(0, 0, 100))
+
+    # Consume the first sparse reading so the walker is partway through
+    # the buffer when the first rollover happens.
+    assert walk.pop().value == 0
+    assert walk.offset == 1
+
+    for _j in range(0, 10):
+        log.push(busy, IOTileReading(0, 0, 100))
+
+    # The first 8 readings have now been erased, which includes the sparse
+    # reading with value 1 that was never consumed.
+    assert walk.count() == 2
+    assert walk.offset == 0
+    assert walk.peek().value == 2
+    assert walk.pop().value == 2
+    assert walk.offset == 5
+    assert walk.pop().value == 3
+
+
+@pytest.mark.parametrize("engine_factory", [InMemoryStorageEngine, RingBufferStorageEngine])
+def test_pop_block(engine_factory):
+    """Make sure walkers can hand over all of their readings as a block."""
+
+    model = DeviceModel()
+    log = SensorLog(engine_factory(model), model=model)
+
+    walk = log.create_walker(DataStreamSelector.FromString('buffered 1'))
+    virtual = log.create_walker(DataStreamSelector.FromString('unbuffered 1'))
+    counter = log.create_walker(DataStreamSelector.FromString('counter 1'))
+
+    for i in range(0, 5):
+        log.push(DataStream.FromString('buffered 1'), IOTileReading(i, 0, i))
+        log.push(DataStream.FromString('buffered 2'), IOTileReading(i, 0, 100 + i))
+        log.push(DataStream.FromString('unbuffered 1'), IOTileReading(i, 0, i))
+        log.push(DataStream.FromString('counter 1'), IOTileReading(i, 0, i))
+
+    assert walk.pop().value == 0
+
+    block = walk.pop_block()
+    assert list(block.values) == [1, 2, 3, 4]
+    assert list(block.raw_times) == [1, 2, 3, 4]
+    assert walk.count() == 0
+    assert walk.offset == 9
+    assert len(walk.pop_block()) == 0
+
+    assert list(virtual.pop_block().values) == [4]
+    assert virtual.count() == 0
+
+    assert list(counter.pop_block().values) == [4]*5
+    assert counter.count() == 0
+
+
+@pytest.mark.parametrize("engine_factory", [InMemoryStorageEngine, RingBufferStorageEngine])
+def test_push_block(engine_factory):
+    """Make sure a batch of readings can be pushed at once, even across a rollover."""
+
+    model = DeviceModel()
+    model.set('max_storage_buffer', 32)
+    model.set('buffer_erase_size', 8)
+    log = SensorLog(engine_factory(model), model=model)
+
+    walk = log.create_walker(DataStreamSelector.FromString('buffered 1'))
+    other = log.create_walker(DataStreamSelector.FromString('buffered 2'))
+    counter = log.create_walker(DataStreamSelector.FromString('counter 1'))
+
+    seen = []
+    log.watch(DataStreamSelector.FromString('counter 1'), lambda stream, reading: seen.append(reading.value))
+
+    for i in range(0, 20):
+        log.push(DataStream.FromString('buffered 2'), IOTileReading(i, 0, i))
+
+    log.push_block(DataStream.FromString('buffered 1'), 5, ReadingBatch([0]*20, [0]*20, range(100, 120)))
+
+    # The rollover erased the oldest 8 readings, all from buffered 2
+    assert other.count() == 12
+    assert other.pop().value == 8
+    assert walk.count() == 20
+    assert [walk.pop().value for _i in range(0, 20)] == list(range(100, 120))
+
+    log.push_block(DataStream.FromString('counter 1'), 7, ReadingBatch([0]*3, [0]*3, [1, 2, 3]))
+    assert seen == [1, 2, 3]
+    assert counter.count() == 3
+    assert counter.peek().value == 3
+    assert counter.peek().raw_time == 7
+    assert log.inspect_last(DataStream.FromString('counter 1')).value == 3
+
+    log.push_block(DataStream.FromString('counter 1'), 8, ReadingBatch())
+    assert counter.count() == 3
@@ -4,7 +4,7 @@ from iotile.sg.sim import SensorGraphSimulator
 from iotile.sg.sim.stimulus import SimulationStimulus
 from iotile.sg.slot import SlotIdentifier
 from iotile.sg.known_constants import config_fast_tick_secs, config_tick1_secs, config_tick2_secs
-from iotile.sg import DeviceModel, SensorLog, SensorGraph, DataStream
+from iotile.sg import DeviceModel, SensorLog, SensorGraph, DataStream, DataStreamSelector
 from iotile.core.hw.reports import IOTileReading
 
 @pytest.fixture
@@ -199,3 +199,107 @@ def test_stimulus_parsing():
     with pytest.raises(ArgumentError):
         SimulationStimulus.FromString('unbuffered 1 = 1')
 
+
+
+def test_step_many():
+    """Make sure we can push a batch of inputs through the simulator."""
+
+    model = DeviceModel()
+    log = SensorLog(model=model)
+    sg = SensorGraph(log, model=model)
+
+    sg.add_node('(input 1 always) => buffered 1 using copy_all_a')
+    sg.add_node('(input 2 always) => counter 1 using copy_latest_a')
+
+    walker = log.create_walker(DataStreamSelector.FromString('buffered 1'))
+    counter = log.create_walker(DataStreamSelector.FromString('counter 1'))
+
+    input1 = DataStream.FromString('input 1').encode()
+    input2 = DataStream.FromString('input 2').encode()
+
+    sim = SensorGraphSimulator(sg)
+    sim.step_many([input1, input2, input1, input1], [1, 2, 3, 4])
+
+    assert walker.count() == 3
+    assert [walker.pop().value for _i in range(0, 3)] == [1, 3, 4]
+    assert counter.count() == 1
+    assert counter.pop().value == 2
+
+    with pytest.raises(ArgumentError):
+        sg.process_inputs([input1], [0, 1], [1], rpc_executor=None)
+
+
+def test_process_inputs_runs():
+    """Make sure runs of inputs without dependent nodes match per input processing."""
+
+    def _build():
+        model = DeviceModel()
+        log = SensorLog(model=model)
+        sg = SensorGraph(log, model=model)
+        sg.add_node('(input 1 always) => counter 1 using copy_latest_a')
+
+        seen = []
+        log.watch(DataStreamSelector.FromString('buffered 2'), lambda stream, reading: seen.append(reading.value))
+        walker = log.create_walker(DataStreamSelector.FromString('buffered 2'))
+        counter = log.create_walker(DataStreamSelector.FromString('counter 1'))
+        return log, sg, seen, walker, counter
+
+    encoded = [DataStream.FromString(x).encode() for x in ('buffered 2', 'buffered 2', 'input 1',
+                                                            'buffered 2', 'input 2', 'input 2')]
+    times = list(range(0, len(encoded)))
+    values = [10, 11, 12, 13, 14, 15]
+
+    log, sg, seen, walker, counter = _build()
+    sg.process_inputs(encoded, times, values, rpc_executor=None)
+
+    log2, sg2, seen2, walker2, counter2 = _build()
+    for stream, raw_time, value in zip(encoded, times, values):
+        sg2.process_input(DataStream.FromEncoded(stream), IOTileReading(raw_time, stream, value), None)
+
+    assert seen == seen2 == [10, 11, 13]
+    assert walker.count() == walker2.count() == 3
+    assert [(x.raw_time, x.value) for x in (walker.pop() for _i in range(0, 3))] == [(0, 10), (1, 11), (3, 13)]
+    assert counter.count() == counter2.count() == 1
+    assert log.inspect_last(DataStream.FromString('input 2')).value == 15
+    assert log.inspect_last(DataStream.FromString('input 2')).raw_time == 5
+
+
+def test_accelerated_scheduler():
+    """Make sure accelerated runs jump between events without losing any."""
+
+    model = DeviceModel()
+    log = SensorLog(model=model)
+    tick1_sg = SensorGraph(log, model=model)
+
+    tick1_sg.add_node('(system input 5 always) => counter 1 using copy_latest_a')
+    tick1_sg.add_node('(system input 2 always) => counter 2 using copy_latest_a')
+    tick1_sg.add_node('(input 1 always) => buffered 1 using copy_all_a')
+    tick1_sg.add_config(SlotIdentifier.FromString('controller'), config_tick1_secs, 'uint32_t', 600)
+    walker = tick1_sg.sensor_log.create_walker(DataStreamSelector.FromString('buffered 1'))
+
+    sim = SensorGraphSimulator(tick1_sg)
+    sim.stimulus('55 seconds: input 1 = 5')
+    sim.stimulus('1 day: input 1 = 6')
+    sim.stop_condition('run_time 2 days')
+    sim.stop_condition('run_time 3 days')
+
+    sim.run()
+
+    assert sim.tick_count == 2*24*60*60
+    assert tick1_sg.sensor_log.inspect_last(DataStream.FromString('counter 1')).value == 2*24*60*60
+    assert tick1_sg.sensor_log.inspect_last(DataStream.FromString('counter 2')).value == 2*24*60*60
+
+    assert walker.count() == 2
+    first = walker.pop()
+    second = walker.pop()
+    assert (first.raw_time, first.value) == (55, 5)
+    assert (second.raw_time, second.value) == (24*60*60, 6)
+
+    # Make sure the stop time is honored even if it does not line up with a tick
+    sim.stop_conditions = []
+    sim.stop_condition('run_time 15 seconds')
+    sim.run()
+
+    assert sim.tick_count == 2*24*60*60 + 15
+    assert tick1_sg.sensor_log.inspect_last(DataStream.FromString('counter 1')).value == 2*24*60*60
+    assert tick1_sg.sensor_log.inspect_last(DataStream.FromString('counter 2')).value == 2*24*60*60 + 10